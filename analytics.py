@@ -0,0 +1,386 @@
+"""Сводная статистика сложности вопросов по всем попыткам.
+
+Каждая проверенная попытка сразу добавляется в счетчики процесса: для
+каждого вопроса - число попыток, число правильных ответов и гистограмма
+выбранных вариантов (массивы NumPy на тест), для каждого тега из
+metadata.tags - попытки и правильные ответы. Повторная проверка той же
+попытки (rerun с открытыми результатами, исправленный ответ) заменяет ее
+вклад, а не добавляет новый.
+
+Приращения счетчиков периодически сбрасываются фоновым потоком в SQLite
+(results/analytics.db, сложение в UPSERT), поэтому несколько процессов
+Streamlit ведут общую статистику. Запрос "самые сложные вопросы раздела"
+читает готовые счетчики и не перебирает сырые результаты.
+
+Режим задается THEORY_DS_ANALYTICS: sqlite (по умолчанию), memory или none.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from quiz_catalog import get_catalog
+from quiz_schema import UNANSWERED, QuestionType, Quiz
+from results_backend import RESULTS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних попыток помнить, чтобы заменять их вклад при повторной проверке
+MAX_TRACKED_ATTEMPTS = 10000
+FLUSH_INTERVAL = 5.0
+
+
+class QuizCounters:
+    """Счетчики одного теста: attempts[q], correct[q] и options[q, вариант]"""
+
+    __slots__ = ('attempts', 'correct', 'options')
+
+    def __init__(self, quiz: Quiz):
+        size = len(quiz.questions)
+        width = max([len(question.options) for question in quiz.questions] + [1])
+        self.attempts = np.zeros(size, dtype=np.int64)
+        self.correct = np.zeros(size, dtype=np.int64)
+        self.options = np.zeros((size, width), dtype=np.int64)
+
+    def fits(self, quiz: Quiz) -> bool:
+        """Подходит ли форма массивов версии теста (тест мог измениться)"""
+        return len(self.attempts) == len(quiz.questions) and \
+            all(len(question.options) <= self.options.shape[1] for question in quiz.questions)
+
+    def add(self, quiz: Quiz, masks: Sequence[int], correct_flags: Sequence[bool], sign: int) -> None:
+        for j, question in enumerate(quiz.questions):
+            if not question.gradable:
+                continue
+            self.attempts[j] += sign
+            if j < len(correct_flags) and correct_flags[j]:
+                self.correct[j] += sign
+            mask = masks[j] if j < len(masks) else UNANSWERED
+            for option in chosen_options(question, mask):
+                self.options[j, option] += sign
+
+
+def chosen_options(question, mask: int) -> List[int]:
+    """Индексы выбранных вариантов по коду ответа"""
+    if mask == UNANSWERED:
+        return []
+    if question.qtype == QuestionType.MATCHING:
+        return [choice for choice in question.decode_matching(mask) if choice is not None]
+    return [k for k in range(len(question.options)) if mask >> k & 1]
+
+
+class AnalyticsStore:
+    """Счетчики в SQLite; приращения складываются, поэтому писать могут несколько процессов"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(RESULTS_DIR, "analytics.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS question_stats (
+                    quiz_id TEXT NOT NULL,
+                    question_index INTEGER NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    correct INTEGER NOT NULL,
+                    PRIMARY KEY (quiz_id, question_index)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS option_counts (
+                    quiz_id TEXT NOT NULL,
+                    question_index INTEGER NOT NULL,
+                    option_index INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (quiz_id, question_index, option_index)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tag_stats (
+                    tag TEXT PRIMARY KEY,
+                    attempts INTEGER NOT NULL,
+                    correct INTEGER NOT NULL
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение на поток (sqlite3 не разрешает делить его между потоками)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def add(self, quizzes: Dict[str, QuizCounters], tags: Dict[str, List[int]]) -> None:
+        """Прибавляет приращения счетчиков"""
+        question_rows = []
+        option_rows = []
+        for quiz_id, counters in quizzes.items():
+            for j in np.flatnonzero(counters.attempts | counters.correct):
+                question_rows.append((quiz_id, int(j), int(counters.attempts[j]), int(counters.correct[j])))
+            for j, option in zip(*np.nonzero(counters.options)):
+                option_rows.append((quiz_id, int(j), int(option), int(counters.options[j, option])))
+        tag_rows = [(tag, attempts, correct) for tag, (attempts, correct) in tags.items() if attempts or correct]
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO question_stats VALUES (?, ?, ?, ?) ON CONFLICT (quiz_id, question_index) "
+                "DO UPDATE SET attempts = attempts + excluded.attempts, correct = correct + excluded.correct",
+                question_rows,
+            )
+            conn.executemany(
+                "INSERT INTO option_counts VALUES (?, ?, ?, ?) ON CONFLICT (quiz_id, question_index, option_index) "
+                "DO UPDATE SET count = count + excluded.count",
+                option_rows,
+            )
+            conn.executemany(
+                "INSERT INTO tag_stats VALUES (?, ?, ?) ON CONFLICT (tag) "
+                "DO UPDATE SET attempts = attempts + excluded.attempts, correct = correct + excluded.correct",
+                tag_rows,
+            )
+
+    def question_rows(self, quiz_prefix: str, min_attempts: int, limit: int) -> List[Tuple[str, int, int, int]]:
+        """(quiz_id, вопрос, попытки, правильные) с наименьшей долей правильных ответов"""
+        cursor = self._connect().execute(
+            "SELECT quiz_id, question_index, attempts, correct FROM question_stats "
+            "WHERE substr(quiz_id, 1, ?) = ? AND attempts >= ? AND attempts > 0 "
+            "ORDER BY CAST(correct AS REAL) / attempts, attempts DESC LIMIT ?",
+            (len(quiz_prefix), quiz_prefix, max(min_attempts, 1), limit),
+        )
+        return cursor.fetchall()
+
+    def top_option(self, quiz_id: str, question_index: int, exclude: Sequence[int]) -> Optional[Tuple[int, int]]:
+        """Самый частый вариант вопроса среди неправильных (индекс, сколько раз)"""
+        # NOT IN (NULL) не пропускает ни одной строки, поэтому пустой список - без условия
+        excluded = f"AND option_index NOT IN ({','.join('?' * len(exclude))}) " if exclude else ""
+        row = self._connect().execute(
+            f"SELECT option_index, count FROM option_counts WHERE quiz_id = ? AND question_index = ? "
+            f"{excluded}AND count > 0 ORDER BY count DESC LIMIT 1",
+            (quiz_id, question_index, *exclude),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def tag_rows(self) -> List[Tuple[str, int, int]]:
+        return self._connect().execute(
+            "SELECT tag, attempts, correct FROM tag_stats WHERE attempts > 0 "
+            "ORDER BY CAST(correct AS REAL) / attempts"
+        ).fetchall()
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class AnalyticsEngine:
+    """Счетчики процесса и несброшенные приращения для хранилища"""
+
+    def __init__(self, store: Optional[AnalyticsStore] = None):
+        self.store = store
+        self._lock = threading.Lock()
+        # Все попытки, учтенные этим процессом
+        self._totals: Dict[str, QuizCounters] = {}
+        self._tags: Dict[str, List[int]] = {}
+        # Приращения с последнего сброса в хранилище
+        self._pending: Dict[str, QuizCounters] = {}
+        self._pending_tags: Dict[str, List[int]] = {}
+        # ключ попытки -> (тест, маски, флаги правильности) для замены вклада
+        self._attempts: "OrderedDict[Hashable, Tuple[Quiz, Tuple[int, ...], Tuple[bool, ...]]]" = OrderedDict()
+        self.flush_errors = 0
+
+    def _apply(self, quiz: Quiz, masks: Sequence[int], correct_flags: Sequence[bool], sign: int) -> None:
+        if self.store is not None:
+            pending = self._pending.get(quiz.quiz_id)
+            if pending is not None and not pending.fits(quiz):
+                # Тест изменился: приращения по старой форме массивов сбрасываются сразу
+                self._flush_locked()
+                if quiz.quiz_id in self._pending:
+                    # Сброс не удался, а к новой форме массивов старые приращения не прибавить
+                    logger.warning("Несброшенная статистика теста %s по прежней версии потеряна", quiz.quiz_id)
+                    del self._pending[quiz.quiz_id]
+        if sign < 0:
+            totals = self._totals.get(quiz.quiz_id)
+            if totals is None or not totals.fits(quiz):
+                # Вклад попытки по прежней версии теста уже не в этих массивах
+                return
+        targets = [(self._totals, self._tags)]
+        if self.store is not None:
+            targets.append((self._pending, self._pending_tags))
+
+        graded = sum(question.gradable for question in quiz.questions)
+        correct = sum(1 for question, flag in zip(quiz.questions, correct_flags) if flag and question.gradable)
+        for counters_by_quiz, tags in targets:
+            counters = counters_by_quiz.get(quiz.quiz_id)
+            if counters is None or not counters.fits(quiz):
+                # Приращения уже сброшены в хранилище: вычитание попадает в новые
+                # (отрицательные) приращения и исправит хранилище при следующем сбросе
+                counters = counters_by_quiz[quiz.quiz_id] = QuizCounters(quiz)
+            counters.add(quiz, masks, correct_flags, sign)
+            for tag in quiz.tags:
+                totals = tags.setdefault(tag, [0, 0])
+                totals[0] += sign * graded
+                totals[1] += sign * correct
+
+    def record(self, attempt_key: Hashable, quiz: Quiz, masks: Sequence[int], correct_flags: Sequence[bool]) -> None:
+        """Учитывает проверенную попытку; повторный вызов с тем же ключом заменяет ее вклад"""
+        masks = tuple(masks)
+        correct_flags = tuple(correct_flags)
+        with self._lock:
+            previous = self._attempts.get(attempt_key)
+            if previous is not None:
+                if previous[0] is quiz and previous[1] == masks:
+                    return
+                self._apply(previous[0], previous[1], previous[2], -1)
+            self._apply(quiz, masks, correct_flags, 1)
+            self._attempts[attempt_key] = (quiz, masks, correct_flags)
+            self._attempts.move_to_end(attempt_key)
+            while len(self._attempts) > MAX_TRACKED_ATTEMPTS:
+                self._attempts.popitem(last=False)
+
+    def _flush_locked(self) -> None:
+        if self.store is None or not self._pending and not self._pending_tags:
+            return
+        pending, pending_tags = self._pending, self._pending_tags
+        self._pending, self._pending_tags = {}, {}
+        try:
+            self.store.add(pending, pending_tags)
+        except Exception:
+            # Транзакция откатилась: приращения возвращаются и уйдут при следующем сбросе
+            # (под self._lock новых приращений за это время не появилось)
+            self.flush_errors += 1
+            self._pending, self._pending_tags = pending, pending_tags
+            logger.exception("Не удалось сбросить статистику в хранилище")
+
+    def flush(self) -> None:
+        """Сбрасывает приращения в хранилище"""
+        with self._lock:
+            self._flush_locked()
+
+    def _question_rows(self, quiz_prefix: str, min_attempts: int, limit: int) -> List[Tuple[str, int, int, int]]:
+        """Та же выборка, что в AnalyticsStore.question_rows, по счетчикам процесса"""
+        rows = []
+        with self._lock:
+            for quiz_id, counters in self._totals.items():
+                if not quiz_id.startswith(quiz_prefix):
+                    continue
+                for j in np.flatnonzero(counters.attempts >= max(min_attempts, 1)):
+                    rows.append((quiz_id, int(j), int(counters.attempts[j]), int(counters.correct[j])))
+        rows.sort(key=lambda row: (row[3] / row[2], -row[2]))
+        return rows[:limit]
+
+    def _top_option(self, quiz_id: str, question_index: int, exclude: Sequence[int]) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            counters = self._totals.get(quiz_id)
+            if counters is None or question_index >= len(counters.options):
+                return None
+            counts = counters.options[question_index].copy()
+        counts[list(exclude)] = 0
+        option = int(counts.argmax())
+        return (option, int(counts[option])) if counts[option] > 0 else None
+
+    def hardest_questions(self, section_prefix: str, limit: int = 10, min_attempts: int = 1) -> List[Dict[str, Any]]:
+        """Вопросы раздела с наименьшей долей правильных ответов"""
+        quiz_prefix = f"{section_prefix}_"
+        if self.store is not None:
+            self.flush()
+            rows = self.store.question_rows(quiz_prefix, min_attempts, limit)
+            top_option = self.store.top_option
+        else:
+            rows = self._question_rows(quiz_prefix, min_attempts, limit)
+            top_option = self._top_option
+
+        catalog = get_catalog()
+        result = []
+        for quiz_id, j, attempts, correct in rows:
+            quiz = catalog.load_quiz(quiz_id)
+            question = quiz.questions[j] if quiz is not None and j < len(quiz.questions) else None
+            common_wrong = ""
+            if question is not None and question.qtype != QuestionType.MATCHING:
+                top = top_option(quiz_id, j, sorted(question.correct))
+                if top is not None and top[0] < len(question.options):
+                    common_wrong = f"{question.options[top[0]]} ({top[1]})"
+            result.append({
+                'quiz_id': quiz_id,
+                'question': j + 1,
+                'text': question.text if question is not None else "(вопрос недоступен)",
+                'attempts': attempts,
+                'correct_percent': correct / attempts * 100,
+                'common_wrong_answer': common_wrong,
+            })
+        return result
+
+    def tag_summary(self) -> List[Dict[str, Any]]:
+        """Доля правильных ответов по тегам тестов, от самых сложных"""
+        if self.store is not None:
+            self.flush()
+            rows = self.store.tag_rows()
+        else:
+            with self._lock:
+                rows = [(tag, attempts, correct) for tag, (attempts, correct) in self._tags.items() if attempts > 0]
+            rows.sort(key=lambda row: row[2] / row[1])
+        return [
+            {'tag': tag, 'attempts': attempts, 'correct_percent': correct / attempts * 100}
+            for tag, attempts, correct in rows
+        ]
+
+    def close(self) -> None:
+        self.flush()
+        if self.store is not None:
+            self.store.close()
+
+
+class AnalyticsFlusher(threading.Thread):
+    """Фоновый поток, который раз в interval секунд сбрасывает приращения"""
+
+    def __init__(self, engine: AnalyticsEngine, interval: float = FLUSH_INTERVAL):
+        super().__init__(name="analytics-flush", daemon=True)
+        self.engine = engine
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.engine.flush()
+            except Exception:
+                # Поток сброса не должен останавливаться из-за одной ошибки
+                logger.exception("Ошибка потока сброса статистики")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_engine: Optional[AnalyticsEngine] = None
+_engine_ready = False
+_engine_lock = threading.Lock()
+
+
+def get_analytics() -> Optional[AnalyticsEngine]:
+    """Возвращает общую на процесс статистику (None, если она отключена)"""
+    global _engine, _engine_ready
+    if not _engine_ready:
+        with _engine_lock:
+            if not _engine_ready:
+                kind = os.environ.get("THEORY_DS_ANALYTICS", "sqlite").lower()
+                if kind in ("sqlite", "memory"):
+                    store = None
+                    if kind == "sqlite":
+                        try:
+                            store = AnalyticsStore()
+                        except (OSError, sqlite3.Error):
+                            logger.exception("Хранилище статистики недоступно, статистика ведется только в процессе")
+                            store = None
+                    _engine = AnalyticsEngine(store)
+                    if store is not None:
+                        AnalyticsFlusher(_engine).start()
+                        atexit.register(_engine.close)
+                _engine_ready = True
+    return _engine
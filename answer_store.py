@@ -0,0 +1,165 @@
+"""Компактное хранение ответов сессии.
+
+Раньше каждый тест держал в session_state список словарей
+{"type": ..., "answer": ...} и отдельные ключи show_results_*, attempt_* и
+quiz_snapshot_*. Теперь на тест приходится один объект QuizAnswers со
+__slots__: коды ответов (Question.encode) лежат в массиве array('q') по 8
+байт на вопрос, флаги упакованы в одно целое, а свободный текст хранится
+отдельно и только для тех вопросов, где он введен. Все тесты сессии собраны
+в AnswerBook под одним ключом session_state.
+"""
+import json
+import threading
+from array import array
+from typing import Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
+
+from quiz_schema import UNANSWERED, Question, QuestionType, Quiz
+
+# Флаги теста
+SHOW_RESULTS = 1
+# Экзамен завершен: ответы больше не меняются
+LOCKED = 2
+
+
+class QuizAnswers:
+    """Ответы на один тест (вкладку или подраздел) и состояние попытки"""
+
+    __slots__ = ('codes', 'texts', 'flags', 'attempt_id', 'quiz', 'deadline', 'lock')
+
+    def __init__(self, size: int = 0):
+        self.codes = array('q', [UNANSWERED]) * size
+        # Свободный текст: индекс вопроса -> ответ (только непустые)
+        self.texts: Optional[Dict[int, str]] = None
+        self.flags = 0
+        self.attempt_id: Optional[int] = None
+        # Версия теста, закрепленная за начатой попыткой
+        self.quiz: Optional[Quiz] = None
+        # Срок сдачи экзамена (time.time()), None - тест без ограничения времени
+        self.deadline: Optional[float] = None
+        # Попытку экзамена отправляет и поток скрипта, и поток таймера (exam_timer)
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def resize(self, size: int) -> None:
+        """Сбрасывает ответы, если число вопросов теста изменилось"""
+        if len(self.codes) != size:
+            self.codes = array('q', [UNANSWERED]) * size
+            self.texts = None
+
+    def text(self, j: int) -> str:
+        return self.texts.get(j, "") if self.texts else ""
+
+    def set_text(self, j: int, value: str) -> None:
+        if value:
+            if self.texts is None:
+                self.texts = {}
+            self.texts[j] = value
+        elif self.texts:
+            self.texts.pop(j, None)
+            if not self.texts:
+                self.texts = None
+
+    @property
+    def show_results(self) -> bool:
+        return bool(self.flags & SHOW_RESULTS)
+
+    @show_results.setter
+    def show_results(self, value: bool) -> None:
+        self.flags = self.flags | SHOW_RESULTS if value else self.flags & ~SHOW_RESULTS
+
+    @property
+    def locked(self) -> bool:
+        return bool(self.flags & LOCKED)
+
+    @locked.setter
+    def locked(self, value: bool) -> None:
+        self.flags = self.flags | LOCKED if value else self.flags & ~LOCKED
+
+    def to_row(self) -> Tuple[bytes, Optional[str], int, Optional[int]]:
+        """Ответы для внешнего хранилища (state_backend): коды, текст в JSON, флаги, попытка"""
+        texts = json.dumps({str(j): text for j, text in self.texts.items()}, ensure_ascii=False) if self.texts else None
+        return self.codes.tobytes(), texts, self.flags, self.attempt_id
+
+    @classmethod
+    def from_row(cls, row: Tuple[bytes, Optional[str], int, Optional[int]]) -> "QuizAnswers":
+        codes, texts, flags, attempt_id = row
+        answers = cls()
+        answers.codes.frombytes(codes)
+        answers.texts = {int(j): text for j, text in json.loads(texts).items()} if texts else None
+        answers.flags = flags
+        answers.attempt_id = attempt_id
+        return answers
+
+    def any_given(self, questions) -> bool:
+        """Выбран ли хоть какой-то ответ в тесте"""
+        return bool(self.texts) or any(answer_given(question, code) for question, code in zip(questions, self.codes))
+
+
+def answer_given(question: Question, code: int) -> bool:
+    """Выбран ли ответ на вопрос (пустой выбор в multiselect и matching не считается)"""
+    if code == UNANSWERED:
+        return False
+    if question.qtype == QuestionType.MULTI:
+        return code != 0
+    if question.qtype == QuestionType.MATCHING:
+        return any(choice is not None for choice in question.decode_matching(code))
+    return True
+
+
+class AnswerBook:
+    """Ответы всех тестов сессии: суффикс теста -> QuizAnswers"""
+
+    __slots__ = ('quizzes',)
+
+    def __init__(self):
+        self.quizzes: Dict[str, QuizAnswers] = {}
+
+    def get(self, suffix: str) -> Optional[QuizAnswers]:
+        return self.quizzes.get(suffix)
+
+    def quiz(self, suffix: str, size: int) -> QuizAnswers:
+        """Ответы теста с заданным числом вопросов (создаются при первом обращении)"""
+        answers = self.quizzes.get(suffix)
+        if answers is None:
+            answers = self.quizzes[suffix] = QuizAnswers(size)
+        else:
+            answers.resize(size)
+        return answers
+
+    def discard(self, suffix: str) -> None:
+        self.quizzes.pop(suffix, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.quizzes)
+
+
+class SolvedQuizzes:
+    """Тесты сессии, пройденные без ошибок.
+
+    Меняется и потоком скрипта, и потоком таймера экзаменов (exam_timer),
+    поэтому все обращения идут под общей блокировкой, а наружу отдается
+    неизменяемый снимок.
+    """
+
+    __slots__ = ('_quiz_ids', '_lock')
+
+    def __init__(self, quiz_ids: Iterable[str] = ()):
+        self._quiz_ids = set(quiz_ids)
+        self._lock = threading.Lock()
+
+    def mark(self, quiz_id: str, solved: bool) -> None:
+        with self._lock:
+            if solved:
+                self._quiz_ids.add(quiz_id)
+            else:
+                self._quiz_ids.discard(quiz_id)
+
+    def snapshot(self) -> FrozenSet[str]:
+        with self._lock:
+            return frozenset(self._quiz_ids)
+
+    def __contains__(self, quiz_id: object) -> bool:
+        with self._lock:
+            return quiz_id in self._quiz_ids
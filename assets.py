@@ -0,0 +1,52 @@
+"""Статические изображения интерфейса, подготовленные один раз на процесс.
+
+Логотипы рисуются на каждом rerun. Вместо того чтобы каждый раз передавать
+st.image путь к исходному PNG (чтение файла, перекодирование и отправка
+полноразмерной картинки), изображение один раз уменьшается до ширины, в
+которой его показывают, кодируется в PNG и кэшируется в памяти процесса.
+Одинаковые байты Streamlit отдает по одному и тому же URL, поэтому браузер
+берет картинку из своего кэша.
+"""
+import io
+import logging
+import os
+from functools import lru_cache
+from typing import Tuple, Union
+
+from PIL import Image
+
+from quiz_catalog import file_signature
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=32)
+def _encode(path: str, width: int, signature: Tuple[int, int]) -> bytes:
+    """Уменьшает изображение до ширины width и кодирует в PNG.
+
+    signature (mtime_ns, size) входит в ключ кэша, чтобы замена файла подхватывалась.
+    """
+    with Image.open(path) as image:
+        image.load()
+        if image.width <= width:
+            with open(path, 'rb') as f:
+                return f.read()
+        height = max(1, round(image.height * width / image.width))
+        if image.mode == "P":
+            image = image.convert("RGBA")
+        image = image.resize((width, height), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def image_bytes(name: str, width: int) -> Union[bytes, str]:
+    """PNG из images/ под ширину width; если файл не удалось подготовить - путь к нему"""
+    path = os.path.join(ASSETS_DIR, name)
+    try:
+        return _encode(path, width, file_signature(path))
+    except (OSError, ValueError) as exc:
+        logger.warning("Не удалось подготовить изображение %s: %s", path, exc)
+        return path
+
@@ -0,0 +1,93 @@
+"""Бенчмарк загрузки тестов: json.load против бинарного пакета.
+
+Холодный старт - загрузка всех тестов свежим процессом-подобным способом
+(без кэша каталога); поиск - получение одного теста по имени.
+Для оценки выросшего банка вопросов файлы можно размножить (--copies).
+
+Запуск из корня репозитория:
+    python benchmarks/bench_bundle.py --copies 4
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from quiz_bundle import open_bundle, write_bundle  # noqa: E402
+from quiz_catalog import QUIZ_DIR, QUIZ_FILE_PATTERN, file_signature  # noqa: E402
+
+
+def prepare_quiz_dir(target: str, copies: int) -> list:
+    """Копирует тесты в target, размножая их под разными префиксами разделов"""
+    names = []
+    for name in sorted(os.listdir(QUIZ_DIR)):
+        if not QUIZ_FILE_PATTERN.match(name):
+            continue
+        for copy in range(copies):
+            new_name = name if copy == 0 else name.replace("theory_ds_", f"theory_ds_copy{copy}_", 1)
+            shutil.copy(os.path.join(QUIZ_DIR, name), os.path.join(target, new_name))
+            names.append(new_name)
+    return names
+
+
+def timeit(func, repeat: int) -> float:
+    """Среднее время вызова в миллисекундах"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--copies", type=int, default=4, help="во сколько раз размножить банк вопросов")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as quiz_dir:
+        names = prepare_quiz_dir(quiz_dir, args.copies)
+        paths = [os.path.join(quiz_dir, name) for name in names]
+        bundle_path = os.path.join(quiz_dir, "bench.tdsq")
+
+        quizzes = {}
+        for name, path in zip(names, paths):
+            with open(path, 'r', encoding='utf-8') as f:
+                quizzes[name] = (file_signature(path), json.load(f))
+        write_bundle(bundle_path, quizzes)
+
+        def json_cold():
+            for path in paths:
+                with open(path, 'r', encoding='utf-8') as f:
+                    json.load(f)
+
+        def bundle_cold():
+            bundle = open_bundle(bundle_path)
+            for name, path in zip(names, paths):
+                bundle.get(name, file_signature(path))
+            bundle.close()
+
+        bundle = open_bundle(bundle_path)
+        lookup_name, lookup_path = names[len(names) // 2], paths[len(paths) // 2]
+
+        def json_lookup():
+            with open(lookup_path, 'r', encoding='utf-8') as f:
+                json.load(f)
+
+        def bundle_lookup():
+            bundle.get(lookup_name, file_signature(lookup_path))
+
+        json_size = sum(os.path.getsize(p) for p in paths)
+        print(f"тестов: {len(names)}, JSON: {json_size} байт, пакет: {os.path.getsize(bundle_path)} байт")
+        print(f"холодный старт  json.load: {timeit(json_cold, args.repeat):8.3f} ms   пакет: {timeit(bundle_cold, args.repeat):8.3f} ms")
+        print(f"поиск одного    json.load: {timeit(json_lookup, args.repeat * 10):8.3f} ms   пакет: {timeit(bundle_lookup, args.repeat * 10):8.3f} ms")
+        bundle.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
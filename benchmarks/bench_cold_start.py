@@ -0,0 +1,80 @@
+"""Бенчмарк холодного старта: импорт модулей и первый rerun в новом процессе.
+
+Каждый замер идет в отдельном процессе Python (как после развертывания):
+- импорт main.py (streamlit и модули приложения);
+- первый rerun без прогрева (за вычетом запуска самого AppTest) - его платит первый пользователь;
+- первый rerun после warmup.warm_up() и время самого прогрева;
+- второй rerun для сравнения.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Выполняется в новом процессе; печатает JSON с замерами в миллисекундах
+PROBE = r"""
+import json, os, sys, time
+start = time.perf_counter()
+import main
+result = {'import_main': (time.perf_counter() - start) * 1000}
+if sys.argv[1] == 'warm':
+    import warmup
+    start = time.perf_counter()
+    warmup.warm_up(ready_file='')
+    result['warm_up'] = (time.perf_counter() - start) * 1000
+from streamlit.testing.v1 import AppTest
+# Каждый AppTest при первом запуске ищет компоненты в пакетах окружения; на
+# сервере это делается один раз при старте. Их стоимость - первый запуск
+# пустого скрипта (после разового прогрева самого AppTest) - вычитается
+AppTest.from_string('pass').run()
+start = time.perf_counter()
+AppTest.from_string('pass').run()
+overhead = (time.perf_counter() - start) * 1000
+at = AppTest.from_file(os.path.abspath('main.py'), default_timeout=60)
+at.session_state['user_name'] = 'bench'
+for name in ('first_rerun', 'second_rerun'):
+    start = time.perf_counter()
+    at.run()
+    result[name] = (time.perf_counter() - start) * 1000 - (overhead if name == 'first_rerun' else 0)
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+print(json.dumps(result))
+"""
+
+
+def probe(mode: str) -> Dict[str, float]:
+    # Без прогрева фоновый прогрев из main() тоже отключен
+    env = dict(os.environ, PYTHONPATH=ROOT, THEORY_DS_WARM_UP="0" if mode == "cold" else "1")
+    output = subprocess.run([sys.executable, "-c", PROBE, mode], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(name: str, runs: List[Dict[str, float]]) -> None:
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        print(f"{name + ': ' + key:<32} p50={statistics.median(values):7.1f} ms  max={max(values):7.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Первый прогон компилирует .pyc и в замеры не входит
+    probe("cold")
+    report("без прогрева", [probe("cold") for _ in range(args.runs)])
+    report("с прогревом", [probe("warm") for _ in range(args.runs)])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""Бенчмарк задержки rerun после изменения ответа в тесте.
+
+Сравнивает полный перезапуск main() (все вкладки, без фрагментов) с
+перезапуском только фрагмента теста, в котором изменился виджет.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_reruns.py --runs 30
+"""
+import argparse
+import functools
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.local_script_runner as local_script_runner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "main.py")
+
+
+def registered_app(env: Dict[str, str]) -> AppTest:
+    """Создает AppTest с зарегистрированным пользователем"""
+    os.environ.update(env)
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["user_name"] = "bench"
+    at.run()
+    return at
+
+
+def run_fragment(at: AppTest, fragment_id: str) -> None:
+    """Перезапускает только указанный фрагмент, как это делает браузер при изменении виджета"""
+    original = local_script_runner.RerunData
+    local_script_runner.RerunData = functools.partial(
+        original,
+        fragment_id=fragment_id,
+        fragment_id_queue=[fragment_id],
+        is_fragment_scoped_rerun=True,
+    )
+    try:
+        at.run()
+    finally:
+        local_script_runner.RerunData = original
+
+
+def measure(at: AppTest, runs: int, fragment_id: str = None) -> List[float]:
+    """Меняет ответ на первый вопрос и замеряет время rerun в миллисекундах"""
+    timings = []
+    for n in range(runs):
+        radio = at.radio[0]
+        radio.set_value(radio.options[n % len(radio.options)])
+        start = time.perf_counter()
+        if fragment_id is None:
+            at.run()
+        else:
+            run_fragment(at, fragment_id)
+        timings.append((time.perf_counter() - start) * 1000)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return timings
+
+
+def report(name: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<42} p50={statistics.median(timings):7.1f} ms  p95={p95:7.1f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    os.chdir(ROOT)
+
+    at = registered_app({"THEORY_DS_LAZY_TABS": "0", "THEORY_DS_FRAGMENTS": "0"})
+    report("до: все вкладки, полный rerun", measure(at, args.runs))
+
+    at = registered_app({"THEORY_DS_LAZY_TABS": "1", "THEORY_DS_FRAGMENTS": "0"})
+    report("ленивые вкладки, полный rerun", measure(at, args.runs))
+
+    at = registered_app({"THEORY_DS_LAZY_TABS": "1", "THEORY_DS_FRAGMENTS": "1"})
+    fragment_ids = list(at._fragment_storage._fragments)
+    if not fragment_ids:
+        print("Фрагменты недоступны в этой версии Streamlit")
+        return 1
+    report("после: ленивые вкладки, rerun фрагмента", measure(at, args.runs, fragment_ids[-1]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Бенчмарк объема ответов в session_state одной сессии.
+
+Сравнивает прежнее представление (списки словарей answers_*, ключи
+show_results_*, attempt_* и quiz_snapshot_* на каждый тест) с AnswerBook из
+answer_store.py. Все тесты отвечены случайно и показаны с результатами.
+Сами тесты и состояние виджетов одинаковы в обоих вариантах и в объем
+не входят.
+
+Запуск из корня репозитория:
+    python benchmarks/bench_session_memory.py --tabs 13 --questions 10
+"""
+import argparse
+import os
+import random
+import sys
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from answer_store import AnswerBook  # noqa: E402
+from load_test import deep_sizeof  # noqa: E402
+from quiz_catalog import QuizCatalog  # noqa: E402
+from quiz_schema import Question, QuestionType  # noqa: E402
+
+TYPE_NAMES = {
+    QuestionType.SINGLE: "single_choice",
+    QuestionType.MULTI: "multiple_choice",
+    QuestionType.MATCHING: "matching",
+    QuestionType.FREE_TEXT: "free_text",
+}
+
+
+def random_answer(question: Question, rng: random.Random) -> Any:
+    """Ответ в прежнем виде render_question ("answer")"""
+    if question.qtype == QuestionType.SINGLE:
+        return rng.randrange(len(question.options))
+    if question.qtype == QuestionType.MULTI:
+        return sorted(rng.sample(range(len(question.options)), rng.randint(1, len(question.options))))
+    if question.qtype == QuestionType.MATCHING:
+        return [rng.randrange(len(question.options)) for _ in question.pairs_left]
+    return "свободный ответ"
+
+
+def load_questions(tabs: int, questions: int) -> List[List[Question]]:
+    """Первые вопросы tabs тестов каталога (тесты повторяются, если их меньше)"""
+    catalog = QuizCatalog()
+    _, index = catalog.index_snapshot()
+    quizzes = [catalog.load_file(path) for _, entry in sorted(index.items()) for path in entry.values()]
+    quizzes = [quiz for quiz in quizzes if quiz is not None and quiz.questions]
+    return [list(quizzes[n % len(quizzes)].questions[:questions]) for n in range(tabs)]
+
+
+def old_state(tests: List[List[Question]], answers: List[List[Any]], shared: Optional[list]) -> Dict[str, Any]:
+    state: Dict[str, Any] = {}
+    for n, (questions, values) in enumerate(zip(tests, answers)):
+        suffix = str(n)
+        state[f'answers_{suffix}'] = [
+            {"type": TYPE_NAMES[question.qtype], "answer": value} for question, value in zip(questions, values)
+        ]
+        state[f'show_results_{suffix}'] = True
+        state[f'attempt_{suffix}'] = n + 1
+        state[f'quiz_snapshot_{suffix}'] = shared[n] if shared else None
+    return state
+
+
+def new_state(tests: List[List[Question]], answers: List[List[Any]], shared: Optional[list]) -> Dict[str, Any]:
+    book = AnswerBook()
+    for n, (questions, values) in enumerate(zip(tests, answers)):
+        state = book.quiz(str(n), len(questions))
+        for j, (question, value) in enumerate(zip(questions, values)):
+            if question.qtype == QuestionType.FREE_TEXT:
+                state.set_text(j, value)
+            else:
+                state.codes[j] = question.encode(value)
+        state.show_results = True
+        state.attempt_id = n + 1
+        state.quiz = shared[n] if shared else None
+    return {'quiz_answers': book}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tabs", type=int, default=13)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tests = load_questions(args.tabs, args.questions)
+    answers = [[random_answer(question, rng) for question in questions] for questions in tests]
+    # Закрепленные версии тестов - общие объекты каталога, в объем сессии не входят
+    shared = [object() for _ in tests]
+    excluded = {id(item) for item in shared}
+
+    before = deep_sizeof(old_state(tests, answers, shared), set(excluded))
+    after = deep_sizeof(new_state(tests, answers, shared), set(excluded))
+    total = sum(len(questions) for questions in tests)
+    print(f"{args.tabs} тестов x {args.questions} вопросов ({total} ответов)")
+    print(f"до:    {before:8d} байт  ({before / total:6.1f} байт/ответ)")
+    print(f"после: {after:8d} байт  ({after / total:6.1f} байт/ответ)")
+    print(f"сокращение в {before / after:.1f} раза")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
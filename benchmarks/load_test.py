@@ -0,0 +1,182 @@
+"""Нагрузочный тест: много студентов проходят тесты в одном процессе Streamlit.
+
+Каждая смоделированная сессия - отдельный AppTest со своим session_state.
+Сценарий сессии: регистрация через show_registration_form, переключение
+вкладок, выбор ответов и нажатия "Проверить ответы". Шаги сессий чередуются,
+поэтому общие для процесса кэши работают так же, как под живой нагрузкой.
+Сеть не нужна: AppTest выполняет main.py без сервера.
+
+Отчет: p50/p95 задержки rerun, пропускная способность (rerun/с) и объем
+session_state на пользователя. С --workers N сессии делятся между N
+процессами, как при нескольких воркерах streamlit run.
+
+Запуск из корня репозитория:
+    python benchmarks/load_test.py --sessions 20 --rounds 3
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "main.py")
+SECTION_TAB_KEY = "active_tab_theory_ds_1.1"
+TAB_NAMES = [
+    "1. Basic understanding",
+    "2. Linear models",
+    "3. Decision Trees",
+    "4. KNN",
+    "5. LDA/QDA",
+    "6. Dimensionality reduction",
+    "7. Regularisation",
+    "8. ML metrics",
+    "9. Validation",
+]
+
+
+def deep_sizeof(obj: Any, seen: Set[int]) -> int:
+    """Размер объекта вместе с вложенными объектами (общие объекты считаются один раз)"""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, slot), seen)
+                    for slot in obj.__slots__ if slot != '__weakref__' and hasattr(obj, slot))
+    return size
+
+
+def session_state_size(at, shared: Set[int]) -> int:
+    """Объем session_state сессии без объектов, общих для всего процесса (каталог тестов)"""
+    state = at.session_state._state.filtered_state
+    return deep_sizeof(state, set(shared))
+
+
+class SimulatedStudent:
+    """Одна сессия студента с пошаговым сценарием"""
+
+    def __init__(self, number: int, seed: int):
+        from streamlit.testing.v1 import AppTest
+        self.number = number
+        self.random = random.Random(seed)
+        self.at = AppTest.from_file(APP_PATH, default_timeout=60)
+        self.tab = TAB_NAMES[0]
+        self.latencies: List[float] = []
+
+    def _run(self, action) -> None:
+        # Фронтенд каждый раз присылает активную вкладку, AppTest - нет
+        if self.tab != TAB_NAMES[0] and "user_name" in self.at.session_state:
+            self.at.session_state[SECTION_TAB_KEY] = self.tab
+        start = time.perf_counter()
+        action()
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def steps(self):
+        """Сценарий как генератор: один шаг - один rerun"""
+        at = self.at
+        yield self._run(at.run)
+
+        # Регистрация через форму show_registration_form
+        at.text_input[0].input(f"student_{self.number}")
+        yield self._run(at.button[0].click().run)
+
+        while True:
+            self.tab = self.random.choice(TAB_NAMES)
+            at.session_state[SECTION_TAB_KEY] = self.tab
+            yield self._run(at.run)
+
+            # Ответы на несколько вопросов открытой вкладки
+            for radio in self.random.sample(list(at.radio), min(3, len(at.radio))):
+                radio.set_value(self.random.choice(radio.options))
+                yield self._run(at.run)
+
+            apply_buttons = [b for b in at.button if b.label.startswith("Проверить ответы")]
+            if apply_buttons:
+                yield self._run(self.random.choice(apply_buttons).click().run)
+
+
+def run_sessions(args: Tuple[int, int, int, int]) -> Dict[str, Any]:
+    """Прогоняет сессии [first, first+count) по rounds циклов сценария, чередуя шаги"""
+    first, count, rounds, seed = args
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from quiz_catalog import get_catalog
+
+    students = [SimulatedStudent(first + n, seed + first + n) for n in range(count)]
+    scenarios = [student.steps() for student in students]
+    # регистрация (2 шага) + rounds циклов по 5 шагов (вкладка, 3 ответа, проверка)
+    steps_total = 2 + rounds * 5
+
+    start = time.perf_counter()
+    for _ in range(steps_total):
+        for scenario in scenarios:
+            next(scenario)
+    elapsed = time.perf_counter() - start
+
+    # Объекты каталога общие для процесса и не относятся к памяти пользователя
+    shared: Set[int] = set()
+    deep_sizeof(get_catalog()._files, shared)
+    return {
+        'latencies': [lat for student in students for lat in student.latencies],
+        'elapsed': elapsed,
+        'memory': [session_state_size(student.at, shared) for student in students],
+    }
+
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="число смоделированных студентов")
+    parser.add_argument("--rounds", type=int, default=3, help="циклов 'вкладка - ответы - проверка' на студента")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--results-backend", default="none", help="THEORY_DS_RESULTS_BACKEND для прогона")
+    args = parser.parse_args()
+
+    os.environ["THEORY_DS_RESULTS_BACKEND"] = args.results_backend
+    workers = max(1, min(args.workers, args.sessions))
+    per_worker = [args.sessions // workers + (1 if n < args.sessions % workers else 0) for n in range(workers)]
+    chunks = []
+    first = 0
+    for count in per_worker:
+        chunks.append((first, count, args.rounds, args.seed))
+        first += count
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = [run_sessions(chunks[0])]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(run_sessions, chunks)
+    wall = time.perf_counter() - start
+
+    latencies = [lat for result in results for lat in result['latencies']]
+    memory = [size for result in results for size in result['memory']]
+    busy = max(result['elapsed'] for result in results)
+    print(f"сессий: {args.sessions}, процессов: {workers}, rerun: {len(latencies)}, время: {wall:.1f} с")
+    print(f"задержка rerun   p50={statistics.median(latencies):.1f} ms  p95={percentile(latencies, 0.95):.1f} ms  "
+          f"max={max(latencies):.1f} ms")
+    print(f"пропускная способность: {len(latencies) / busy:.1f} rerun/с")
+    print(f"session_state на пользователя: среднее {statistics.mean(memory) / 1024:.1f} КБ, "
+          f"максимум {max(memory) / 1024:.1f} КБ")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Проверяет все тесты в quiz_data и собирает из них бинарный пакет.
+
+Запуск (при деплое, после обновления тестов):
+    python build_quiz_bundle.py
+"""
+import argparse
+import json
+import os
+import sys
+
+from quiz_bundle import BUNDLE_NAME, write_bundle
+from quiz_catalog import QUIZ_DIR, QUIZ_FILE_PATTERN, file_signature
+from quiz_schema import QuizValidationError, normalize_quiz
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Сборка пакета тестов quiz_data")
+    parser.add_argument("--quiz-dir", default=QUIZ_DIR, help="папка с JSON файлами тестов")
+    parser.add_argument("--output", help=f"путь к пакету (по умолчанию <quiz-dir>/{BUNDLE_NAME})")
+    args = parser.parse_args()
+
+    quizzes = {}
+    failed = False
+    for name in sorted(os.listdir(args.quiz_dir)):
+        if not QUIZ_FILE_PATTERN.match(name):
+            continue
+        path = os.path.join(args.quiz_dir, name)
+        signature = file_signature(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"❌ {name}: {e}", file=sys.stderr)
+            failed = True
+            continue
+        try:
+            normalize_quiz(data, os.path.splitext(name)[0])
+        except QuizValidationError as e:
+            for error in e.errors:
+                print(f"❌ {name}: {error}", file=sys.stderr)
+            failed = True
+            continue
+        quizzes[name] = (signature, data)
+
+    if failed:
+        print("Пакет не собран: исправьте ошибки в тестах", file=sys.stderr)
+        return 1
+
+    output = args.output or os.path.join(args.quiz_dir, BUNDLE_NAME)
+    write_bundle(output, quizzes)
+    print(f"✅ {len(quizzes)} тестов -> {output} ({os.path.getsize(output)} байт)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Планировщик сроков экзаменов на время.
+
+Сроки всех начатых экзаменов процесса лежат в одной куче (heapq), и один
+поток-таймер спит до ближайшего срока. Когда срок наступает, таймер вызывает
+обработчик экзамена (автоматическая отправка ответов), поэтому ни браузеру,
+ни скрипту не нужно периодически перезапускаться, чтобы проверить время.
+Отмененные и перенесенные сроки из кучи не удаляются: устаревшая запись
+пропускается, когда до нее доходит очередь.
+
+Длительность экзамена - THEORY_DS_EXAM_MINUTES (по умолчанию 20 минут).
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+EXAM_MINUTES = float(os.environ.get("THEORY_DS_EXAM_MINUTES", "20"))
+logger = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """Куча сроков и один поток, который вызывает обработчики в срок"""
+
+    def __init__(self):
+        # (срок, номер записи, ключ); актуальная запись ключа - в self._entries
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._entries: Dict[Hashable, Tuple[int, float, Callable[[], None]]] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.fired = 0
+        self.errors = 0
+
+    def schedule(self, key: Hashable, deadline: float, callback: Callable[[], None]) -> None:
+        """Назначает (или переносит) срок ключа; callback вызывается в потоке таймера"""
+        with self._condition:
+            entry_id = next(self._counter)
+            self._entries[key] = (entry_id, deadline, callback)
+            heapq.heappush(self._heap, (deadline, entry_id, key))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="exam-deadlines", daemon=True)
+                self._thread.start()
+            # Новый срок мог оказаться ближайшим
+            self._condition.notify()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Отменяет срок; False, если его нет (уже наступил или не назначался)"""
+        with self._condition:
+            return self._entries.pop(key, None) is not None
+
+    def deadline(self, key: Hashable) -> Optional[float]:
+        with self._condition:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def _next_due(self) -> Tuple[Hashable, Callable[[], None]]:
+        """Ждет ближайший актуальный срок и снимает его запись; вызывается под self._condition"""
+        while True:
+            while self._heap and self._entries.get(self._heap[0][2], (None,))[0] != self._heap[0][1]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                self._condition.wait()
+                continue
+            deadline, _, key = self._heap[0]
+            delay = deadline - time.time()
+            if delay > 0:
+                self._condition.wait(delay)
+                continue
+            heapq.heappop(self._heap)
+            return key, self._entries.pop(key)[2]
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                key, callback = self._next_due()
+            try:
+                callback()
+                self.fired += 1
+            except Exception:
+                # Ошибка одного экзамена не должна останавливать таймер остальных
+                self.errors += 1
+                logger.exception("Ошибка обработчика срока %r", key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {'pending': len(self._entries), 'heap': len(self._heap), 'fired': self.fired, 'errors': self.errors}
+
+
+_scheduler: Optional[DeadlineScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_exam_scheduler() -> DeadlineScheduler:
+    """Возвращает общий на процесс планировщик сроков"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = DeadlineScheduler()
+    return _scheduler
@@ -0,0 +1,288 @@
+"""Пакетная проверка ответов, собранных вне интерфейса (экзамены с проктором).
+
+Ответы читаются потоком из JSONL или CSV и проверяются по тем же правилам,
+что и в приложении (скомпилированный ключ grading.AnswerKey: для
+multiple_choice нужно точное совпадение множества вариантов). Отправки
+пачки по одному тесту проверяются одной векторной операцией
+(grading.grade_batch). Результаты пишутся в том же порядке, в одном
+проходе; в памяти одновременно не больше --workers * 2 пачек.
+
+Формат JSONL (одна отправка на строку):
+    {"user_name": "Иван", "quiz_id": "theory_ds_1.1_2.1", "answers": [0, [1, 3], null]}
+Ответ на вопрос - индекс или текст варианта (single_choice), список индексов
+или текстов (multiple_choice), список выборов по левым частям или объект
+"левая часть -> правая" (matching), null - без ответа.
+В CSV - колонки user_name, quiz_id и answers (список в JSON) либо q1, q2, ...
+(индексы или тексты вариантов через "|").
+
+Запуск:
+    python grade_submissions.py submissions.jsonl --output scores.jsonl --workers 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from grading import get_answer_key, grade_batch
+from quiz_catalog import QUIZ_DIR, QuizCatalog
+from quiz_schema import UNANSWERED, Question, QuestionType, Quiz
+
+CHUNK_SIZE = 500
+OUTPUT_COLUMNS = ('user_name', 'quiz_id', 'correct', 'total', 'percent', 'wrong_questions', 'unanswered', 'error')
+
+
+def _option(question: Question, value: Any) -> Optional[int]:
+    """Индекс варианта по индексу или тексту"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if 0 <= value < len(question.options) else None
+    if isinstance(value, str):
+        value = value.strip()
+        if value.isdigit() and value not in question.option_index:
+            return _option(question, int(value))
+        return question.option_index.get(value)
+    return None
+
+
+def parse_answer(question: Question, value: Any) -> Union[int, List[int], List[Optional[int]], str, None]:
+    """Приводит ответ из файла к аргументу Question.encode: индекс, список индексов или выбор пар"""
+    if value is None or value == "" or value == []:
+        return None
+    if question.qtype == QuestionType.SINGLE:
+        return _option(question, value)
+    if question.qtype == QuestionType.MULTI:
+        values = value if isinstance(value, list) else [value]
+        indices = [_option(question, item) for item in values]
+        if any(index is None for index in indices):
+            return None
+        return sorted(set(indices))
+    if question.qtype == QuestionType.MATCHING:
+        if isinstance(value, dict):
+            value = [value.get(left) for left in question.pairs_left]
+        if not isinstance(value, list):
+            return None
+        choices = [_option(question, item) if item is not None else None for item in value]
+        choices += [None] * (len(question.pairs_left) - len(choices))
+        return choices[:len(question.pairs_left)]
+    # Свободный текст не проверяется автоматически
+    return value if isinstance(value, str) else None
+
+
+_catalog: Optional[QuizCatalog] = None
+
+
+def _init_worker(quiz_dir: str) -> None:
+    """Каталог тестов процесса-исполнителя (без фонового наблюдения за папкой)"""
+    global _catalog
+    _catalog = QuizCatalog(quiz_dir)
+
+
+def prepare_submission(submission: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[Quiz], Optional[List[int]]]:
+    """Находит тест и кодирует ответы отправки; ошибки данных возвращаются в поле error"""
+    user_name = str(submission.get('user_name', ""))
+    quiz_id = str(submission.get('quiz_id', ""))
+    result = {'user_name': user_name, 'quiz_id': quiz_id}
+    if 'error' in submission:
+        result['error'] = submission['error']
+        return result, None, None
+    quiz = _catalog.load_quiz(quiz_id) if quiz_id else None
+    answers = submission.get('answers')
+    if quiz is None:
+        result['error'] = f"тест не найден: {quiz_id}"
+        return result, None, None
+    if not isinstance(answers, list):
+        result['error'] = "answers должен быть списком"
+        return result, None, None
+
+    masks = [
+        question.encode(parse_answer(question, answers[j] if j < len(answers) else None))
+        for j, question in enumerate(quiz.questions)
+    ]
+    return result, quiz, masks
+
+
+def grade_submissions(submissions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Проверяет отправки; отправки одного теста - одним вызовом grade_batch"""
+    results = []
+    # quiz_id -> (тест, номера отправок, коды ответов)
+    by_quiz: Dict[str, Tuple[Quiz, List[int], List[List[int]]]] = {}
+    for submission in submissions:
+        result, quiz, masks = prepare_submission(submission)
+        if quiz is not None:
+            group = by_quiz.setdefault(quiz.quiz_id, (quiz, [], []))
+            group[1].append(len(results))
+            group[2].append(masks)
+        results.append(result)
+
+    for quiz, positions, rows in by_quiz.values():
+        key = get_answer_key(quiz.questions)
+        masks = np.asarray(rows, dtype=np.int64).reshape(len(rows), len(key))
+        correct = grade_batch(key, masks)
+        answered = (masks != UNANSWERED) & key.arrays()[1]
+        total = len(key)
+        for position, correct_row, answered_row in zip(positions, correct, answered):
+            score = int(correct_row.sum())
+            results[position].update({
+                'correct': score,
+                'total': total,
+                'percent': round(score / total * 100 if total > 0 else 0, 1),
+                'wrong_questions': (np.flatnonzero(answered_row & ~correct_row) + 1).tolist(),
+                'unanswered': (np.flatnonzero(key.arrays()[1] & ~answered_row) + 1).tolist(),
+            })
+    return results
+
+
+def grade_submission(submission: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверяет одну отправку; ошибки данных возвращаются в поле error"""
+    return grade_submissions([submission])[0]
+
+
+def decode_line(line_number: int, line: str) -> Dict[str, Any]:
+    """Разбирает строку JSONL в отправку"""
+    try:
+        submission = json.loads(line)
+    except json.JSONDecodeError as e:
+        return {'error': f"строка {line_number}: {e}"}
+    return submission if isinstance(submission, dict) else {'error': f"строка {line_number}: ожидается объект"}
+
+
+# Элемент входа: готовая отправка (CSV) или (номер строки, строка JSONL)
+InputItem = Union[Dict[str, Any], Tuple[int, str]]
+
+
+def grade_chunk(chunk: List[InputItem], json_output: bool) -> List[Tuple[bool, Any]]:
+    """Проверяет пачку; возвращает (есть ли ошибка, строка JSONL или словарь для CSV).
+
+    Разбор и сериализация JSON выполняются здесь, в процессе-исполнителе,
+    поэтому основной процесс только читает и пишет файлы.
+    """
+    submissions = [decode_line(*item) if isinstance(item, tuple) else item for item in chunk]
+    return [
+        ('error' in result, json.dumps(result, ensure_ascii=False) if json_output else result)
+        for result in grade_submissions(submissions)
+    ]
+
+
+def read_submissions(path: str) -> Iterator[InputItem]:
+    """Читает отправки из JSONL или CSV (по расширению; "-" - JSONL из stdin)"""
+    if path.lower().endswith('.csv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                if row.get('answers'):
+                    try:
+                        answers = json.loads(row['answers'])
+                    except json.JSONDecodeError:
+                        answers = None
+                else:
+                    columns = sorted((key for key in row if key and key[0] == 'q' and key[1:].isdigit()),
+                                     key=lambda key: int(key[1:]))
+                    answers = [
+                        row[key].split('|') if '|' in (row[key] or "") else (row[key] or None)
+                        for key in columns
+                    ]
+                yield {'user_name': row.get('user_name', ""), 'quiz_id': row.get('quiz_id', ""), 'answers': answers}
+        return
+
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                yield line_number, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class ResultWriter:
+    """Потоковая запись результатов в JSONL или CSV"""
+
+    def __init__(self, path: str):
+        self._file = sys.stdout if path == '-' else open(path, 'w', encoding='utf-8', newline='')
+        self._csv = csv.DictWriter(self._file, OUTPUT_COLUMNS) if path.lower().endswith('.csv') else None
+        if self._csv is not None:
+            self._csv.writeheader()
+
+    @property
+    def json_output(self) -> bool:
+        return self._csv is None
+
+    def write(self, payload: Any) -> None:
+        if self._csv is not None:
+            row = dict(payload)
+            for key in ('wrong_questions', 'unanswered'):
+                if key in row:
+                    row[key] = ' '.join(str(n) for n in row[key])
+            self._csv.writerow(row)
+        else:
+            self._file.write(payload + "\n")
+
+    def close(self) -> None:
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def chunks(items: Iterator[InputItem], size: int) -> Iterator[List[InputItem]]:
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Пакетная проверка ответов из JSONL/CSV")
+    parser.add_argument("input", help="файл с ответами (.jsonl или .csv; '-' - JSONL из stdin)")
+    parser.add_argument("--output", default="-", help="куда писать результаты (.jsonl или .csv; по умолчанию stdout)")
+    parser.add_argument("--quiz-dir", default=QUIZ_DIR, help="папка с JSON файлами тестов")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="число процессов")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="отправок в одной пачке")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    writer = ResultWriter(args.output)
+    graded = 0
+    failed = 0
+
+    def emit(results: List[Tuple[bool, Any]]) -> None:
+        nonlocal graded, failed
+        for has_error, payload in results:
+            writer.write(payload)
+            graded += 1
+            failed += has_error
+
+    submissions = read_submissions(args.input)
+    try:
+        if args.workers <= 1:
+            _init_worker(args.quiz_dir)
+            for chunk in chunks(submissions, args.chunk_size):
+                emit(grade_chunk(chunk, writer.json_output))
+        else:
+            with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.quiz_dir,)) as pool:
+                # Пачки в работе; результаты забираются по порядку, поэтому память ограничена
+                in_flight: "deque[Future]" = deque()
+                for chunk in chunks(submissions, args.chunk_size):
+                    in_flight.append(pool.submit(grade_chunk, chunk, writer.json_output))
+                    if len(in_flight) >= args.workers * 2:
+                        emit(in_flight.popleft().result())
+                while in_flight:
+                    emit(in_flight.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ проверено {graded} отправок ({failed} с ошибками) за {elapsed:.1f} с "
+          f"({graded / elapsed if elapsed > 0 else 0:.0f}/с)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Проверка ответов по заранее скомпилированному ключу теста.
+
+Каждый тест один раз превращается в AnswerKey: целочисленные коды типов
+вопросов (QuestionType) и битовые маски правильных вариантов (для matching -
+код правильного сопоставления). Ответ пользователя тоже кодируется числом,
+поэтому проверка вопроса - одно сравнение, а пакет из N попыток по M
+вопросам проверяется одной векторной операцией NumPy.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from instrumentation import timed
+from quiz_schema import UNANSWERED, Question
+
+
+def mask_indices(mask: int) -> List[int]:
+    """Раскладывает битовую маску обратно в отсортированные индексы вариантов"""
+    indices = []
+    index = 0
+    while mask:
+        if mask & 1:
+            indices.append(index)
+        mask >>= 1
+        index += 1
+    return indices
+
+
+class AnswerKey:
+    """Скомпилированный ключ ответов одного теста"""
+
+    __slots__ = ('type_codes', 'correct_masks', 'gradable', '_arrays')
+
+    def __init__(self, type_codes: Tuple[int, ...], correct_masks: Tuple[int, ...], gradable: Tuple[bool, ...]):
+        self.type_codes = type_codes
+        self.correct_masks = correct_masks
+        # Вопросы, которые проверяются автоматически
+        self.gradable = gradable
+        self._arrays = None
+
+    def __len__(self) -> int:
+        return len(self.type_codes)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Маски правильных ответов и флаги проверяемости в виде массивов NumPy"""
+        if self._arrays is None:
+            self._arrays = (
+                np.asarray(self.correct_masks, dtype=np.int64),
+                np.asarray(self.gradable, dtype=bool),
+            )
+        return self._arrays
+
+
+def compile_answer_key(questions: Sequence[Question]) -> AnswerKey:
+    """Компилирует ключ ответов по нормализованным вопросам теста"""
+    return AnswerKey(
+        tuple(int(question.qtype) for question in questions),
+        tuple(question.correct_mask for question in questions),
+        tuple(question.gradable for question in questions),
+    )
+
+
+_KEY_CACHE_SIZE = 256
+_key_cache: "OrderedDict[Tuple[Question, ...], AnswerKey]" = OrderedDict()
+_key_cache_lock = threading.Lock()
+
+
+def get_answer_key(questions: Sequence[Question]) -> AnswerKey:
+    """Возвращает ключ ответов, компилируя его один раз для каждого списка вопросов.
+
+    Вопросы из каталога общие для всего процесса и сравниваются по
+    идентичности, поэтому ключ кэша - сами вопросы: кэш держит ссылки на них,
+    и другой список вопросов не может получить чужой ключ.
+    """
+    cache_key = tuple(questions)
+    with _key_cache_lock:
+        key = _key_cache.get(cache_key)
+        if key is not None:
+            _key_cache.move_to_end(cache_key)
+            return key
+    key = compile_answer_key(questions)
+    with _key_cache_lock:
+        key = _key_cache.setdefault(cache_key, key)
+        if len(_key_cache) > _KEY_CACHE_SIZE:
+            _key_cache.popitem(last=False)
+    return key
+
+
+class GradeResult:
+    """Результат проверки одной попытки"""
+
+    __slots__ = ('correct_flags', 'answered_flags', 'gradable_flags', 'correct', 'total')
+
+    def __init__(self, correct_flags: Tuple[bool, ...], answered_flags: Tuple[bool, ...],
+                 gradable_flags: Tuple[bool, ...]):
+        self.correct_flags = correct_flags
+        self.answered_flags = answered_flags
+        self.gradable_flags = gradable_flags
+        self.correct = sum(correct_flags)
+        self.total = len(correct_flags)
+
+    @property
+    def percent(self) -> float:
+        return (self.correct / self.total * 100) if self.total > 0 else 0
+
+    def wrong_indices(self) -> List[int]:
+        """Индексы проверяемых вопросов, ответ на которые не засчитан (в том числе без ответа)"""
+        return [
+            j for j, (gradable, correct) in enumerate(zip(self.gradable_flags, self.correct_flags))
+            if gradable and not correct
+        ]
+
+
+@timed()
+def grade_masks(key: AnswerKey, masks: Sequence[int]) -> GradeResult:
+    """Проверяет одну попытку, заданную масками ответов"""
+    answered = tuple(
+        mask != UNANSWERED and gradable
+        for mask, gradable in zip(masks, key.gradable)
+    )
+    correct = tuple(
+        is_answered and mask == correct_mask
+        for is_answered, mask, correct_mask in zip(answered, masks, key.correct_masks)
+    )
+    # Вопросы без ответа (zip короче) считаются неотвеченными
+    missing = len(key) - len(correct)
+    if missing > 0:
+        answered += (False,) * missing
+        correct += (False,) * missing
+    return GradeResult(correct, answered, key.gradable)
+
+
+def grade_batch(key: AnswerKey, masks: np.ndarray) -> np.ndarray:
+    """Векторно проверяет N попыток по M вопросам.
+
+    masks - массив int64 формы (N, M) с масками ответов (UNANSWERED для пропусков).
+    Возвращает булев массив (N, M) правильных ответов; сумма по оси 1 - баллы.
+    """
+    correct_masks, gradable = key.arrays()
+    masks = np.asarray(masks, dtype=np.int64)
+    return (masks == correct_masks) & (masks != UNANSWERED) & gradable
@@ -0,0 +1,147 @@
+"""Необязательные замеры времени горячих функций приложения.
+
+Включаются переменной окружения THEORY_DS_PROFILE=1. В выключенном виде
+декоратор timed возвращает функцию без изменений, поэтому накладных расходов
+нет. Во включенном виде каждый вызов кладет (имя, длительность) в кольцевой
+буфер процесса; по нему строится сводка для панели администратора в sidebar
+и текстовый файл метрик в формате Prometheus (THEORY_DS_METRICS_FILE).
+
+Панели администратора открываются ключом THEORY_DS_ADMIN_TOKEN, который
+знает только сервер: имя пользователя вводит кто угодно, поэтому доступ по
+нему не проверяется.
+"""
+import functools
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROFILE_ENABLED = os.environ.get("THEORY_DS_PROFILE", "0") == "1"
+METRICS_FILE = os.environ.get("THEORY_DS_METRICS_FILE", "")
+# Ключ администратора; без него панели администратора не открываются никому
+ADMIN_TOKEN = os.environ.get("THEORY_DS_ADMIN_TOKEN", "")
+
+RING_SIZE = 10000
+# Не чаще, чем раз в столько секунд, файл метрик перезаписывается из rerun
+EXPORT_INTERVAL = 10.0
+
+
+class TimingRecorder:
+    """Кольцевой буфер последних вызовов плюс накопительные счетчики по функциям"""
+
+    def __init__(self, size: int = RING_SIZE):
+        self._ring: "deque[Tuple[str, float]]" = deque(maxlen=size)
+        # имя -> [число вызовов, суммарное время в секундах]
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._ring.append((name, seconds))
+            totals = self._totals.get(name)
+            if totals is None:
+                self._totals[name] = [1, seconds]
+            else:
+                totals[0] += 1
+                totals[1] += seconds
+
+    def summary(self) -> List[Dict[str, float]]:
+        """Сводка по функциям: вызовы, суммарное время и p50/p95 по кольцевому буферу (мс)"""
+        with self._lock:
+            recent = list(self._ring)
+            totals = {name: tuple(values) for name, values in self._totals.items()}
+        samples: Dict[str, List[float]] = {}
+        for name, seconds in recent:
+            samples.setdefault(name, []).append(seconds * 1000)
+        rows = []
+        for name, (count, total) in sorted(totals.items()):
+            values = sorted(samples.get(name, [0.0]))
+            rows.append({
+                'function': name,
+                'calls': int(count),
+                'total_ms': total * 1000,
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+            })
+        return rows
+
+    def prometheus_text(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        lines = [
+            "# HELP theory_ds_calls_total Number of calls of an instrumented function.",
+            "# TYPE theory_ds_calls_total counter",
+        ]
+        rows = self.summary()
+        for row in rows:
+            lines.append(f'theory_ds_calls_total{{function="{row["function"]}"}} {row["calls"]}')
+        lines += [
+            "# HELP theory_ds_call_seconds_total Total time spent in an instrumented function.",
+            "# TYPE theory_ds_call_seconds_total counter",
+        ]
+        for row in rows:
+            lines.append(f'theory_ds_call_seconds_total{{function="{row["function"]}"}} {row["total_ms"] / 1000:.6f}')
+        lines += [
+            "# HELP theory_ds_call_seconds Recent call latency quantiles.",
+            "# TYPE theory_ds_call_seconds summary",
+        ]
+        for row in rows:
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                lines.append(
+                    f'theory_ds_call_seconds{{function="{row["function"]}",quantile="{quantile}"}} {row[key] / 1000:.6f}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Optional[str] = None) -> Optional[str]:
+        """Атомарно записывает метрики в файл (по умолчанию THEORY_DS_METRICS_FILE)"""
+        path = path or METRICS_FILE
+        if not path:
+            return None
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+    def maybe_export(self) -> None:
+        """Обновляет файл метрик, если с прошлой записи прошло EXPORT_INTERVAL секунд"""
+        now = time.monotonic()
+        if not METRICS_FILE or now - self._last_export < EXPORT_INTERVAL:
+            return
+        self._last_export = now
+        try:
+            self.export()
+        except OSError:
+            pass
+
+
+recorder = TimingRecorder()
+
+
+def timed(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Декоратор замера времени; при выключенном профилировании ничего не делает"""
+    def decorator(func: Callable) -> Callable:
+        if not PROFILE_ENABLED:
+            return func
+        label = name or func.__name__
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                recorder.record(label, perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def check_admin_token(token: str, admin_token: Optional[str] = None) -> bool:
+    """Совпадает ли введенный ключ с ключом администратора (сравнение за постоянное время)"""
+    admin_token = ADMIN_TOKEN if admin_token is None else admin_token
+    if not admin_token or not token:
+        return False
+    return secrets.compare_digest(token.encode('utf-8'), admin_token.encode('utf-8'))
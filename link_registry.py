@@ -0,0 +1,270 @@
+"""Реестр ссылок на материалы (pdf_links) и их асинхронная проверка.
+
+Ссылки всех тестов собираются в один реестр без повторов. Метаданные ссылки
+(название, размер, код ответа, время проверки) хранятся в JSON кэше
+quiz_data/links.json (путь - THEORY_DS_LINK_CACHE). Приложение в сеть не
+ходит: список материалов строится по кэшу, а непроверенные ссылки
+показываются как раньше. Кэш обновляет проверка из командной строки:
+
+    python link_registry.py --connections 8 --max-age 24
+
+Проверка идет параллельно на asyncio: одновременно открыто не больше
+--connections соединений, на каждую ссылку - один GET (с переходом по
+перенаправлениям), тело читается только до <title> HTML страницы.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import ssl
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote, urljoin, urlsplit
+
+from quiz_catalog import QUIZ_DIR, QuizCatalog, file_signature, get_catalog
+
+LINK_CACHE = os.environ.get("THEORY_DS_LINK_CACHE", os.path.join(QUIZ_DIR, "links.json"))
+MAX_CONNECTIONS = 8
+TIMEOUT = 10.0
+MAX_REDIRECTS = 5
+# Сколько байт HTML страницы читается в поисках <title>
+TITLE_BYTES = 64 * 1024
+USER_AGENT = "theory-ds-link-checker/1.0"
+
+TITLE_PATTERN = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+# Хвост названия страницы файла Google Drive
+TITLE_SUFFIX_PATTERN = re.compile(r"\s+-\s+Google\s+\S+$")
+FILENAME_PATTERN = re.compile(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", re.IGNORECASE)
+
+
+class LinkInfo(NamedTuple):
+    """Метаданные ссылки; ok=None - доступность неизвестна (не проверяли или сеть недоступна)"""
+    url: str
+    title: str = ""
+    size: Optional[int] = None
+    content_type: str = ""
+    status: Optional[int] = None
+    ok: Optional[bool] = None
+    error: str = ""
+    checked_at: Optional[float] = None
+
+    def details(self) -> str:
+        """Подпись под ссылкой: тип и размер или причина недоступности"""
+        if self.ok is False:
+            return f"⚠️ Материал недоступен ({self.status or self.error})"
+        parts = []
+        if "pdf" in self.content_type:
+            parts.append("PDF")
+        if self.size:
+            parts.append(f"{self.size / 1024 / 1024:.1f} МБ" if self.size >= 1024 * 1024 else f"{self.size // 1024 or 1} КБ")
+        return ", ".join(parts)
+
+
+def _title_from(url: str, headers: Dict[str, str], body: bytes) -> str:
+    """Название материала: <title> страницы, имя файла из заголовков или из адреса"""
+    match = TITLE_PATTERN.search(body)
+    if match:
+        title = re.sub(r"\s+", " ", match.group(1).decode('utf-8', 'replace')).strip()
+        return TITLE_SUFFIX_PATTERN.sub("", title)
+    match = FILENAME_PATTERN.search(headers.get('content-disposition', ''))
+    if match:
+        return unquote(match.group(1)).strip()
+    name = unquote(urlsplit(url).path.rsplit('/', 1)[-1])
+    return name if '.' in name else ""
+
+
+async def _get(url: str, ssl_context: ssl.SSLContext) -> Tuple[int, Dict[str, str], bytes]:
+    """Один GET без повторного использования соединения: (код, заголовки, начало тела)"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f"неподдерживаемый адрес: {url}")
+    https = parts.scheme == 'https'
+    port = parts.port or (443 if https else 80)
+    reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=ssl_context if https else None)
+    try:
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else "")
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n"
+            f"Accept: */*\r\nConnection: close\r\n\r\n".encode('latin-1')
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        fields = status_line.split(None, 2)
+        if len(fields) < 2 or not fields[1].isdigit():
+            raise ValueError(f"некорректный ответ: {status_line[:80]!r}")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        body = b""
+        if 'html' in headers.get('content-type', ''):
+            while len(body) < TITLE_BYTES and not TITLE_PATTERN.search(body):
+                chunk = await reader.read(TITLE_BYTES - len(body))
+                if not chunk:
+                    break
+                body += chunk
+        return int(fields[1]), headers, body
+    finally:
+        writer.close()
+
+
+async def fetch_info(url: str, semaphore: asyncio.Semaphore, timeout: float = TIMEOUT,
+                     ssl_context: Optional[ssl.SSLContext] = None) -> LinkInfo:
+    """Проверяет одну ссылку (с переходом по перенаправлениям)"""
+    ssl_context = ssl_context or ssl.create_default_context()
+    target = url
+    async with semaphore:
+        try:
+            for _ in range(MAX_REDIRECTS + 1):
+                status, headers, body = await asyncio.wait_for(_get(target, ssl_context), timeout)
+                if status in (301, 302, 303, 307, 308) and headers.get('location'):
+                    target = urljoin(target, headers['location'])
+                    continue
+                break
+            else:
+                return LinkInfo(url, error="слишком много перенаправлений", checked_at=time.time())
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            # Сетевая ошибка не значит, что материал удален: доступность остается неизвестной
+            return LinkInfo(url, error=type(e).__name__ if isinstance(e, asyncio.TimeoutError) else str(e)[:200],
+                            checked_at=time.time())
+    length = headers.get('content-length', '')
+    return LinkInfo(
+        url,
+        title=_title_from(target, headers, body),
+        size=int(length) if length.isdigit() and 'html' not in headers.get('content-type', '') else None,
+        content_type=headers.get('content-type', '').split(';')[0].strip(),
+        status=status,
+        ok=200 <= status < 400,
+        checked_at=time.time(),
+    )
+
+
+async def check_links(urls: Iterable[str], max_connections: int = MAX_CONNECTIONS,
+                      timeout: float = TIMEOUT) -> Dict[str, LinkInfo]:
+    """Проверяет ссылки параллельно, не больше max_connections соединений одновременно"""
+    semaphore = asyncio.Semaphore(max_connections)
+    ssl_context = ssl.create_default_context()
+    urls = list(dict.fromkeys(urls))
+    infos = await asyncio.gather(*(fetch_info(url, semaphore, timeout, ssl_context) for url in urls))
+    return dict(zip(urls, infos))
+
+
+def load_cache(path: str = LINK_CACHE) -> Dict[str, LinkInfo]:
+    """Читает кэш метаданных (пустой, если файла нет или он поврежден)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    fields = set(LinkInfo._fields)
+    return {
+        item['url']: LinkInfo(**{key: value for key, value in item.items() if key in fields})
+        for item in raw.get('links', []) if isinstance(item, dict) and 'url' in item
+    }
+
+
+def save_cache(infos: Dict[str, LinkInfo], path: str = LINK_CACHE) -> None:
+    """Записывает кэш атомарно (через временный файл)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'links': [info._asdict() for _, info in sorted(infos.items())]}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def collect_links(catalog: QuizCatalog) -> Dict[str, List[str]]:
+    """Все ссылки каталога без повторов: адрес -> тесты, где он встречается"""
+    _, index = catalog.index_snapshot()
+    links: Dict[str, List[str]] = {}
+    for key in sorted(index):
+        for path in index[key].values():
+            quiz = catalog.load_file(path)
+            if quiz is not None:
+                for url in quiz.pdf_links:
+                    quiz_ids = links.setdefault(url, [])
+                    if quiz.quiz_id not in quiz_ids:
+                        quiz_ids.append(quiz.quiz_id)
+    return links
+
+
+class LinkRegistry:
+    """Ссылки всех тестов с метаданными из кэша"""
+
+    def __init__(self, links: Dict[str, List[str]], cached: Dict[str, LinkInfo], version: tuple):
+        self.version = version
+        self.quizzes = links
+        self.links: Dict[str, LinkInfo] = {url: cached.get(url) or LinkInfo(url) for url in links}
+
+    def info(self, url: str) -> LinkInfo:
+        return self.links.get(url) or LinkInfo(url)
+
+    def materials(self, urls: Iterable[str]) -> List[LinkInfo]:
+        """Метаданные ссылок теста в исходном порядке"""
+        return [self.info(url) for url in urls]
+
+
+_registry: Optional[LinkRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_link_registry(catalog: Optional[QuizCatalog] = None, cache_path: str = LINK_CACHE) -> LinkRegistry:
+    """Возвращает реестр процесса; он строится заново после изменения тестов или кэша"""
+    global _registry
+    catalog = catalog or get_catalog()
+    version = (catalog.content_version(), file_signature(cache_path))
+    registry = _registry
+    if registry is not None and registry.version == version:
+        return registry
+    with _registry_lock:
+        if _registry is None or _registry.version != version:
+            _registry = LinkRegistry(collect_links(catalog), load_cache(cache_path), version)
+        return _registry
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Проверка ссылок на материалы и обновление кэша")
+    parser.add_argument("--quiz-dir", default=QUIZ_DIR, help="папка с JSON файлами тестов")
+    parser.add_argument("--cache", default=LINK_CACHE, help="файл кэша метаданных")
+    parser.add_argument("--connections", type=int, default=MAX_CONNECTIONS, help="одновременных соединений")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="таймаут одной ссылки, с")
+    parser.add_argument("--max-age", type=float, default=0,
+                        help="не проверять ссылки, проверенные не раньше стольких часов назад (0 - все)")
+    args = parser.parse_args()
+
+    links = collect_links(QuizCatalog(args.quiz_dir))
+    cached = load_cache(args.cache)
+    fresh_after = time.time() - args.max_age * 3600
+    stale = [url for url in links
+             if args.max_age <= 0 or url not in cached or (cached[url].checked_at or 0) < fresh_after]
+
+    start = time.perf_counter()
+    checked = asyncio.run(check_links(stale, args.connections, args.timeout)) if stale else {}
+    infos = {}
+    for url in links:
+        info = checked.get(url)
+        previous = cached.get(url)
+        # При сетевой ошибке сохраняются результаты прошлой проверки
+        if info is None or info.ok is None and previous is not None:
+            info = previous._replace(error=info.error) if info is not None else previous
+        infos[url] = info or LinkInfo(url)
+    save_cache(infos, args.cache)
+
+    broken = [info for info in checked.values() if info.ok is False]
+    failed = [info for info in checked.values() if info.ok is None]
+    for info in broken + failed:
+        print(f"⚠️ {info.url}: {info.status or info.error} ({', '.join(links[info.url])})", file=sys.stderr)
+    print(f"✅ ссылок: {len(links)}, проверено: {len(checked) - len(failed)}, недоступно: {len(broken)}, "
+          f"ошибок сети: {len(failed)} за {time.perf_counter() - start:.1f} с", file=sys.stderr)
+    return 1 if broken else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,51 @@
+import functools
+import os
+import re
+import secrets
+import time
 import streamlit as st
-import json
-from typing import Dict, List, Any, Optional
-from datetime import datetime
+from typing import List, Any, Optional, Sequence, Tuple, Union
+
+from analytics import get_analytics
+from answer_store import AnswerBook, QuizAnswers, SolvedQuizzes
+from assets import image_bytes
+from exam_timer import EXAM_MINUTES, get_exam_scheduler
+from instrumentation import ADMIN_TOKEN, PROFILE_ENABLED, check_admin_token, recorder, timed
+from link_registry import get_link_registry
+from grading import GradeResult, get_answer_key, grade_masks, mask_indices
+from practice import compose_practice, get_tag_index, mistake_set
+from quiz_catalog import get_catalog
+from quiz_schema import UNANSWERED, Question, QuestionType, Quiz
+from results_backend import get_results_writer
+from reports import REPORT_FORMATS, ReportCache, build_report, iter_report
+from results_store import AttemptRecord, ResultsStore
+from search import get_search_index
+from section_registry import DEFAULT_SECTION, SECTION_PREFIXES, SECTIONS, TabEntry, get_registry
+from state_backend import SESSION_TTL_DAYS, get_state_store
+from variants import VARIANTS_ENABLED, VariantQuiz, get_variant, same_version, variant_seed
+from warmup import start_warm_up, warm_up_status
+
+# Ленивый режим: строится только открытая вкладка раздела (THEORY_DS_LAZY_TABS=0 отключает)
+LAZY_TABS = os.environ.get("THEORY_DS_LAZY_TABS", "1") != "0"
+
+# Каждый тест - отдельный фрагмент: изменение ответа перезапускает только его
+# (THEORY_DS_FRAGMENTS=0 отключает)
+USE_FRAGMENTS = os.environ.get("THEORY_DS_FRAGMENTS", "1") != "0"
+
+# Cookie с секретом сессии в общем хранилище (state_backend). В адрес страницы
+# секрет не попадает: адресом делятся ссылками на разделы, а по секрету
+# восстанавливаются чужие ответы
+SESSION_COOKIE = "theory_ds_session"
+SESSION_SECRET_PATTERN = re.compile(r"[A-Za-z0-9_-]{32,128}")
+# Параметр адреса, в котором секрет раньше передавался; из адреса он убирается
+LEGACY_SESSION_PARAM = "sid"
 
 def show_registration_form():
     """Показывает форму регистрации и возвращает имя пользователя"""
     # Логотип и заголовок регистрации
     col1, col2 = st.columns([1, 3])
     with col1:
-        st.image("images/image_innowise2.png", width=200)
+        st.image(image_bytes("image_innowise2.png", 200), width=200)
     with col2:
         st.markdown("## 👤 Регистрация")
         st.markdown("Введите ваше имя для начала тестирования:")
@@ -26,190 +63,624 @@ def show_registration_form():
     
     return None
 
+def get_results_store() -> ResultsStore:
+    """Возвращает хранилище попыток пользователя из session_state"""
+    if 'results_store' not in st.session_state:
+        st.session_state['results_store'] = ResultsStore()
+    return st.session_state['results_store']
+
+def get_answer_book() -> AnswerBook:
+    """Ответы всех тестов сессии (один объект в session_state)"""
+    if 'quiz_answers' not in st.session_state:
+        st.session_state['quiz_answers'] = AnswerBook()
+    return st.session_state['quiz_answers']
+
+def get_solved_quizzes() -> SolvedQuizzes:
+    """Тесты сессии, пройденные без ошибок (общие с потоком таймера экзаменов)"""
+    if 'solved_quizzes' not in st.session_state:
+        st.session_state['solved_quizzes'] = SolvedQuizzes()
+    return st.session_state['solved_quizzes']
+
+def set_session_cookie(session_id: str):
+    """Записывает секрет сессии в cookie браузера (Streamlit не умеет ставить cookie с сервера)"""
+    st.html(
+        f"<script>document.cookie = '{SESSION_COOKIE}={session_id}; path=/; "
+        f"max-age={int(SESSION_TTL_DAYS * 86400)}; SameSite=Strict' + "
+        f"(location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True,
+    )
+
+def restore_session():
+    """Восстанавливает сессию из общего хранилища по секрету из cookie (один раз за сессию)"""
+    state_store = get_state_store()
+    if state_store is None or 'session_id' in st.session_state:
+        return
+    st.query_params.pop(LEGACY_SESSION_PARAM, None)
+    session_id = st.context.cookies.get(SESSION_COOKIE)
+    if not isinstance(session_id, str) or not SESSION_SECRET_PATTERN.fullmatch(session_id):
+        session_id = None
+    snapshot = state_store.load(session_id) if session_id else None
+    if not session_id:
+        session_id = secrets.token_urlsafe(32)
+        set_session_cookie(session_id)
+    st.session_state['session_id'] = session_id
+    if snapshot is None or not snapshot.user_name:
+        return
+    
+    # Пользователь попал в другой процесс: регистрация, ответы и попытки берутся из хранилища
+    st.session_state['user_name'] = snapshot.user_name
+    book = AnswerBook()
+    for suffix, row in snapshot.answers.items():
+        book.quizzes[suffix] = QuizAnswers.from_row(row)
+    st.session_state['quiz_answers'] = book
+    store = ResultsStore()
+    next_attempt_id = max((answers.attempt_id or 0 for answers in book.quizzes.values()), default=0) + 1
+    store.restore(snapshot.store_id or store.store_id, list(snapshot.attempts.values()), next_attempt_id)
+    st.session_state['results_store'] = store
+    st.session_state['solved_quizzes'] = SolvedQuizzes(snapshot.solved)
+
+def persist_session():
+    """Записывает регистрацию и пройденные тесты в общее хранилище (если оно включено)"""
+    state_store = get_state_store()
+    session_id = st.session_state.get('session_id')
+    if state_store is None or session_id is None or 'user_name' not in st.session_state:
+        return
+    state_store.save_session(session_id, st.session_state['user_name'], get_results_store().store_id,
+                             get_solved_quizzes().snapshot())
+
+def persist_answers(suffix: str, answers: QuizAnswers):
+    """Записывает ответы теста в общее хранилище; неизмененные ответы не пишутся"""
+    state_store = get_state_store()
+    session_id = st.session_state.get('session_id')
+    if state_store is not None and session_id is not None:
+        state_store.save_answers(session_id, suffix, answers)
+
+def get_report_cache() -> ReportCache:
+    """Кэш готовых фрагментов отчета сессии"""
+    if 'report_cache' not in st.session_state:
+        st.session_state['report_cache'] = ReportCache()
+    return st.session_state['report_cache']
+
 def get_user_results_content(user_name: str) -> str:
-    """Возвращает содержимое результатов пользователя из session_state"""
-    if 'user_results' not in st.session_state:
-        st.session_state['user_results'] = ""
-    return st.session_state['user_results']
+    """Формирует текстовый отчет по попыткам пользователя из session_state"""
+    return ''.join(iter_report(get_results_store(), user_name, get_catalog().load_quiz, 'txt', get_report_cache()))
 
+@timed()
 def save_wrong_answers(user_name: str, section_name: str, subsection_name: str, 
-                      questions: List[Dict], user_answers: List[Dict], 
-                      pdf_links: List[str] = None):
+                      quiz: Quiz, masks: Sequence[int], result: Optional[GradeResult] = None,
+                      attempt_id: Optional[int] = None):
     """Сохраняет неправильные ответы в session_state"""
-    # Инициализируем результаты в session_state если их нет
-    if 'user_results' not in st.session_state:
-        st.session_state['user_results'] = ""
-    
-    # Собираем неправильные ответы и считаем статистику
-    wrong_answers = []
-    total_questions = len(questions)
-    correct_answers = 0
-    
-    for i, (question, user_answer) in enumerate(zip(questions, user_answers)):
-        if user_answer is None:
-            continue
-            
-        is_wrong = False
-        if question['question_type'] == 'single_choice':
-            if user_answer.get('answer') != question['correct_answer']:
-                is_wrong = True
-        elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-            if set(user_answer.get('answer', [])) != set(question.get('correct_answers', [])):
-                is_wrong = True
-        
-        if is_wrong:
-            # Получаем текст ответа пользователя
-            user_answer_text = ""
-            if question['question_type'] == 'single_choice':
-                user_choice = user_answer.get('answer')
-                if user_choice is not None:
-                    user_answer_text = question['options'][user_choice]
-                else:
-                    user_answer_text = "Не выбрано"
-            elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-                user_choices = user_answer.get('answer', [])
-                if user_choices:
-                    user_answer_text = ', '.join([question['options'][i] for i in user_choices])
-                else:
-                    user_answer_text = "Не выбрано"
-            
-            wrong_answers.append({
-                'question_number': i + 1,
-                'question_text': question['question_text'],
-                'user_answer_text': user_answer_text
-            })
-        else:
-            correct_answers += 1
-    
-    # Вычисляем процент правильных ответов
-    correct_percentage = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+    store = get_results_store()
     
-    # Формируем текст для записи
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Проверка уже могла быть выполнена при отображении результатов
+    if result is None:
+        result = grade_masks(get_answer_key(quiz.questions), masks)
     
-    result_text = f"""
-{'='*60}
-Результаты тестирования - {user_name}
-Дата: {timestamp}
-Раздел: {section_name}
-Подраздел: {subsection_name}
+    store_attempt(store, user_name, section_name, subsection_name, masks, result,
+                  quiz, attempt_id, st.session_state.get('session_id'))
+    st.success(f"📝 Результаты сохранены в память приложения")
 
-📊 Статистика:
-Правильных ответов: {correct_answers}/{total_questions} ({correct_percentage:.1f}%)
+def store_attempt(store: ResultsStore, user_name: str, section_name: str, subsection_name: str,
+                  masks: Sequence[int], result: GradeResult, quiz: Quiz,
+                  attempt_id: Optional[int] = None, session_id: Optional[str] = None) -> AttemptRecord:
+    """Сохраняет проверенную попытку в хранилище пользователя (без обращения к session_state).
 
-"""
-    
-    if wrong_answers:
-        result_text += "Неправильные ответы:\n"
-    else:
-        result_text += "✅ Все ответы правильные!\n"
-    
-    for wrong in wrong_answers:
-        result_text += f"""
-Вопрос {wrong['question_number']}: {wrong['question_text']}
-Ваш неправильный ответ: {wrong['user_answer_text']}
-"""
-    
-    if pdf_links:
-        result_text += f"""
-Ссылки на материалы для изучения:
-"""
-        for i, link in enumerate(pdf_links, 1):
-            result_text += f"{i}. {link}\n"
-    
-    result_text += f"\n{'='*60}\n"
-    
-    # Добавляем к существующим результатам в session_state
-    st.session_state['user_results'] += result_text
-    st.success(f"📝 Результаты сохранены в память приложения")
+    quiz - версия теста, по которой шла попытка (в исходном порядке вопросов): отчет
+    берет текст вопросов из нее, даже если каталог уже перечитал тест.
+    """
+    # Неправильные ответы храним номерами вопросов и кодами выбранных вариантов
+    # (вопрос без ответа - UNANSWERED, в отчете "Не выбрано");
+    # текст отчета (и ссылки pdf_links) берется из теста только при запросе
+    wrong = result.wrong_indices()
+    record = AttemptRecord(
+        attempt_id=attempt_id if attempt_id is not None else store.new_attempt_id(),
+        quiz_id=quiz.quiz_id,
+        section=section_name,
+        subsection=subsection_name,
+        correct=result.correct,
+        total=result.total,
+        wrong=tuple(wrong),
+        wrong_answers=tuple(masks[i] if i < len(masks) else UNANSWERED for i in wrong),
+        quiz=quiz,
+    )
+    # На диск попадают только новые или изменившиеся попытки, запись идет в фоне
+    if store.put(record):
+        writer = get_results_writer()
+        if writer is not None:
+            writer.submit(user_name, store.store_id, record)
+        state_store = get_state_store()
+        if state_store is not None and session_id is not None:
+            state_store.save_attempt(session_id, record)
+    return record
 
-def load_quiz_data(file_path: str) -> Optional[Dict[str, Any]]:
-    """Загружает данные теста из JSON файла"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
-
-def load_quiz_data_with_subsections(section_prefix: str, tab_number: int) -> tuple[Optional[Dict[str, Any]], Optional[List[Dict[str, Any]]]]:
-    """Загружает данные теста, проверяя наличие подразделов"""
-    import glob
-    import os
-    
-    # Сначала пытаемся загрузить основной файл
-    main_file = f"quiz_data/{section_prefix}_{tab_number}.json"
-    main_data = load_quiz_data(main_file)
-    
-    if main_data is not None:
-        return main_data, None
-    
-    # Если основной файл не найден, ищем подразделы
-    pattern = f"quiz_data/{section_prefix}_{tab_number}.*.json"
-    subsection_files = sorted(glob.glob(pattern))
-    
-    if subsection_files:
-        subsection_data = []
-        for file_path in subsection_files:
-            data = load_quiz_data(file_path)
-            if data is not None:
-                subsection_data.append(data)
-        
-        if subsection_data:
-            return None, subsection_data
-    
-    return None, None
+def source_attempt(quiz: Quiz, masks: Sequence[int], result: Optional[GradeResult] = None) -> Tuple[Quiz, List[int], GradeResult]:
+    """Тест, коды ответов и результат в порядке исходного теста (для попыток и статистики)"""
+    if isinstance(quiz, VariantQuiz):
+        source_masks = quiz.source_masks(masks)
+        return quiz.source, source_masks, grade_masks(get_answer_key(quiz.source.questions), source_masks)
+    masks = list(masks)
+    return quiz, masks, result if result is not None else grade_masks(get_answer_key(quiz.questions), masks)
 
-def render_question(question: Dict[str, Any], question_key: str) -> Dict[str, Any]:
-    """Отображает вопрос и возвращает ответ пользователя"""
-    st.write(f"**Вопрос {question['question_id']}:** {question['question_text']}")
-    
-    if question['question_type'] == 'single_choice':
-        options = question['options']
+@timed()
+def load_quiz_data_with_subsections(tab: TabEntry) -> Tuple[Optional[Quiz], Optional[List[Quiz]]]:
+    """Загружает данные теста вкладки, с подразделами, если они есть"""
+    # Файлы вкладки известны из реестра, сами тесты берутся из общего каталога
+    return get_catalog().load_entry(tab.files)
+
+@timed()
+def render_question(question: Question, question_key: str, answers: QuizAnswers, j: int, disabled: bool = False):
+    """Отображает вопрос и записывает код ответа пользователя в answers (disabled - только показ)"""
+    st.write(f"**Вопрос {question.question_id}:** {question.text}")
+    
+    # Сохраненный код восстанавливает виджет, если его состояние было сброшено
+    # (например, вкладка не отображалась в ленивом режиме)
+    previous = answers.codes[j]
+    options = question.options
+    
+    if question.qtype == QuestionType.SINGLE:
+        # Без выбора по умолчанию: иначе открытая вкладка уже выглядит как начатая попытка
         answer = st.radio(
             "Выберите правильный ответ:",
             options,
+            index=previous.bit_length() - 1 if previous > 0 else None,
             key=f"{question_key}_radio",
-            label_visibility="collapsed"
+            label_visibility="collapsed",
+            disabled=disabled
         )
-        return {"type": "single_choice", "answer": options.index(answer) if answer else None}
+        code = question.encode(question.option_index[answer] if answer else None)
     
-    elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-        options = question['options']
+    elif question.qtype == QuestionType.MULTI:
         selected = st.multiselect(
             "Выберите правильные ответы:",
             options,
-            key=f"{question_key}_multiselect"
+            default=[options[k] for k in mask_indices(previous)] if previous != UNANSWERED else None,
+            key=f"{question_key}_multiselect",
+            disabled=disabled
         )
-        return {"type": "multiple_choice", "answer": [options.index(opt) for opt in selected]}
+        code = question.encode([question.option_index[opt] for opt in selected])
+    
+    elif question.qtype == QuestionType.MATCHING:
+        previous_choices = question.decode_matching(previous) if previous != UNANSWERED else None
+        choices = []
+        for position, left in enumerate(question.pairs_left):
+            selected = st.selectbox(
+                left,
+                options,
+                index=previous_choices[position] if previous_choices is not None else None,
+                placeholder="Выберите соответствие",
+                key=f"{question_key}_match_{position}",
+                disabled=disabled
+            )
+            choices.append(question.option_index[selected] if selected is not None else None)
+        code = question.encode(choices)
     
-    elif question['question_type'] == 'free_text':
+    elif question.qtype == QuestionType.FREE_TEXT:
         answer = st.text_area(
             "Введите ваш ответ:",
-            key=f"{question_key}_text"
+            value=answers.text(j),
+            key=f"{question_key}_text",
+            disabled=disabled
         )
-        return {"type": "free_text", "answer": answer}
+        if not disabled:
+            answers.set_text(j, answer)
+        return
     
-    return {"type": "unknown", "answer": None}
-
-def calculate_score(user_answers: List[Dict], questions: List[Dict]) -> tuple:
-    """Вычисляет количество правильных ответов"""
-    correct = 0
-    total = len(questions)
+    else:
+        return
     
-    for i, (user_answer, question) in enumerate(zip(user_answers, questions)):
-        if user_answer is None:
-            continue
+    if not disabled:
+        answers.codes[j] = code
+
+def create_tabs(tab_names: List[str], key: str) -> List[Any]:
+    """Создает вкладки; в ленивом режиме Streamlit отслеживает активную вкладку в session_state"""
+    if LAZY_TABS:
+        return st.tabs(tab_names, key=key, on_change="rerun")
+    return st.tabs(tab_names)
+
+@timed()
+def render_quiz(quiz: Quiz, selected_section: str, i: Union[int, str], sub_idx: Optional[int] = None,
+                record_attempt: bool = True):
+    """Отображает вопросы, результаты и материалы одного теста (вкладки или подраздела).
+
+    record_attempt=False - тренировочный тест: результаты показываются, но не сохраняются.
+    """
+    is_subsection = sub_idx is not None
+    suffix = f"{i}_{sub_idx}" if is_subsection else f"{i}"
+    
+    # Используем quiz_title как название подраздела
+    subsection_name = quiz.title
+    if is_subsection:
+        st.markdown(f"### {subsection_name}")
+        heading = "####"
+    else:
+        # Отображаем заголовок теста
+        st.header(subsection_name)
+        heading = "###"
+    
+    # Свой порядок вопросов и вариантов для каждого пользователя (подборка практики не перемешивается)
+    if VARIANTS_ENABLED and record_attempt:
+        quiz = get_variant(quiz, variant_seed(st.session_state['user_name'], quiz.quiz_id))
+    
+    # Начатая попытка работает с той версией теста, на которую отвечали,
+    # даже если автор уже обновил файл
+    book = get_answer_book()
+    state = book.get(suffix)
+    pinned = state.quiz if state is not None else None
+    if pinned is not None and pinned is not quiz and pinned.quiz_id == quiz.quiz_id:
+        # Вариант, построенный заново после вытеснения из кэша, - та же версия теста
+        updated = not same_version(pinned, quiz)
+        quiz = pinned
+        if updated:
+            st.caption("🔄 Тест обновлен. Текущая попытка идет по прежней версии.")
+            st.button("Открыть новую версию", key=f"reload_{suffix}", on_click=release_snapshot, args=(suffix,))
+    
+    # Коды ответов теста (по одному числу на вопрос) и флаги попытки
+    state = book.quiz(suffix, len(quiz.questions))
+    
+    # Поток таймера экзамена отправляет эти же ответы (submit_exam): пока скрипт
+    # читает и меняет попытку, таймер ждет, и наоборот
+    with state.lock:
+        # Экзамен на время: вопросы открываются кнопкой, срок отслеживает таймер процесса
+        if record_attempt and st.session_state.get('exam_mode') and state.deadline is None and not state.show_results:
+            st.info(f"⏱️ На тест отводится {EXAM_MINUTES:g} мин. Когда время выйдет, ответы будут отправлены автоматически.")
+            st.button("Начать экзамен", key=f"start_exam_{suffix}", on_click=start_exam,
+                      args=(suffix, quiz, selected_section))
+            return
+        if state.locked:
+            st.warning("⏱️ Экзамен завершен, ответы отправлены на проверку.")
+        elif state.deadline is not None:
+            st.caption(f"⏱️ Ответы будут отправлены автоматически в {time.strftime('%H:%M:%S', time.localtime(state.deadline))}")
+        
+        # Отображаем вопросы (после сдачи экзамена - отправленные ответы без возможности изменить)
+        for j, question in enumerate(quiz.questions):
+            question_key = f"tab_{i}_{sub_idx}_question_{j}" if is_subsection else f"tab_{i}_question_{j}"
+            if state.locked:
+                question_key += "_locked"
+            render_question(question, question_key, state, j, disabled=state.locked)
+            st.markdown("---")
+        
+        # Пока есть ответы или результаты, версия теста закреплена за сессией
+        state.quiz = quiz if state.show_results or state.any_given(quiz.questions) else None
+        
+        # Кнопка Apply
+        apply_label = f"Проверить ответы - {subsection_name}" if is_subsection else "Проверить ответы"
+        if st.button(apply_label, key=f"apply_{suffix}", disabled=state.locked):
+            state.show_results = True
+            state.quiz = quiz
+            if state.deadline is not None:
+                # Экзамен сдан до срока: таймер больше не нужен, попытка остается той же
+                get_exam_scheduler().cancel((get_results_store().store_id, suffix))
+                state.locked = True
+            else:
+                # Каждое нажатие - новая попытка; последующие rerun перезаписывают ее же
+                state.attempt_id = get_results_store().new_attempt_id()
+        
+        # Ответы тестов разделов доступны другим процессам (практика собирается заново)
+        if record_attempt:
+            persist_answers(suffix, state)
+        
+        # Показываем результаты после нажатия кнопки
+        if not state.show_results:
+            return
+        
+        st.markdown(f"{heading} 📊 Результаты" + (f" - {subsection_name}:" if is_subsection else ":"))
+        
+        # Одна проверка на все: счет, детальные результаты и отчет
+        masks = state.codes
+        result = grade_masks(get_answer_key(quiz.questions), masks)
+        correct, total = result.correct, result.total
+        score_percent = result.percent
+        
+        st.metric("Правильных ответов", f"{correct}/{total} ({score_percent:.1f}%)")
+        
+        # Попытки и статистика хранятся в порядке исходного теста
+        source_quiz, source_masks, source_result = source_attempt(quiz, masks, result)
+        
+        # Статистика сложности вопросов: повторные rerun той же попытки заменяют ее вклад
+        analytics = get_analytics() if record_attempt else None
+        if analytics is not None:
+            attempt_key = (get_results_store().store_id, state.attempt_id)
+            analytics.record(attempt_key, source_quiz, source_masks, source_result.correct_flags)
+        
+        st.markdown(f"{heading} 📝 Детальные результаты:")
+        
+        for j, (question, mask) in enumerate(zip(quiz.questions, masks)):
+            st.markdown(f"**Вопрос {j+1}:**")
+        
+            if question.gradable:
+                user_answer_text = question.answer_text(mask)
+                correct_answer_text = question.answer_text(question.correct_mask)
+                plural = question.qtype != QuestionType.SINGLE
+            
+                if result.correct_flags[j]:
+                    st.success(f"✅ Правильно! {'Ваши ответы' if plural else 'Ваш ответ'}: {user_answer_text}")
+                else:
+                    st.error(f"❌ Неправильно. {'Ваши ответы' if plural else 'Ваш ответ'}: {user_answer_text}")
+                    st.success(f"✅ {'Правильные ответы' if plural else 'Правильный ответ'}: {correct_answer_text}")
             
-        if question['question_type'] == 'single_choice':
-            if user_answer.get('answer') == question['correct_answer']:
-                correct += 1
-        elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-            # Для множественного выбора нужно проверить все правильные ответы
-            if 'correct_answers' in question:
-                if set(user_answer.get('answer', [])) == set(question['correct_answers']):
-                    correct += 1
+                st.info(f"💡 **Объяснение:** {question.explanation}")
+        
+            st.markdown("---")
+        
+        # Тесты, пройденные без ошибок, не попадают в практику слабых мест
+        if record_attempt:
+            get_solved_quizzes().mark(quiz.quiz_id, score_percent == 100)
+            persist_session()
+        
+        # Сохраняем неправильные ответы
+        if record_attempt and score_percent < 100:  # Только если есть ошибки
+            first_attempt = not get_results_store()
+            save_wrong_answers(
+                st.session_state['user_name'],
+                selected_section,
+                subsection_name,
+                source_quiz,
+                source_masks,
+                source_result,
+                attempt_id=state.attempt_id
+            )
+            # Кнопка скачивания отчета в sidebar появляется с первой попыткой, а sidebar
+            # не входит во фрагмент теста и уже отрисован - перезапускаем приложение целиком
+            if first_attempt:
+                st.rerun(scope="app")
+        
+        # Показываем ссылки на PDF материалы
+        if quiz.pdf_links:
+            st.markdown("### 📚 Материалы для изучения:")
+        
+            # Показываем ссылки только если есть ошибки или по запросу
+            if score_percent < 100:  # Если есть ошибки
+                st.info("💡 У вас есть ошибки. Рекомендуем изучить дополнительные материалы:")
+                render_materials(quiz.pdf_links)
+            else:
+                # Если все правильно, показываем ссылки по запросу
+                if st.button("📚 Показать материалы для изучения", key=f"show_materials_{suffix}"):
+                    st.info("📖 Дополнительные материалы по теме:")
+                    render_materials(quiz.pdf_links)
+        
+        # Кнопка для скрытия результатов (через callback, чтобы не перезапускать все приложение)
+        st.button("Скрыть результаты", key=f"hide_{suffix}", on_click=hide_results, args=(suffix,))
+
+def render_materials(links: Sequence[str]):
+    """Кнопки материалов; названия, размеры и доступность берутся из проверенного кэша ссылок"""
+    for j, info in enumerate(get_link_registry().materials(links)):
+        st.link_button(
+            f"📄 {info.title}" if info.title else f"📄 Материал {j+1}",
+            info.url,
+            disabled=info.ok is False
+        )
+        details = info.details()
+        if details:
+            st.caption(details)
+
+def hide_results(suffix: str):
+    """Скрывает блок результатов теста; следующая попытка идет по актуальной версии теста"""
+    state = get_answer_book().get(suffix)
+    if state is not None:
+        with state.lock:
+            state.show_results = False
+            if state.deadline is not None:
+                get_exam_scheduler().cancel((get_results_store().store_id, suffix))
+                state.deadline = None
+                state.locked = False
+    release_snapshot(suffix)
+
+def release_snapshot(suffix: str):
+    """Открепляет от сессии версию теста, по которой шла попытка"""
+    state = get_answer_book().get(suffix)
+    if state is not None:
+        state.quiz = None
+
+def start_exam(suffix: str, quiz: Quiz, selected_section: str):
+    """Открывает вопросы экзамена с чистыми ответами и назначает срок автоматической отправки"""
+    for key in [key for key in st.session_state.keys() if key.startswith(f"tab_{suffix}_question_")]:
+        del st.session_state[key]
+    state = get_answer_book().quiz(suffix, len(quiz.questions))
+    store = get_results_store()
+    solved = get_solved_quizzes()
+    with state.lock:
+        state.resize(0)
+        state.resize(len(quiz.questions))
+        state.attempt_id = store.new_attempt_id()
+        state.quiz = quiz
+        state.deadline = time.time() + EXAM_MINUTES * 60
+        get_exam_scheduler().schedule(
+            (store.store_id, suffix),
+            state.deadline,
+            functools.partial(submit_exam, state, quiz, st.session_state['user_name'], store, solved,
+                              st.session_state.get('session_id'), selected_section, suffix),
+        )
+
+def submit_exam(state: QuizAnswers, quiz: Quiz, user_name: str, store: ResultsStore, solved: SolvedQuizzes,
+                session_id: Optional[str], section_name: str, suffix: str):
+    """Отправляет ответы экзамена по истечении срока (в потоке таймера, без session_state).
+
+    Работает под state.lock: поток скрипта в это время не отрисовывает и не меняет попытку;
+    solved общий для всех тестов сессии и защищен своей блокировкой.
+    """
+    with state.lock:
+        if state.show_results or state.deadline is None:
+            return
+        state.locked = True
+        state.show_results = True
+        
+        # Тот же путь, что и у кнопки "Проверить ответы": проверка, статистика, сохранение ошибок
+        source_quiz, source_masks, source_result = source_attempt(quiz, state.codes)
+        analytics = get_analytics()
+        if analytics is not None:
+            analytics.record((store.store_id, state.attempt_id), source_quiz, source_masks, source_result.correct_flags)
+        solved.mark(quiz.quiz_id, source_result.percent == 100)
+        if source_result.percent != 100:
+            store_attempt(store, user_name, section_name, quiz.title, source_masks, source_result,
+                          source_quiz, state.attempt_id, session_id)
+        
+        state_store = get_state_store()
+        if state_store is not None and session_id is not None:
+            state_store.save_answers(session_id, suffix, state)
+            state_store.save_session(session_id, user_name, store.store_id, solved.snapshot())
+
+if USE_FRAGMENTS:
+    render_quiz = st.fragment(render_quiz)
+
+PRACTICE_SUFFIX = "practice"
+
+def reset_practice():
+    """Забывает текущую подборку практики вместе с ответами на нее"""
+    st.session_state.pop('practice_quiz', None)
+    get_answer_book().discard(PRACTICE_SUFFIX)
+    for key in list(st.session_state.keys()):
+        if key.startswith(f"tab_{PRACTICE_SUFFIX}_question_"):
+            del st.session_state[key]
+
+def render_practice(selected_section: str):
+    """Показывает тест из вопросов с ошибками и вопросов по тем же темам"""
+    st.button("🔄 Собрать новую подборку", key="practice_rebuild", on_click=reset_practice)
+    
+    quiz = st.session_state.get('practice_quiz')
+    if quiz is None:
+        mistakes = mistake_set(get_results_store(), get_solved_quizzes().snapshot())
+        number = st.session_state.get('practice_number', 0) + 1
+        quiz = compose_practice(mistakes, get_tag_index(), practice_id=f"practice_{number}")
+        if quiz is None:
+            st.info("Ошибок пока нет. Пройдите тесты разделов, и здесь появятся вопросы для повторения.")
+            return
+        st.session_state['practice_quiz'] = quiz
+        st.session_state['practice_number'] = number
+    
+    render_quiz(quiz, selected_section, PRACTICE_SUFFIX, record_attempt=False)
+
+def render_section_tabs(selected_section: str):
+    """Отображает вкладки раздела с тестами"""
+    # Вкладки раздела и их файлы берутся из реестра процесса
+    section = get_registry().section(selected_section)
+    section_prefix = section.prefix
+    
+    # Создаем вкладки
+    tabs = create_tabs(section.tab_titles, key=f"active_tab_{section_prefix}")
     
-    return correct, total
+    # Обрабатываем каждую вкладку
+    for i, tab in enumerate(tabs):
+        with tab:
+            # В ленивом режиме строим только открытую вкладку
+            if getattr(tab, "open", None) is False:
+                st.caption("Откройте вкладку, чтобы загрузить тест.")
+                continue
+            
+            # Вкладки без файлов известны заранее
+            tab_entry = section.tabs[i]
+            if tab_entry.empty:
+                st.info(f"📝 Данные для раздела {i+1} пока не загружены.")
+                continue
+            
+            # Универсальная загрузка данных с поддержкой подразделов
+            quiz_data, quiz_data_list = load_quiz_data_with_subsections(tab_entry)
+            
+            # Если нет ни основного файла, ни подразделов
+            if quiz_data is None and quiz_data_list is None:
+                st.info(f"📝 Данные для раздела {i+1} пока не загружены.")
+                continue
+            
+            # Если есть подразделы, обрабатываем их
+            if quiz_data_list is not None:
+                for sub_idx, quiz_data in enumerate(quiz_data_list):
+                    if quiz_data is None:
+                        continue
+                    render_quiz(quiz_data, selected_section, i, sub_idx)
+                    st.markdown("---")
+            
+            # Если есть основной файл, обрабатываем его как обычно
+            elif quiz_data is not None:
+                render_quiz(quiz_data, selected_section, i)
+
+def open_location(section_name: str, tab_number: Optional[int] = None):
+    """Переключает раздел и активную вкладку; адрес страницы становится ссылкой на них"""
+    section = get_registry().section(section_name)
+    st.session_state['selected_section'] = section.name
+    st.session_state['practice_mode'] = False
+    st.query_params['section'] = section.name
+    if tab_number is not None and 0 < tab_number <= len(section.tabs):
+        st.session_state[f"active_tab_{section.prefix}"] = section.tabs[tab_number - 1].title
+        st.query_params['tab'] = str(tab_number)
+    else:
+        st.query_params.pop('tab', None)
+
+def apply_query_params():
+    """Открывает раздел и вкладку из параметров адреса"""
+    section_name = st.query_params.get('section')
+    if section_name not in SECTIONS:
+        return
+    tab = st.query_params.get('tab', '')
+    open_location(section_name, int(tab) if tab.isdigit() else None)
+
+def render_search_results(query: str):
+    """Показывает в sidebar найденные вопросы со ссылками на их вкладки"""
+    hits = get_search_index().search(query, limit=8)
+    if not hits:
+        st.caption("Ничего не найдено.")
+        return
+    for n, hit in enumerate(hits):
+        place = f"{hit.section} · {hit.tab_title}" if hit.section is not None else hit.quiz_id
+        st.button(
+            f"{place} · вопрос {hit.question_index + 1}",
+            key=f"search_hit_{n}",
+            on_click=open_location,
+            args=(hit.section, hit.tab_number),
+            disabled=hit.section is None,
+        )
+        st.caption(hit.text if len(hit.text) <= 120 else hit.text[:117] + "...")
+
+def admin_login():
+    """Проверяет введенный ключ администратора; сам ключ в session_state не остается"""
+    token = st.session_state.get('admin_token', '')
+    st.session_state['admin_token'] = ''
+    st.session_state['is_admin'] = check_admin_token(token)
+    st.session_state['admin_login_failed'] = not st.session_state['is_admin']
+
+def render_admin_login():
+    """Показывает в sidebar поле ключа администратора (только если ключ задан на сервере)"""
+    if not ADMIN_TOKEN or st.session_state.get('is_admin'):
+        return
+    with st.expander("🔐 Администратор"):
+        st.text_input("Ключ администратора", type="password", key="admin_token", on_change=admin_login)
+        if st.session_state.get('admin_login_failed'):
+            st.error("Неверный ключ")
+
+def render_timing_panel():
+    """Показывает в sidebar замеры горячих функций и статистику кэша тестов"""
+    with st.expander("⏱️ Замеры производительности"):
+        rows = recorder.summary()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.info("Замеров пока нет.")
+        st.json(get_catalog().stats())
+        state_store = get_state_store()
+        if state_store is not None:
+            st.json(state_store.stats())
+        st.json(get_exam_scheduler().stats())
+        st.json(warm_up_status())
+        if st.button("Выгрузить метрики", key="export_metrics"):
+            path = recorder.export()
+            if path:
+                st.success(f"Метрики записаны в {path}")
+            else:
+                st.info("Файл метрик не задан (THEORY_DS_METRICS_FILE).")
+
+def render_analytics_panel(selected_section: str):
+    """Показывает в sidebar самые сложные вопросы раздела и сводку по тегам"""
+    analytics = get_analytics()
+    if analytics is None:
+        return
+    with st.expander("📈 Сложные вопросы раздела"):
+        rows = analytics.hardest_questions(SECTION_PREFIXES[selected_section], limit=10)
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.info("Попыток по разделу пока нет.")
+        tags = analytics.tag_summary()
+        if tags:
+            st.markdown("**По темам (тегам):**")
+            st.dataframe(tags, hide_index=True)
 
 def main():
     st.set_page_config(
@@ -218,37 +689,53 @@ def main():
         layout="wide"
     )
     
+    # Кэши процесса заполняются в фоне, пока первый пользователь регистрируется
+    start_warm_up()
+    
+    # Сессия из общего хранилища (если пользователь пришел из другого процесса)
+    restore_session()
+    
     # Проверка регистрации
     if 'user_name' not in st.session_state:
         show_registration_form()
         return
     
+    persist_session()
+    
+    # Ссылка вида ?section=...&tab=N открывает раздел и вкладку (один раз за сессию)
+    if not st.session_state.get('query_params_applied'):
+        st.session_state['query_params_applied'] = True
+        apply_query_params()
+    
     # Sidebar для выбора раздела
     with st.sidebar:
         # Логотип в sidebar
-        st.image("images/image_innowise.png", width=200)
+        st.image(image_bytes("image_innowise.png", 200), width=200)
         st.markdown("---")
         st.header("Выбор раздела")
         
-        # Словарь разделов
-        sections = {
-            "Theory DS - 0": "Fundamentals and prerequisites",
-            "Theory DS - 1.1": "Classic supervised algorithms", 
-            "Theory DS - 1.2": "Classic unsupervised algorithms",
-            "Theory DS - 2.1": "Behind the scene"
-        }
-        
+        # По умолчанию выбран Theory DS - 1.1; раздел также меняют поиск и ссылки
+        st.session_state.setdefault('selected_section', DEFAULT_SECTION)
         selected_section = st.selectbox(
             "Выберите раздел:",
-            list(sections.keys()),
-            index=1,  # По умолчанию выбран Theory DS - 1.1
-            format_func=lambda x: f"{x}: {sections[x]}"
+            list(SECTIONS),
+            format_func=lambda x: f"{x}: {SECTIONS[x]}",
+            key="selected_section"
         )
         
         st.markdown("---")
         st.markdown(f"**Пользователь:** {st.session_state['user_name']}")
         st.markdown(f"**Текущий раздел:** {selected_section}")
-        st.markdown(f"**Описание:** {sections[selected_section]}")
+        st.markdown(f"**Описание:** {SECTIONS[selected_section]}")
+        
+        # Поиск по банку вопросов
+        query = st.text_input("🔎 Поиск по вопросам", key="search_query", placeholder="например, LOOCV или Gini")
+        if query.strip():
+            render_search_results(query)
+        
+        # Тест из вопросов с ошибками по всем разделам
+        st.toggle("🎯 Практика слабых мест", key="practice_mode")
+        st.toggle("⏱️ Экзамен на время", key="exam_mode", help=f"{EXAM_MINUTES:g} мин. на тест, затем ответы отправляются автоматически")
         
         # Кнопка для просмотра результатов
         if st.button("📊 Просмотреть мои результаты"):
@@ -258,354 +745,58 @@ def main():
             else:
                 st.info("У вас пока нет результатов тестирования.")
         
-        # Кнопка для скачивания результатов
-        results_content = get_user_results_content(st.session_state['user_name'])
-        if results_content:
+        # Кнопка для скачивания результатов: отчет формируется только при нажатии
+        if get_results_store():
+            user_name = st.session_state['user_name']
+            store = get_results_store()
+            cache = get_report_cache()
+            report_format = st.selectbox("Формат файла:", list(REPORT_FORMATS), format_func=str.upper,
+                                         key="report_format")
+            mime, extension = REPORT_FORMATS[report_format]
             st.download_button(
                 label="📥 Скачать файл с результатами",
-                data=results_content,
-                file_name=f"{st.session_state['user_name']}_results.txt",
-                mime="text/plain"
+                data=lambda: build_report(store, user_name, get_catalog().load_quiz, report_format, cache),
+                file_name=f"{user_name}_results.{extension}",
+                mime=mime
             )
     
+        # Панели администратора открываются ключом THEORY_DS_ADMIN_TOKEN
+        render_admin_login()
+        if st.session_state.get('is_admin'):
+            # Панель замеров (THEORY_DS_PROFILE=1)
+            if PROFILE_ENABLED:
+                render_timing_panel()
+            # Статистика сложности вопросов для преподавателей
+            render_analytics_panel(selected_section)
+    
     # Логотип по центру
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image("images/image_innowise1.png", width=300)
+        st.image(image_bytes("image_innowise1.png", 300), width=300)
     
     # Заголовок раздела
-    st.markdown(f"## Section quiz - {selected_section}: {sections[selected_section]}")
+    if st.session_state.get('practice_mode'):
+        st.markdown("## 🎯 Практика: мои слабые места")
+    else:
+        st.markdown(f"## Section quiz - {selected_section}: {SECTIONS[selected_section]}")
     
     st.markdown("---")
     
-    # Динамические названия вкладок для каждого раздела
-    tab_configs = {
-        "Theory DS - 0": [
-            "1. Fundamentals",
-            "2. Prerequisites",
-            "3. Basic concepts",
-            "4. Mathematical foundations",
-            "5. Statistics basics",
-            "6. Probability theory",
-            "7. Linear algebra",
-            "8. Calculus",
-            "9. Optimization",
-            "10. Data preprocessing",
-            "11. Feature engineering",
-            "12. Model evaluation",
-            "13. Overfitting basics"
-        ],
-        "Theory DS - 1.1": [
-            "1. Basic understanding",
-            "2. Linear models", 
-            "3. Decision Trees",
-            "4. KNN",
-            "5. LDA/QDA",
-            "6. Dimensionality reduction",
-            "7. Regularisation",
-            "8. ML metrics",
-            "9. Validation"
-        ],
-        "Theory DS - 1.2": [
-            "1. Unsupervised problems",
-            "2. Clusterisation",
-            "3. K-Means",
-            "4. Hierarchical Clusterisation",
-            "5. DBSCAN",
-            "6. HDBSCAN",
-            "7. GMM",
-            "8. Dimensionality reduction",
-            "9. PCA",
-            "10. t-SNE",
-            "11. UMAP",
-            "12. Concept of auto-encoders",
-            "13. Anomaly detection"
-        ],
-        "Theory DS - 2.1": [
-            "1. Behind the scenes",
-            "2. Model internals",
-            "3. Algorithm details",
-            "4. Implementation specifics",
-            "5. Performance optimization",
-            "6. Memory management",
-            "7. Computational complexity",
-            "8. Scalability issues",
-            "9. Advanced techniques",
-            "10. Research frontiers",
-            "11. Industry practices",
-            "12. Best practices",
-            "13. Common pitfalls"
-        ]
-    }
-    
-    # Получаем названия вкладок для выбранного раздела
-    tab_names = tab_configs.get(selected_section, [
-        "1. Section 1",
-        "2. Section 2",
-        "3. Section 3",
-        "4. Section 4",
-        "5. Section 5",
-        "6. Section 6",
-        "7. Section 7",
-        "8. Section 8",
-        "9. Section 9",
-        "10. Section 10",
-        "11. Section 11",
-        "12. Section 12",
-        "13. Section 13"
-    ])
-    
-    # Создаем вкладки
-    tabs = st.tabs(tab_names)
-    
-    # Обрабатываем каждую вкладку
-    for i, tab in enumerate(tabs):
-        with tab:
-            # Формируем путь к файлу в зависимости от выбранного раздела
-            section_mapping = {
-                "Theory DS - 0": "theory_ds_0",
-                "Theory DS - 1.1": "theory_ds_1.1",
-                "Theory DS - 1.2": "theory_ds_1.2",
-                "Theory DS - 2.1": "theory_ds_2.1"
-            }
-            section_prefix = section_mapping.get(selected_section, "theory_ds_1.1")
-            
-            # Универсальная загрузка данных с поддержкой подразделов
-            quiz_data, quiz_data_list = load_quiz_data_with_subsections(section_prefix, i+1)
-            
-            # Если нет ни основного файла, ни подразделов
-            if quiz_data is None and quiz_data_list is None:
-                st.info(f"📝 Данные для раздела {i+1} пока не загружены.")
-                continue
-            
-            # Если есть подразделы, обрабатываем их
-            if quiz_data_list is not None:
-                for sub_idx, quiz_data in enumerate(quiz_data_list):
-                    if quiz_data is None:
-                        continue
-                        
-                    # Используем quiz_title как название подраздела
-                    subsection_name = quiz_data.get('quiz_title', f'Подраздел {sub_idx+1}')
-                    st.markdown(f"### {subsection_name}")
-                    
-                    # Инициализируем состояние для ответов
-                    answer_key = f'answers_{i}_{sub_idx}'
-                    if answer_key not in st.session_state:
-                        st.session_state[answer_key] = [None] * len(quiz_data['questions'])
-                    
-                    # Отображаем вопросы
-                    for j, question in enumerate(quiz_data['questions']):
-                        question_key = f"tab_{i}_{sub_idx}_question_{j}"
-                        user_answer = render_question(question, question_key)
-                        st.session_state[answer_key][j] = user_answer
-                        st.markdown("---")
-                    
-                    # Кнопка Apply для каждого подраздела
-                    if st.button(f"Проверить ответы - {subsection_name}", key=f"apply_{i}_{sub_idx}"):
-                        if f'show_results_{i}_{sub_idx}' not in st.session_state:
-                            st.session_state[f'show_results_{i}_{sub_idx}'] = True
-                    
-                    # Показываем результаты после нажатия кнопки
-                    if st.session_state.get(f'show_results_{i}_{sub_idx}', False):
-                        st.markdown(f"#### 📊 Результаты - {subsection_name}:")
-                        
-                        correct, total = calculate_score(st.session_state[answer_key], quiz_data['questions'])
-                        score_percent = (correct / total * 100) if total > 0 else 0
-                        
-                        st.metric("Правильных ответов", f"{correct}/{total} ({score_percent:.1f}%)")
-                        
-                        st.markdown("#### 📝 Детальные результаты:")
-                        
-                        for j, (question, user_answer) in enumerate(zip(quiz_data['questions'], st.session_state[answer_key])):
-                            st.markdown(f"**Вопрос {j+1}:**")
-                            
-                            if question['question_type'] == 'single_choice':
-                                user_choice = user_answer.get('answer')
-                                correct_choice = question['correct_answer']
-                                
-                                if user_choice == correct_choice:
-                                    st.success(f"✅ Правильно! Ваш ответ: {question['options'][user_choice]}")
-                                else:
-                                    user_answer_text = question['options'][user_choice] if user_choice is not None else 'Не выбрано'
-                                    correct_answer_text = question['options'][correct_choice]
-                                    st.error(f"❌ Неправильно. Ваш ответ: {user_answer_text}")
-                                    st.success(f"✅ Правильный ответ: {correct_answer_text}")
-                                
-                                st.info(f"💡 **Объяснение:** {question['explanation']}")
-                            
-                            elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-                                user_choices = user_answer.get('answer', [])
-                                correct_choices = question.get('correct_answers', [])
-                                
-                                if set(user_choices) == set(correct_choices):
-                                    st.success(f"✅ Правильно! Ваши ответы: {', '.join([question['options'][i] for i in user_choices])}")
-                                else:
-                                    user_answers_text = ', '.join([question['options'][i] for i in user_choices]) if user_choices else 'Не выбрано'
-                                    correct_answers_text = ', '.join([question['options'][i] for i in correct_choices])
-                                    st.error(f"❌ Неправильно. Ваши ответы: {user_answers_text}")
-                                    st.success(f"✅ Правильные ответы: {correct_answers_text}")
-                                
-                                st.info(f"💡 **Объяснение:** {question['explanation']}")
-                            
-                            st.markdown("---")
-                        
-                        # Сохраняем неправильные ответы
-                        if score_percent < 100:  # Только если есть ошибки
-                            pdf_links = quiz_data.get('pdf_links', [])
-                            save_wrong_answers(
-                                st.session_state['user_name'],
-                                selected_section,
-                                subsection_name,
-                                quiz_data['questions'],
-                                st.session_state[answer_key],
-                                pdf_links
-                            )
-                        
-                        # Показываем ссылки на PDF материалы
-                        if 'pdf_links' in quiz_data and quiz_data['pdf_links']:
-                            st.markdown("### 📚 Материалы для изучения:")
-                            
-                            # Показываем ссылки только если есть ошибки или по запросу
-                            if score_percent < 100:  # Если есть ошибки
-                                st.info("💡 У вас есть ошибки. Рекомендуем изучить дополнительные материалы:")
-                                
-                                for j, link in enumerate(quiz_data['pdf_links']):
-                                    st.link_button(
-                                        f"📄 Материал {j+1}",
-                                        link
-                                    )
-                            else:
-                                # Если все правильно, показываем ссылки по запросу
-                                if st.button("📚 Показать материалы для изучения", key=f"show_materials_{i}_{sub_idx}"):
-                                    st.info("📖 Дополнительные материалы по теме:")
-                                    
-                                    for j, link in enumerate(quiz_data['pdf_links']):
-                                        st.link_button(
-                                            f"📄 Материал {j+1}",
-                                            link
-                                        )
-                        
-                        # Кнопка для скрытия результатов
-                        if st.button("Скрыть результаты", key=f"hide_{i}_{sub_idx}"):
-                            st.session_state[f'show_results_{i}_{sub_idx}'] = False
-                            st.rerun()
-                    
-                    st.markdown("---")
-            
-            # Если есть основной файл, обрабатываем его как обычно
-            elif quiz_data is not None:
-                
-                # Отображаем заголовок теста
-                st.header(quiz_data['quiz_title'])
-                
-                # Инициализируем состояние для ответов
-                if f'answers_{i}' not in st.session_state:
-                    st.session_state[f'answers_{i}'] = [None] * len(quiz_data['questions'])
-                
-                # Отображаем вопросы
-                for j, question in enumerate(quiz_data['questions']):
-                    question_key = f"tab_{i}_question_{j}"
-                    user_answer = render_question(question, question_key)
-                    st.session_state[f'answers_{i}'][j] = user_answer
-                    st.markdown("---")
-                
-                # Кнопка Apply
-                if st.button(f"Проверить ответы", key=f"apply_{i}"):
-                    if f'show_results_{i}' not in st.session_state:
-                        st.session_state[f'show_results_{i}'] = True
-                
-                # Показываем результаты после нажатия кнопки
-                if st.session_state.get(f'show_results_{i}', False):
-                    st.markdown("### 📊 Результаты:")
-                    
-                    correct, total = calculate_score(st.session_state[f'answers_{i}'], quiz_data['questions'])
-                    score_percent = (correct / total * 100) if total > 0 else 0
-                    
-                    st.metric("Правильных ответов", f"{correct}/{total} ({score_percent:.1f}%)")
-                    
-                    st.markdown("### 📝 Детальные результаты:")
-                    
-                    for j, (question, user_answer) in enumerate(zip(quiz_data['questions'], st.session_state[f'answers_{i}'])):
-                        st.markdown(f"**Вопрос {j+1}:**")
-                        
-                        if question['question_type'] == 'single_choice':
-                            user_choice = user_answer.get('answer')
-                            correct_choice = question['correct_answer']
-                            
-                            if user_choice == correct_choice:
-                                st.success(f"✅ Правильно! Ваш ответ: {question['options'][user_choice]}")
-                            else:
-                                user_answer_text = question['options'][user_choice] if user_choice is not None else 'Не выбрано'
-                                correct_answer_text = question['options'][correct_choice]
-                                st.error(f"❌ Неправильно. Ваш ответ: {user_answer_text}")
-                                st.success(f"✅ Правильный ответ: {correct_answer_text}")
-                            
-                            st.info(f"💡 **Объяснение:** {question['explanation']}")
-                        
-                        elif question['question_type'] in ['multiple_choice', 'multi_choice']:
-                            user_choices = user_answer.get('answer', [])
-                            correct_choices = question.get('correct_answers', [])
-                            
-                            if set(user_choices) == set(correct_choices):
-                                st.success(f"✅ Правильно! Ваши ответы: {', '.join([question['options'][i] for i in user_choices])}")
-                            else:
-                                user_answers_text = ', '.join([question['options'][i] for i in user_choices]) if user_choices else 'Не выбрано'
-                                correct_answers_text = ', '.join([question['options'][i] for i in correct_choices])
-                                st.error(f"❌ Неправильно. Ваши ответы: {user_answers_text}")
-                                st.success(f"✅ Правильные ответы: {correct_answers_text}")
-                            
-                            st.info(f"💡 **Объяснение:** {question['explanation']}")
-                        
-                        st.markdown("---")
-                    
-                    # Сохраняем неправильные ответы
-                    if score_percent < 100:  # Только если есть ошибки
-                        pdf_links = quiz_data.get('pdf_links', [])
-                        save_wrong_answers(
-                            st.session_state['user_name'],
-                            selected_section,
-                            quiz_data['quiz_title'],
-                            quiz_data['questions'],
-                            st.session_state[f'answers_{i}'],
-                            pdf_links
-                        )
-                    
-                    # Показываем ссылки на PDF материалы
-                    if 'pdf_links' in quiz_data and quiz_data['pdf_links']:
-                        st.markdown("### 📚 Материалы для изучения:")
-                        
-                        # Показываем ссылки только если есть ошибки или по запросу
-                        if score_percent < 100:  # Если есть ошибки
-                            st.info("💡 У вас есть ошибки. Рекомендуем изучить дополнительные материалы:")
-                            
-                            for j, link in enumerate(quiz_data['pdf_links']):
-                                st.link_button(
-                                    f"📄 Материал {j+1}",
-                                    link
-                                )
-                        else:
-                            # Если все правильно, показываем ссылки по запросу
-                            if st.button("📚 Показать материалы для изучения", key=f"show_materials_{i}"):
-                                st.info("📖 Дополнительные материалы по теме:")
-                                
-                                for j, link in enumerate(quiz_data['pdf_links']):
-                                    st.link_button(
-                                        f"📄 Материал {j+1}",
-                                        link
-                                    )
-                    
-                    # Кнопка для скрытия результатов
-                    if st.button("Скрыть результаты", key=f"hide_{i}"):
-                        st.session_state[f'show_results_{i}'] = False
-                        st.rerun()
+    # Практика слабых мест заменяет вкладки раздела
+    if st.session_state.get('practice_mode'):
+        render_practice(selected_section)
+    else:
+        render_section_tabs(selected_section)
     
     # Футер с логотипом
     st.markdown("---")
     st.markdown("---")
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        st.image("images/image_innowise.png", width=100)
+        st.image(image_bytes("image_innowise.png", 100), width=100)
         st.markdown("*Разработано командой Innowise*")
+    
+    recorder.maybe_export()
 
 
 if __name__ == "__main__":
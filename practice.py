@@ -0,0 +1,129 @@
+"""Режим "практика слабых мест": тест из вопросов, на которые пользователь ошибся.
+
+Один раз на процесс (и заново только после изменения тестов) строится
+обратный индекс "тег -> вопросы" по metadata.tags всех тестов каталога.
+Множество ошибок пользователя берется из его ResultsStore: для каждого теста
+учитывается последняя попытка, поэтому исправленные ошибки из подборки
+уходят. Подборка - сначала вопросы с ошибками, затем вопросы тестов с теми
+же тегами; каждый вопрос берется из индекса без перебора файлов.
+"""
+import itertools
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from quiz_catalog import QuizCatalog, get_catalog
+from quiz_schema import Question, Quiz
+from results_store import ResultsStore
+
+# Вопрос теста: (quiz_id, индекс вопроса)
+QuestionRef = Tuple[str, int]
+
+PRACTICE_SIZE = 10
+PRACTICE_TITLE = "Практика: мои слабые места"
+
+
+class TagIndex:
+    """Обратный индекс по тегам и доступ к вопросу по QuestionRef"""
+
+    def __init__(self, quizzes: Dict[str, Quiz], version: Tuple[int, int]):
+        self.version = version
+        self.quizzes = quizzes
+        self.by_tag: Dict[str, List[QuestionRef]] = {}
+        for quiz_id in sorted(quizzes):
+            quiz = quizzes[quiz_id]
+            refs = [(quiz_id, j) for j, question in enumerate(quiz.questions) if question.gradable]
+            for tag in quiz.tags:
+                self.by_tag.setdefault(tag, []).extend(refs)
+
+    def question(self, ref: QuestionRef) -> Optional[Question]:
+        quiz = self.quizzes.get(ref[0])
+        if quiz is None or ref[1] >= len(quiz.questions):
+            return None
+        return quiz.questions[ref[1]]
+
+    def tags_of(self, quiz_id: str) -> Tuple[str, ...]:
+        quiz = self.quizzes.get(quiz_id)
+        return quiz.tags if quiz is not None else ()
+
+
+def build_tag_index(catalog: QuizCatalog) -> TagIndex:
+    """Загружает все тесты каталога (из кэша) и строит индекс"""
+    _, index = catalog.index_snapshot()
+    quizzes = {}
+    for entry in index.values():
+        for path in entry.values():
+            quiz = catalog.load_file(path)
+            if quiz is not None:
+                quizzes[quiz.quiz_id] = quiz
+    return TagIndex(quizzes, catalog.content_version())
+
+
+_tag_index: Optional[TagIndex] = None
+_tag_index_lock = threading.Lock()
+
+
+def get_tag_index(catalog: Optional[QuizCatalog] = None) -> TagIndex:
+    """Возвращает индекс процесса, перестраивая его после изменения тестов"""
+    global _tag_index
+    catalog = catalog or get_catalog()
+    version = catalog.content_version()
+    index = _tag_index
+    if index is not None and index.version == version:
+        return index
+    with _tag_index_lock:
+        if _tag_index is None or _tag_index.version != catalog.content_version():
+            _tag_index = build_tag_index(catalog)
+        return _tag_index
+
+
+def mistake_set(store: ResultsStore, solved: Set[str] = frozenset()) -> List[QuestionRef]:
+    """Вопросы с ошибкой в последней попытке каждого теста (от новых попыток к старым).
+
+    solved - тесты, которые после этого пройдены без ошибок (такие попытки в
+    ResultsStore не сохраняются).
+    """
+    latest = {}
+    for record in store.records():
+        latest.pop(record.quiz_id, None)
+        latest[record.quiz_id] = record
+    refs = []
+    for record in reversed(list(latest.values())):
+        if record.quiz_id not in solved:
+            refs.extend((record.quiz_id, j) for j in record.wrong)
+    return refs
+
+
+def compose_practice(mistakes: List[QuestionRef], index: TagIndex, size: int = PRACTICE_SIZE,
+                     practice_id: str = "practice") -> Optional[Quiz]:
+    """Собирает тест: сначала ошибки, затем вопросы тестов с теми же тегами"""
+    chosen: List[QuestionRef] = []
+    seen: Set[QuestionRef] = set()
+
+    def take(ref: QuestionRef) -> None:
+        if ref not in seen and index.question(ref) is not None:
+            seen.add(ref)
+            chosen.append(ref)
+
+    for ref in mistakes:
+        if len(chosen) >= size:
+            break
+        take(ref)
+    if not chosen:
+        return None
+
+    # Теги тестов с ошибками; вопросы по ним берутся по очереди из каждого тега
+    tags = list(dict.fromkeys(tag for quiz_id, _ in chosen for tag in index.tags_of(quiz_id)))
+    related = itertools.zip_longest(*(index.by_tag.get(tag, ()) for tag in tags))
+    for group in related:
+        if len(chosen) >= size:
+            break
+        for ref in group:
+            if ref is not None and len(chosen) < size:
+                take(ref)
+
+    questions = tuple(index.question(ref) for ref in chosen)
+    pdf_links = tuple(dict.fromkeys(
+        link for quiz_id in dict.fromkeys(quiz_id for quiz_id, _ in chosen)
+        for link in index.quizzes[quiz_id].pdf_links
+    ))
+    return Quiz(practice_id, PRACTICE_TITLE, questions, pdf_links, tuple(tags))
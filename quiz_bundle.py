@@ -0,0 +1,120 @@
+"""Бинарный пакет тестов: все файлы quiz_data в одном версионированном файле.
+
+Формат файла:
+    MAGIC | версия формата (u16) | длина тега (u16) | тег интерпретатора |
+    длина оглавления (u32) | оглавление | данные тестов
+
+Оглавление и данные сериализованы marshal. Оглавление хранит для каждого
+файла смещение и длину его данных, а также (mtime_ns, size) исходного JSON:
+если исходник изменился после сборки, каталог читает JSON. Одинаковые строки
+теста (ключи вопросов, повторяющиеся варианты) при сборке сводятся к одному
+объекту, поэтому marshal пишет их один раз, а после загрузки они общие.
+marshal зависит от версии Python, поэтому пакет с другим тегом
+интерпретатора игнорируется.
+
+Файл открывается через mmap, тест разбирается только при первом обращении.
+Сборка: python build_quiz_bundle.py
+"""
+import marshal
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"TDSQ"
+FORMAT_VERSION = 1
+BUNDLE_NAME = "quiz_bundle.tdsq"
+
+_HEADER = struct.Struct("<4sHH")
+_INDEX_LEN = struct.Struct("<I")
+
+
+def _python_tag() -> bytes:
+    return (sys.implementation.cache_tag or sys.version).encode('ascii')
+
+
+def _intern_strings(value: Any, pool: Dict[str, str]) -> Any:
+    """Заменяет одинаковые строки одним объектом, чтобы marshal записал их один раз"""
+    if isinstance(value, str):
+        return pool.setdefault(value, value)
+    if isinstance(value, list):
+        return [_intern_strings(v, pool) for v in value]
+    if isinstance(value, dict):
+        return {pool.setdefault(k, k): _intern_strings(v, pool) for k, v in value.items()}
+    return value
+
+
+def write_bundle(path: str, quizzes: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]]) -> None:
+    """Записывает пакет; quizzes: имя файла -> ((mtime_ns, size) исходника, данные теста)"""
+    pool: Dict[str, str] = {}
+    index = {}
+    blobs = []
+    offset = 0
+    for name in sorted(quizzes):
+        signature, data = quizzes[name]
+        blob = marshal.dumps(_intern_strings(data, pool))
+        index[name] = (offset, len(blob), signature[0], signature[1])
+        blobs.append(blob)
+        offset += len(blob)
+
+    tag = _python_tag()
+    index_blob = marshal.dumps(index)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(tag)))
+        f.write(tag)
+        f.write(_INDEX_LEN.pack(len(index_blob)))
+        f.write(index_blob)
+        for blob in blobs:
+            f.write(blob)
+    # Атомарная замена: работающие процессы дочитывают старый файл через свой mmap
+    os.replace(tmp_path, path)
+
+
+class QuizBundle:
+    """Открытый пакет тестов"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, tag_len = _HEADER.unpack_from(self._mm, 0)
+            pos = _HEADER.size
+            tag = bytes(self._mm[pos:pos + tag_len])
+            if magic != MAGIC or version != FORMAT_VERSION or tag != _python_tag():
+                raise ValueError(f"несовместимый пакет тестов: {path}")
+            pos += tag_len
+            (index_len,) = _INDEX_LEN.unpack_from(self._mm, pos)
+            pos += _INDEX_LEN.size
+            self._index: Dict[str, Tuple[int, int, int, int]] = marshal.loads(self._mm[pos:pos + index_len])
+            self._data_start = pos + index_len
+        except (ValueError, EOFError, TypeError, struct.error):
+            self._mm.close()
+            raise ValueError(f"поврежденный пакет тестов: {path}")
+
+    def names(self) -> List[str]:
+        return list(self._index)
+
+    def get(self, name: str, signature: Optional[Tuple[int, int]] = None) -> Optional[Dict[str, Any]]:
+        """Возвращает тест по имени файла; None, если его нет или исходник изменился"""
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        offset, length, mtime_ns, size = entry
+        if signature is not None and signature != (mtime_ns, size):
+            return None
+        start = self._data_start + offset
+        return marshal.loads(self._mm[start:start + length])
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+def open_bundle(path: str) -> Optional[QuizBundle]:
+    """Открывает пакет, если он есть и совместим; иначе None"""
+    try:
+        return QuizBundle(path)
+    except (OSError, ValueError):
+        return None
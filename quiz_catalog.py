@@ -0,0 +1,319 @@
+"""Общий для всего процесса каталог тестов из папки quiz_data.
+
+Каталог один раз разбирает JSON файлы и раздаёт их всем сессиям Streamlit.
+Запись перечитывается только если у файла изменились mtime или размер,
+поэтому отредактированные тесты подхватываются без перезапуска приложения.
+Обычно изменения отслеживает фоновый поток (CatalogWatcher): раз в
+THEORY_DS_WATCH_INTERVAL секунд он сверяет mtime/размер известных файлов,
+перечитывает только изменившиеся и подменяет их записи целиком, а чтение из
+каталога обходится без обращений к диску. При THEORY_DS_WATCH_INTERVAL=0
+файл проверяется при каждом обращении.
+Если рядом собран бинарный пакет (build_quiz_bundle.py), тесты берутся из
+него, а JSON читается только для файлов, изменившихся после сборки.
+При загрузке тест проверяется и нормализуется в Quiz (quiz_schema);
+файлы с ошибками попадают в QuizCatalog.errors и пишутся в лог один раз.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from quiz_bundle import BUNDLE_NAME, QuizBundle, open_bundle
+from quiz_schema import Quiz, QuizValidationError, normalize_quiz
+
+logger = logging.getLogger(__name__)
+
+QUIZ_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz_data")
+
+# theory_ds_1.1_2.json -> ("theory_ds_1.1", 2, None); theory_ds_1.1_2.3.json -> (..., 2, 3)
+QUIZ_FILE_PATTERN = re.compile(r"^(?P<prefix>.+)_(?P<tab>\d+)(?:\.(?P<sub>\d+))?\.json$")
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """Возвращает (mtime_ns, size) файла или None, если файла нет"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_json(path: str) -> Any:
+    """Читает JSON файл теста"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class QuizCatalog:
+    """Индекс тестов по (префикс раздела, вкладка, подраздел) с кэшем разобранных файлов.
+
+    Возвращаемые объекты Quiz общие для всех сессий и не должны изменяться.
+    """
+
+    def __init__(self, quiz_dir: str = QUIZ_DIR):
+        self.quiz_dir = quiz_dir
+        self._lock = threading.RLock()
+        # путь -> (сигнатура файла, нормализованный тест или None для битого файла)
+        self._files: Dict[str, Tuple[Tuple[int, int], Optional[Quiz]]] = {}
+        # путь -> ошибки загрузки
+        self.errors: Dict[str, List[str]] = {}
+        # (префикс, вкладка) -> {номер подраздела или None: путь}
+        self._index: Dict[Tuple[str, int], Dict[Optional[int], str]] = {}
+        self._dir_signature: Optional[Tuple[int, int]] = None
+        # Растет при каждом изменении индекса, по нему пересобирается реестр разделов
+        self._index_version = 0
+        self.bundle_path = os.path.join(quiz_dir, BUNDLE_NAME)
+        self._bundle: Optional[QuizBundle] = None
+        self._bundle_signature: Optional[Tuple[int, int]] = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.bundle_loads = 0
+        self._watcher: Optional["CatalogWatcher"] = None
+
+    @property
+    def watching(self) -> bool:
+        """Следит ли за папкой фоновый поток"""
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def _refresh_index(self, force: bool = False) -> None:
+        """Пересобирает индекс файлов, если содержимое папки изменилось"""
+        if self.watching and not force:
+            # Папку проверяет фоновый поток
+            return
+        signature = file_signature(self.quiz_dir)
+        if signature == self._dir_signature:
+            return
+
+        index: Dict[Tuple[str, int], Dict[Optional[int], str]] = {}
+        try:
+            names = os.listdir(self.quiz_dir)
+        except OSError:
+            names = []
+        for name in names:
+            match = QUIZ_FILE_PATTERN.match(name)
+            if match is None:
+                continue
+            sub = match.group('sub')
+            key = (match.group('prefix'), int(match.group('tab')))
+            index.setdefault(key, {})[int(sub) if sub is not None else None] = os.path.join(self.quiz_dir, name)
+
+        if index != self._index:
+            self._index = index
+            self._index_version += 1
+        self._dir_signature = signature
+        # Забываем удалённые файлы
+        known = {path for entry in index.values() for path in entry.values()}
+        for path in list(self._files):
+            if path not in known:
+                self._forget(path)
+
+    def _forget(self, path: str) -> None:
+        """Удаляет файл из кэша"""
+        self._files.pop(path, None)
+        self.errors.pop(path, None)
+
+    def _current_bundle(self) -> Optional[QuizBundle]:
+        """Возвращает открытый пакет тестов, переоткрывая его после пересборки"""
+        signature = file_signature(self.bundle_path)
+        if signature != self._bundle_signature:
+            if self._bundle is not None:
+                self._bundle.close()
+            self._bundle = open_bundle(self.bundle_path) if signature is not None else None
+            self._bundle_signature = signature
+        return self._bundle
+
+    def _read_raw(self, path: str, signature: Tuple[int, int]) -> Any:
+        """Берет тест из пакета, если он там актуален, иначе читает JSON"""
+        if os.path.dirname(path) == self.quiz_dir:
+            bundle = self._current_bundle()
+            if bundle is not None:
+                data = bundle.get(os.path.basename(path), signature)
+                if data is not None:
+                    self.bundle_loads += 1
+                    return data
+        return _read_json(path)
+
+    def _read(self, path: str, signature: Tuple[int, int]) -> Optional[Quiz]:
+        """Читает и нормализует тест; ошибки запоминает и пишет в лог"""
+        quiz_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            return normalize_quiz(self._read_raw(path, signature), quiz_id)
+        except QuizValidationError as e:
+            errors = e.errors
+        except (OSError, ValueError) as e:
+            errors = [str(e)]
+        self.errors[path] = errors
+        logger.warning("Тест %s не загружен: %s", quiz_id, "; ".join(errors))
+        return None
+
+    def load_file(self, path: str) -> Optional[Quiz]:
+        """Возвращает тест из кэша, перечитывая файл при изменении mtime/размера.
+
+        Пока работает CatalogWatcher, закэшированный тест отдается без проверки файла.
+        """
+        path = os.path.abspath(path)
+        if self.watching:
+            with self._lock:
+                cached = self._files.get(path)
+                if cached is not None:
+                    self.hits += 1
+                    return cached[1]
+        signature = file_signature(path)
+        if signature is None:
+            return None
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == signature:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            if cached is not None:
+                self.reloads += 1
+                self._forget(path)
+            quiz = self._read(path, signature)
+            self._files[path] = (signature, quiz)
+            return quiz
+
+    def load_quiz(self, quiz_id: str) -> Optional[Quiz]:
+        """Возвращает тест по идентификатору (например, theory_ds_1.1_2.1)"""
+        return self.load_file(os.path.join(self.quiz_dir, f"{quiz_id}.json"))
+
+    def index_version(self) -> int:
+        """Версия индекса файлов (перед ответом проверяет, не изменилась ли папка)"""
+        with self._lock:
+            self._refresh_index()
+            return self._index_version
+
+    def content_version(self) -> Tuple[int, int]:
+        """Меняется при изменении списка файлов или перечитывании любого теста"""
+        with self._lock:
+            self._refresh_index()
+            return self._index_version, self.reloads
+
+    def index_snapshot(self) -> Tuple[int, Dict[Tuple[str, int], Dict[Optional[int], str]]]:
+        """Версия и копия индекса (префикс, вкладка) -> {подраздел: путь}"""
+        with self._lock:
+            self._refresh_index()
+            return self._index_version, {key: dict(entry) for key, entry in self._index.items()}
+
+    def load_entry(self, entry: Dict[Optional[int], str]) -> Tuple[Optional[Quiz], Optional[List[Quiz]]]:
+        """Загружает тесты вкладки: основной файл важнее подразделов"""
+        if not entry:
+            return None, None
+
+        if None in entry:
+            main_data = self.load_file(entry[None])
+            if main_data is not None:
+                return main_data, None
+
+        subsection_data = []
+        for sub in sorted(k for k in entry if k is not None):
+            data = self.load_file(entry[sub])
+            if data is not None:
+                subsection_data.append(data)
+        if subsection_data:
+            return None, subsection_data
+        return None, None
+
+    def lookup(self, section_prefix: str, tab_number: int) -> Tuple[Optional[Quiz], Optional[List[Quiz]]]:
+        """Возвращает (основной тест, список подразделов) для вкладки раздела"""
+        with self._lock:
+            self._refresh_index()
+            entry = self._index.get((section_prefix, tab_number))
+        return self.load_entry(entry or {})
+
+    def poll(self) -> int:
+        """Проверяет папку и перечитывает изменившиеся файлы; возвращает их число.
+
+        Новая версия теста заменяет запись целиком: сессии, которые держат
+        ссылку на прежний Quiz, продолжают работать с ним.
+        """
+        changed = 0
+        with self._lock:
+            self._refresh_index(force=True)
+            known = list(self._files.items())
+        for path, (signature, _) in known:
+            current = file_signature(path)
+            if current is None or current == signature:
+                continue
+            with self._lock:
+                cached = self._files.get(path)
+                if cached is None or cached[0] != signature:
+                    # Запись уже обновлена или удалена другим потоком
+                    continue
+                self.errors.pop(path, None)
+                self._files[path] = (current, self._read(path, current))
+                self.reloads += 1
+            changed += 1
+            logger.info("Тест %s перечитан", os.path.basename(path))
+        return changed
+
+    def start_watcher(self, interval: float) -> None:
+        """Запускает фоновую проверку папки раз в interval секунд"""
+        with self._lock:
+            if self.watching:
+                return
+            self.poll()
+            self._watcher = CatalogWatcher(self, interval)
+            self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        watcher = self._watcher
+        if watcher is not None:
+            watcher.stop()
+            watcher.join()
+            self._watcher = None
+
+    def stats(self) -> Dict[str, int]:
+        """Счётчики попаданий и промахов кэша"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'bundle_loads': self.bundle_loads,
+                'files': len(self._files),
+                'errors': len(self.errors),
+                'watching': int(self.watching),
+            }
+
+
+class CatalogWatcher(threading.Thread):
+    """Фоновый поток, который периодически вызывает QuizCatalog.poll"""
+
+    def __init__(self, catalog: QuizCatalog, interval: float):
+        super().__init__(name="quiz-catalog-watcher", daemon=True)
+        self.catalog = catalog
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.catalog.poll()
+            except Exception:
+                logger.exception("Ошибка при проверке папки тестов")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_catalog: Optional[QuizCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> QuizCatalog:
+    """Возвращает единственный на процесс каталог тестов"""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = QuizCatalog()
+                interval = float(os.environ.get("THEORY_DS_WATCH_INTERVAL", "2"))
+                if interval > 0:
+                    catalog.start_watcher(interval)
+                _catalog = catalog
+    return _catalog
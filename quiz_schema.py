@@ -0,0 +1,242 @@
+"""Проверка и нормализация тестов при загрузке каталога.
+
+JSON тест один раз превращается в объекты Quiz/Question с канонным типом
+вопроса, кортежами вариантов, готовой картой "текст варианта -> индекс" и
+множеством правильных ответов. Код отрисовки и проверки работает только с
+ними и не разбирает словари на каждом rerun. Ошибки в файле собираются в
+QuizValidationError и сообщаются один раз при загрузке.
+"""
+from enum import IntEnum
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Маска для вопроса без ответа
+UNANSWERED = -1
+# Маска хранится в int64, старший бит занят знаком
+MAX_ANSWER_CODE = (1 << 63) - 1
+
+
+class QuestionType(IntEnum):
+    """Канонные типы вопросов"""
+    UNKNOWN = 0
+    SINGLE = 1
+    MULTI = 2
+    FREE_TEXT = 3
+    MATCHING = 4
+
+
+# Названия типов в JSON (multiple_choice и multi_choice - синонимы)
+QUESTION_TYPES = {
+    'single_choice': QuestionType.SINGLE,
+    'multiple_choice': QuestionType.MULTI,
+    'multi_choice': QuestionType.MULTI,
+    'free_text': QuestionType.FREE_TEXT,
+    'matching': QuestionType.MATCHING,
+}
+
+
+class QuizValidationError(ValueError):
+    """Тест не прошел проверку; errors - список описаний ошибок"""
+
+    def __init__(self, source: str, errors: List[str]):
+        super().__init__(f"{source}: " + "; ".join(errors))
+        self.source = source
+        self.errors = errors
+
+
+class Question:
+    """Нормализованный вопрос теста.
+
+    Для matching options - различные правые части пар, а correct_order -
+    индекс правильного варианта для каждой левой части (pairs_left).
+    """
+
+    __slots__ = ('question_id', 'text', 'qtype', 'options', 'option_index', 'correct',
+                 'correct_order', 'pairs_left', 'correct_mask', 'gradable', 'explanation')
+
+    def __init__(self, question_id: Any, text: str, qtype: QuestionType, options: Tuple[str, ...],
+                 correct: FrozenSet[int] = frozenset(), correct_order: Tuple[int, ...] = (),
+                 pairs_left: Tuple[str, ...] = (), gradable: bool = True, explanation: str = ""):
+        self.question_id = question_id
+        self.text = text
+        self.qtype = qtype
+        self.options = options
+        self.option_index: Dict[str, int] = {option: k for k, option in enumerate(options)}
+        self.correct = correct
+        self.correct_order = correct_order
+        self.pairs_left = pairs_left
+        self.gradable = gradable
+        self.explanation = explanation
+        if qtype == QuestionType.MATCHING:
+            self.correct_mask = self.encode_matching(correct_order)
+        else:
+            self.correct_mask = sum(1 << k for k in correct)
+
+    def encode_matching(self, choices: Sequence[Optional[int]]) -> int:
+        """Кодирует выбор для каждой левой части одним числом (система счисления по основанию len(options)+1)"""
+        base = len(self.options) + 1
+        code = 0
+        for position, choice in enumerate(choices):
+            # Невыбранная пара кодируется цифрой len(options) и никогда не совпадает с ключом
+            digit = len(self.options) if choice is None else choice
+            code += digit * base ** position
+        return code
+
+    def decode_matching(self, code: int) -> List[Optional[int]]:
+        """Обратное к encode_matching"""
+        base = len(self.options) + 1
+        choices = []
+        for _ in self.pairs_left:
+            code, digit = divmod(code, base)
+            choices.append(None if digit == len(self.options) else digit)
+        return choices
+
+    def encode(self, answer: Any) -> int:
+        """Кодирует ответ из render_question (индекс, список индексов или выбор пар) числом"""
+        if answer is None:
+            return UNANSWERED
+        if self.qtype == QuestionType.SINGLE:
+            return 1 << answer
+        if self.qtype == QuestionType.MULTI:
+            mask = 0
+            for index in answer:
+                mask |= 1 << index
+            return mask
+        if self.qtype == QuestionType.MATCHING:
+            return self.encode_matching(answer)
+        # Свободный текст не проверяется автоматически
+        return UNANSWERED
+
+    def answer_text(self, code: int) -> str:
+        """Текст выбранного ответа по его коду (для отчетов)"""
+        if code == UNANSWERED:
+            return "Не выбрано"
+        if self.qtype == QuestionType.MATCHING:
+            parts = [
+                f"{left} → {self.options[choice] if choice is not None else '—'}"
+                for left, choice in zip(self.pairs_left, self.decode_matching(code))
+            ]
+            return '; '.join(parts)
+        chosen = [option for k, option in enumerate(self.options) if code >> k & 1]
+        return ', '.join(chosen) if chosen else "Не выбрано"
+
+
+class Quiz:
+    """Нормализованный тест (один JSON файл)"""
+
+    __slots__ = ('quiz_id', 'title', 'questions', 'pdf_links', 'tags', 'difficulty', '__weakref__')
+
+    def __init__(self, quiz_id: str, title: str, questions: Tuple[Question, ...],
+                 pdf_links: Tuple[str, ...] = (), tags: Tuple[str, ...] = (), difficulty: str = ""):
+        self.quiz_id = quiz_id
+        self.title = title
+        self.questions = questions
+        self.pdf_links = pdf_links
+        self.tags = tags
+        self.difficulty = difficulty
+
+
+def _index_list(value: Any, size: int) -> bool:
+    return isinstance(value, list) and all(isinstance(v, int) and not isinstance(v, bool) and 0 <= v < size for v in value)
+
+
+def _normalize_question(raw: Any, n: int, errors: List[str]) -> Optional[Question]:
+    """Нормализует один вопрос; ошибки дописывает в errors"""
+    if not isinstance(raw, dict):
+        errors.append(f"вопрос {n}: ожидается объект")
+        return None
+    text = raw.get('question_text')
+    if not isinstance(text, str):
+        errors.append(f"вопрос {n}: нет question_text")
+        return None
+    qtype = QUESTION_TYPES.get(raw.get('question_type'))
+    if qtype is None:
+        errors.append(f"вопрос {n}: неизвестный тип {raw.get('question_type')!r}")
+        return None
+
+    question_id = raw.get('question_id', n)
+    explanation = raw.get('explanation', "")
+    if not isinstance(explanation, str):
+        errors.append(f"вопрос {n}: explanation должен быть строкой")
+        return None
+
+    if qtype == QuestionType.FREE_TEXT:
+        return Question(question_id, text, qtype, (), gradable=False, explanation=explanation)
+
+    if qtype == QuestionType.MATCHING:
+        pairs = raw.get('pairs')
+        if not isinstance(pairs, dict) or not pairs or not all(isinstance(v, str) for v in pairs.values()):
+            errors.append(f"вопрос {n}: pairs должен быть непустым объектом со строками")
+            return None
+        options = tuple(dict.fromkeys(pairs.values()))
+        pairs_left = tuple(pairs)
+        question = Question(question_id, text, qtype, options,
+                            correct_order=tuple(options.index(pairs[left]) for left in pairs_left),
+                            pairs_left=pairs_left, explanation=explanation)
+        # Самый большой код - все пары без выбора (цифра len(options) в каждом разряде)
+        if (len(options) + 1) ** len(pairs_left) - 1 > MAX_ANSWER_CODE:
+            errors.append(f"вопрос {n}: слишком много пар")
+            return None
+        return question
+
+    options = raw.get('options')
+    if not isinstance(options, list) or not options or not all(isinstance(o, str) for o in options):
+        errors.append(f"вопрос {n}: options должен быть непустым списком строк")
+        return None
+    if len(options) > 63:
+        errors.append(f"вопрос {n}: больше 63 вариантов ответа")
+        return None
+    if len(set(options)) != len(options):
+        errors.append(f"вопрос {n}: варианты ответа повторяются")
+        return None
+
+    if qtype == QuestionType.SINGLE:
+        answer = raw.get('correct_answer')
+        if not _index_list([answer], len(options)):
+            errors.append(f"вопрос {n}: correct_answer вне списка options")
+            return None
+        correct = frozenset([answer])
+    else:
+        answers = raw.get('correct_answers')
+        if not _index_list(answers, len(options)):
+            errors.append(f"вопрос {n}: correct_answers вне списка options")
+            return None
+        correct = frozenset(answers)
+    return Question(question_id, text, qtype, tuple(options), correct=correct, explanation=explanation)
+
+
+def normalize_quiz(raw: Any, quiz_id: str) -> Quiz:
+    """Проверяет JSON тест и превращает его в Quiz; при ошибках бросает QuizValidationError"""
+    if not isinstance(raw, dict):
+        raise QuizValidationError(quiz_id, ["файл должен содержать объект JSON"])
+    errors: List[str] = []
+
+    title = raw.get('quiz_title')
+    if not isinstance(title, str):
+        errors.append("нет quiz_title")
+
+    raw_questions = raw.get('questions')
+    questions = []
+    if not isinstance(raw_questions, list) or not raw_questions:
+        errors.append("нет списка questions")
+    else:
+        for n, raw_question in enumerate(raw_questions, 1):
+            question = _normalize_question(raw_question, n, errors)
+            if question is not None:
+                questions.append(question)
+
+    pdf_links = raw.get('pdf_links', [])
+    if not isinstance(pdf_links, list) or not all(isinstance(link, str) for link in pdf_links):
+        errors.append("pdf_links должен быть списком строк")
+
+    metadata = raw.get('metadata', {})
+    if not isinstance(metadata, dict):
+        errors.append("metadata должен быть объектом")
+        metadata = {}
+    tags = metadata.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        errors.append("metadata.tags должен быть списком строк")
+
+    if errors:
+        raise QuizValidationError(quiz_id, errors)
+    return Quiz(quiz_id, title, tuple(questions), tuple(pdf_links), tuple(tags),
+                str(metadata.get('difficulty_level', "")))
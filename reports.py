@@ -0,0 +1,141 @@
+"""Выгрузка результатов пользователя в TXT, CSV и JSON.
+
+Отчет собирается только по запросу (просмотр или нажатие кнопки скачивания)
+из записей AttemptRecord и выдается генератором по одной попытке, без
+склеивания строки через +=. Готовый фрагмент каждой попытки кэшируется в
+ReportCache сессии: повторная выгрузка форматирует только новые или
+перезаписанные попытки.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from quiz_schema import Quiz
+from results_store import AttemptRecord, ResultsStore, format_attempt
+
+# формат -> (MIME-тип, расширение файла)
+REPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    'txt': ("text/plain", "txt"),
+    'csv': ("text/csv", "csv"),
+    'json': ("application/json", "json"),
+}
+
+CSV_COLUMNS = (
+    'user_name', 'date', 'section', 'subsection', 'quiz_id', 'attempt_id',
+    'correct', 'total', 'percent', 'question_number', 'question_text', 'user_answer',
+)
+
+
+def _attempt_date(record: AttemptRecord) -> str:
+    return datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _wrong_answers(record: AttemptRecord, quiz: Optional[Quiz]) -> List[Tuple[int, str, str]]:
+    """(номер вопроса, текст вопроса, текст ответа) для неправильных ответов попытки"""
+    questions = quiz.questions if quiz is not None else ()
+    rows = []
+    for question_index, answer_mask in zip(record.wrong, record.wrong_answers):
+        if question_index < len(questions):
+            question = questions[question_index]
+            rows.append((question_index + 1, question.text, question.answer_text(answer_mask)))
+        else:
+            rows.append((question_index + 1, "(вопрос недоступен)", "Не выбрано"))
+    return rows
+
+
+def format_csv_rows(record: AttemptRecord, user_name: str, quiz: Optional[Quiz]) -> str:
+    """Строки CSV попытки: по одной на неправильный ответ (или одна, если ошибок нет)"""
+    common = [user_name, _attempt_date(record), record.section, record.subsection, record.quiz_id,
+              record.attempt_id, record.correct, record.total, f"{record.percent:.1f}"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    wrong = _wrong_answers(record, quiz)
+    for number, question_text, answer_text in wrong or [("", "", "")]:
+        writer.writerow(common + [number, question_text, answer_text])
+    return buffer.getvalue()
+
+
+def format_json_attempt(record: AttemptRecord, user_name: str, quiz: Optional[Quiz]) -> str:
+    """Попытка в виде объекта JSON"""
+    return json.dumps({
+        'user_name': user_name,
+        'date': _attempt_date(record),
+        'section': record.section,
+        'subsection': record.subsection,
+        'quiz_id': record.quiz_id,
+        'attempt_id': record.attempt_id,
+        'correct': record.correct,
+        'total': record.total,
+        'percent': round(record.percent, 1),
+        'wrong_answers': [
+            {'question_number': number, 'question_text': question_text, 'user_answer': answer_text}
+            for number, question_text, answer_text in _wrong_answers(record, quiz)
+        ],
+        'pdf_links': list(quiz.pdf_links) if quiz is not None else [],
+    }, ensure_ascii=False, indent=2)
+
+
+_FORMATTERS: Dict[str, Callable[[AttemptRecord, str, Optional[Quiz]], str]] = {
+    'txt': format_attempt,
+    'csv': format_csv_rows,
+    'json': format_json_attempt,
+}
+
+
+class ReportCache:
+    """Готовые фрагменты отчета: (формат, номер попытки) -> (запись, текст)"""
+
+    def __init__(self):
+        self._chunks: Dict[Tuple[str, int], Tuple[AttemptRecord, str]] = {}
+
+    def get(self, fmt: str, record: AttemptRecord, user_name: str, resolve_quiz) -> str:
+        key = (fmt, record.attempt_id)
+        cached = self._chunks.get(key)
+        # Перезаписанная попытка - новый объект записи
+        if cached is not None and cached[0] is record:
+            return cached[1]
+        chunk = _FORMATTERS[fmt](record, user_name, record.quiz_for(resolve_quiz))
+        self._chunks[key] = (record, chunk)
+        return chunk
+
+    def prune(self, records: List[AttemptRecord]) -> None:
+        """Забывает попытки, вытесненные из хранилища"""
+        alive = {record.attempt_id for record in records}
+        for key in [key for key in self._chunks if key[1] not in alive]:
+            del self._chunks[key]
+
+
+def iter_report(store: ResultsStore, user_name: str, resolve_quiz, fmt: str = 'txt',
+                cache: Optional[ReportCache] = None) -> Iterator[str]:
+    """Выдает отчет в формате fmt по частям, по одной попытке"""
+    if fmt not in _FORMATTERS:
+        raise ValueError(f"неизвестный формат отчета: {fmt}")
+    cache = cache if cache is not None else ReportCache()
+    records = store.records()
+    cache.prune(records)
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(CSV_COLUMNS)
+        yield buffer.getvalue()
+    elif fmt == 'json':
+        yield "[\n"
+
+    for n, record in enumerate(records):
+        if fmt == 'json' and n > 0:
+            yield ",\n"
+        yield cache.get(fmt, record, user_name, resolve_quiz)
+
+    if fmt == 'json':
+        yield "\n]\n"
+
+
+def build_report(store: ResultsStore, user_name: str, resolve_quiz, fmt: str = 'txt',
+                 cache: Optional[ReportCache] = None) -> bytes:
+    """Отчет целиком в UTF-8 для кнопки скачивания (части пишутся в один буфер)"""
+    buffer = io.BytesIO()
+    for chunk in iter_report(store, user_name, resolve_quiz, fmt, cache):
+        buffer.write(chunk.encode('utf-8'))
+    return buffer.getvalue()
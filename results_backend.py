@@ -0,0 +1,286 @@
+"""Постоянное хранение результатов тестирования.
+
+Попытки из ResultsStore ставятся в очередь отложенной записи: фоновый поток
+собирает их пачками и записывает в выбранный бэкенд, поэтому проверка
+ответов не ждет диска. Бэкенды рассчитаны на несколько процессов Streamlit,
+пишущих в одно хранилище:
+
+- SQLiteResultsBackend - база SQLite в режиме WAL (results/results.db);
+- FileResultsBackend - текстовые отчеты results/{user_name}_results.txt
+  с блокировкой на время записи; отчет пишется во временный файл и заменяет
+  прежний целиком, повторная запись попытки заменяет ее блок в отчете.
+
+Бэкенд выбирается переменной окружения THEORY_DS_RESULTS_BACKEND
+(sqlite, file или none), папка - THEORY_DS_RESULTS_DIR.
+"""
+import abc
+import atexit
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from quiz_catalog import get_catalog
+from results_store import AttemptRecord, format_attempt
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+RESULTS_DIR = os.environ.get(
+    "THEORY_DS_RESULTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"),
+)
+
+logger = logging.getLogger(__name__)
+
+# (имя пользователя, идентификатор хранилища сессии, попытка)
+PendingWrite = Tuple[str, str, AttemptRecord]
+
+
+class ResultsBackend(abc.ABC):
+    """Базовый класс хранилища результатов"""
+
+    @abc.abstractmethod
+    def write_batch(self, items: List[PendingWrite]) -> None:
+        """Записывает пачку записей (запись с тем же ключом заменяет прежнюю)"""
+
+    def batch_key(self, item: PendingWrite) -> Hashable:
+        """Ключ записи: из нескольких записей с одним ключом в пачке пишется последняя"""
+        user_name, store_id, record = item
+        return user_name, store_id, record.attempt_id
+
+    def close(self) -> None:
+        pass
+
+
+def join_ints(values) -> str:
+    return ','.join(str(v) for v in values)
+
+
+def split_ints(text: str) -> Tuple[int, ...]:
+    return tuple(int(v) for v in text.split(',')) if text else ()
+
+
+class SQLiteResultsBackend(ResultsBackend):
+    """Результаты в SQLite (WAL), безопасно для нескольких процессов"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(RESULTS_DIR, "results.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    user_name TEXT NOT NULL,
+                    store_id TEXT NOT NULL,
+                    attempt_id INTEGER NOT NULL,
+                    quiz_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    subsection TEXT NOT NULL,
+                    correct INTEGER NOT NULL,
+                    total INTEGER NOT NULL,
+                    wrong TEXT NOT NULL,
+                    wrong_answers TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (user_name, store_id, attempt_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS attempts_quiz ON attempts (quiz_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение на поток (sqlite3 не разрешает делить его между потоками)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def write_batch(self, items: List[PendingWrite]) -> None:
+        rows = [
+            (user_name, store_id, r.attempt_id, r.quiz_id, r.section, r.subsection,
+             r.correct, r.total, join_ints(r.wrong), join_ints(r.wrong_answers), r.timestamp)
+            for user_name, store_id, r in items
+        ]
+        conn = self._connect()
+        with conn:
+            # Повторная запись той же попытки заменяет строку
+            conn.executemany(
+                "INSERT OR REPLACE INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def load_user(self, user_name: str) -> List[AttemptRecord]:
+        """Читает все попытки пользователя"""
+        cursor = self._connect().execute(
+            "SELECT attempt_id, quiz_id, section, subsection, correct, total, wrong, wrong_answers, timestamp "
+            "FROM attempts WHERE user_name = ? ORDER BY timestamp",
+            (user_name,),
+        )
+        return [
+            AttemptRecord(row[0], row[1], row[2], row[3], row[4], row[5],
+                          split_ints(row[6]), split_ints(row[7]), row[8])
+            for row in cursor
+        ]
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# Строка перед блоком попытки в текстовом отчете: по ней блок заменяется при перезаписи
+ATTEMPT_MARKER = re.compile(r"^\[попытка (\S+)\]\n", re.MULTILINE)
+
+
+def split_attempt_blocks(content: str) -> Tuple[str, Dict[str, str]]:
+    """Делит отчет на текст без отметки (старые записи) и блоки попыток по ключам"""
+    parts = ATTEMPT_MARKER.split(content)
+    return parts[0], dict(zip(parts[1::2], parts[2::2]))
+
+
+class FileResultsBackend(ResultsBackend):
+    """Текстовые отчеты в results/{user_name}_results.txt, по блоку на попытку"""
+
+    def __init__(self, directory: Optional[str] = None, resolve_quiz: Optional[Callable] = None):
+        self.directory = directory or RESULTS_DIR
+        self.resolve_quiz = resolve_quiz or (lambda quiz_id: None)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, user_name: str) -> str:
+        safe_name = re.sub(r'[^\w.-]+', '_', user_name).strip('._') or 'user'
+        return os.path.join(self.directory, f"{safe_name}_results.txt")
+
+    def write_batch(self, items: List[PendingWrite]) -> None:
+        by_user: Dict[str, Dict[str, str]] = {}
+        for user_name, store_id, record in items:
+            by_user.setdefault(user_name, {})[f"{store_id}:{record.attempt_id}"] = \
+                format_attempt(record, user_name, record.quiz_for(self.resolve_quiz))
+        for user_name, blocks in by_user.items():
+            path = self.path_for(user_name)
+            # Блокировка отдельного файла защищает от перемешивания записей нескольких процессов;
+            # сам отчет заменяется целиком, поэтому сбой записи не портит прежнюю историю
+            with open(f"{path}.lock", 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            content = f.read()
+                    except FileNotFoundError:
+                        content = ""
+                    prefix, existing = split_attempt_blocks(content)
+                    # Блок уже записанной попытки заменяется на своем месте, новые дописываются в конец
+                    existing.update(blocks)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    try:
+                        with open(tmp_path, 'w', encoding='utf-8') as f:
+                            f.write(prefix + ''.join(f"[попытка {key}]\n{block}" for key, block in existing.items()))
+                            f.flush()
+                            os.fsync(f.fileno())
+                        os.replace(tmp_path, path)
+                    except BaseException:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class WriteBehindQueue:
+    """Фоновая пакетная запись попыток в бэкенд"""
+
+    def __init__(self, backend: ResultsBackend, batch_size: int = 100, flush_interval: float = 0.5):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[PendingWrite]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="results-write-behind", daemon=True)
+        self._thread.start()
+        self.written = 0
+        self.errors = 0
+
+    def submit(self, *item) -> None:
+        """Ставит запись (для результатов - user_name, store_id, попытка) в очередь, не блокируя поток скрипта"""
+        self._queue.put(item)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # Добираем пачку, пока есть записи или не истек интервал
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+        self.backend.close()
+
+    def _write(self, batch: List[PendingWrite]) -> None:
+        try:
+            # Несколько rerun одной попытки в пачке - пишем только последнюю версию
+            latest = {}
+            for item in batch:
+                latest.pop(self.backend.batch_key(item), None)
+                latest[self.backend.batch_key(item)] = item
+            self.backend.write_batch(list(latest.values()))
+            self.written += len(latest)
+        except Exception:
+            # Поток записи должен пережить любую ошибку, иначе очередь будет расти без записи
+            self.errors += 1
+            logger.exception("Не удалось записать пачку из %d записей в %s", len(batch), type(self.backend).__name__)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Дописывает очередь и останавливает поток"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+
+def create_backend(kind: str, resolve_quiz: Optional[Callable] = None) -> Optional[ResultsBackend]:
+    """Создает бэкенд по названию: sqlite, file или none"""
+    if kind == "sqlite":
+        return SQLiteResultsBackend()
+    if kind == "file":
+        return FileResultsBackend(resolve_quiz=resolve_quiz)
+    return None
+
+
+_writer: Optional[WriteBehindQueue] = None
+_writer_ready = False
+_writer_lock = threading.Lock()
+
+
+def get_results_writer() -> Optional[WriteBehindQueue]:
+    """Возвращает общую на процесс очередь записи (None, если хранение отключено)"""
+    global _writer, _writer_ready
+    if not _writer_ready:
+        with _writer_lock:
+            if not _writer_ready:
+                kind = os.environ.get("THEORY_DS_RESULTS_BACKEND", "sqlite").lower()
+                try:
+                    backend = create_backend(kind, resolve_quiz=get_catalog().load_quiz)
+                except (OSError, sqlite3.Error):
+                    logger.exception("Хранилище результатов %s недоступно, результаты не сохраняются", kind)
+                    backend = None
+                if backend is not None:
+                    _writer = WriteBehindQueue(backend)
+                    atexit.register(_writer.close)
+                _writer_ready = True
+    return _writer
@@ -0,0 +1,159 @@
+"""Ограниченное хранилище результатов тестирования пользователя.
+
+Вместо текстового отчета, который дописывался на каждый rerun, в session_state
+хранятся компактные записи попыток. Повторная запись той же попытки заменяет
+ее, а при превышении лимита вытесняются самые старые попытки. Текст отчета
+формируется только тогда, когда его запрашивают (reports.py).
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from quiz_schema import Quiz
+
+# Сколько последних попыток хранится на пользователя
+MAX_ATTEMPTS = 50
+
+
+class AttemptRecord:
+    """Результат одной попытки прохождения теста"""
+
+    __slots__ = ('attempt_id', 'quiz_id', 'section', 'subsection', 'correct', 'total',
+                 'wrong', 'wrong_answers', 'timestamp', 'quiz')
+
+    def __init__(self, attempt_id: int, quiz_id: str, section: str, subsection: str,
+                 correct: int, total: int, wrong: Tuple[int, ...], wrong_answers: Tuple[int, ...],
+                 timestamp: Optional[float] = None, quiz: Optional[Quiz] = None):
+        self.attempt_id = attempt_id
+        self.quiz_id = quiz_id
+        self.section = section
+        self.subsection = subsection
+        self.correct = correct
+        self.total = total
+        # Индексы неправильно отвеченных вопросов и коды выбранных в них ответов
+        self.wrong = wrong
+        self.wrong_answers = wrong_answers
+        self.timestamp = time.time() if timestamp is None else timestamp
+        # Версия теста, по которой шла попытка (номера вопросов и коды ответов - ее).
+        # Живет только в процессе: в хранилища не пишется
+        self.quiz = quiz
+
+    @property
+    def percent(self) -> float:
+        return (self.correct / self.total * 100) if self.total > 0 else 0
+
+    def quiz_for(self, resolve_quiz: Callable[[str], Optional[Quiz]]) -> Optional[Quiz]:
+        """Тест для текста отчета: версия попытки, а если она не известна (запись из хранилища) - текущая"""
+        return self.quiz if self.quiz is not None else resolve_quiz(self.quiz_id)
+
+
+class ResultsStore:
+    """Попытки одного пользователя, не больше max_attempts штук"""
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._records: "OrderedDict[int, AttemptRecord]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        # Уникален для сессии: номера попыток разных сессий одного пользователя совпадают
+        self.store_id = uuid.uuid4().hex
+        # Растет при каждом изменении, по нему кэшируются готовые отчеты
+        self.version = 0
+
+    def new_attempt_id(self) -> int:
+        """Выдает номер новой попытки"""
+        with self._lock:
+            attempt_id = self._next_id
+            self._next_id += 1
+            return attempt_id
+
+    def put(self, record: AttemptRecord) -> bool:
+        """Сохраняет попытку; повторная запись с тем же номером заменяет прежнюю.
+
+        Возвращает False, если попытка уже сохранена с теми же результатами.
+        """
+        with self._lock:
+            existing = self._records.get(record.attempt_id)
+            if existing is not None and existing.quiz is record.quiz and \
+                    (existing.quiz_id, existing.correct, existing.wrong, existing.wrong_answers) == \
+                    (record.quiz_id, record.correct, record.wrong, record.wrong_answers):
+                return False
+            self._records[record.attempt_id] = record
+            self._records.move_to_end(record.attempt_id)
+            while len(self._records) > self.max_attempts:
+                self._records.popitem(last=False)
+            self._next_id = max(self._next_id, record.attempt_id + 1)
+            self.version += 1
+            return True
+
+    def restore(self, store_id: str, records: List[AttemptRecord], next_attempt_id: int = 1) -> None:
+        """Восстанавливает попытки сессии из общего хранилища (state_backend)"""
+        with self._lock:
+            self.store_id = store_id
+            for record in records[-self.max_attempts:]:
+                self._records[record.attempt_id] = record
+            self._next_id = max([next_attempt_id] + [record.attempt_id + 1 for record in records])
+            self.version += 1
+
+    def records(self) -> List[AttemptRecord]:
+        """Попытки в порядке сохранения"""
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __bool__(self) -> bool:
+        return bool(self._records)
+
+
+def format_attempt(record: AttemptRecord, user_name: str, quiz: Optional[Quiz]) -> str:
+    """Форматирует попытку в текстовый блок отчета"""
+    questions = quiz.questions if quiz is not None else ()
+    timestamp = datetime.fromtimestamp(record.timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+    parts = [f"""
+{'='*60}
+Результаты тестирования - {user_name}
+Дата: {timestamp}
+Раздел: {record.section}
+Подраздел: {record.subsection}
+
+📊 Статистика:
+Правильных ответов: {record.correct}/{record.total} ({record.percent:.1f}%)
+
+"""]
+
+    if record.wrong:
+        parts.append("Неправильные ответы:\n")
+    else:
+        parts.append("✅ Все ответы правильные!\n")
+
+    for question_index, answer_mask in zip(record.wrong, record.wrong_answers):
+        if question_index < len(questions):
+            question = questions[question_index]
+            question_text = question.text
+            user_answer_text = question.answer_text(answer_mask)
+        else:
+            # Тест изменился после попытки
+            question_text = "(вопрос недоступен)"
+            user_answer_text = "Не выбрано"
+        parts.append(f"""
+Вопрос {question_index + 1}: {question_text}
+Ваш неправильный ответ: {user_answer_text}
+""")
+
+    pdf_links = quiz.pdf_links if quiz is not None else ()
+    if pdf_links:
+        parts.append("""
+Ссылки на материалы для изучения:
+""")
+        for i, link in enumerate(pdf_links, 1):
+            parts.append(f"{i}. {link}\n")
+
+    parts.append(f"\n{'='*60}\n")
+    return ''.join(parts)
+
@@ -0,0 +1,142 @@
+"""Полнотекстовый поиск по банку вопросов.
+
+Индекс строится один раз на процесс (и заново только после изменения тестов)
+по тексту вопроса, вариантам ответов, объяснению и названию теста. Токены -
+слова Unicode в нижнем регистре с заменой "ё" на "е", поэтому кириллица и
+латиница ищутся одинаково. Документ - вопрос теста; вес термина - число
+вхождений с учетом поля (текст вопроса важнее вариантов), ранжирование -
+TF-IDF. Последнее слово запроса ищется и как префикс ("регуляр" находит
+"регуляризация"), префиксы берутся двоичным поиском по словарю.
+"""
+import bisect
+import math
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from quiz_catalog import QuizCatalog, get_catalog
+from section_registry import SECTION_PREFIXES, TAB_TITLES
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Вес вхождения термина по полям документа
+FIELD_WEIGHTS = (('text', 3.0), ('title', 2.0), ('options', 1.0), ('explanation', 1.0))
+# Совпадение по префиксу весит меньше точного
+PREFIX_WEIGHT = 0.5
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_TERMS = 50
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова текста в нижнем регистре, "ё" заменяется на "е" """
+    return TOKEN_PATTERN.findall(text.lower().replace('ё', 'е'))
+
+
+class SearchHit(NamedTuple):
+    """Найденный вопрос и место, где он находится в интерфейсе"""
+    quiz_id: str
+    question_index: int
+    score: float
+    text: str
+    quiz_title: str
+    section: Optional[str]
+    tab_number: Optional[int]
+    tab_title: str
+
+
+class SearchIndex:
+    """Обратный индекс: термин -> [(номер документа, вес)]"""
+
+    def __init__(self, version: Tuple[int, int]):
+        self.version = version
+        # Документ: (quiz_id, индекс вопроса, текст вопроса, название теста, раздел, вкладка)
+        self.documents: List[Tuple[str, int, str, str, Optional[str], Optional[int]]] = []
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.terms: List[str] = []
+
+    def add_quiz(self, quiz, section: Optional[str], tab_number: Optional[int]) -> None:
+        for j, question in enumerate(quiz.questions):
+            doc_id = len(self.documents)
+            self.documents.append((quiz.quiz_id, j, question.text, quiz.title, section, tab_number))
+            fields = {
+                'text': question.text,
+                'title': quiz.title,
+                'options': ' '.join(question.options + question.pairs_left),
+                'explanation': question.explanation,
+            }
+            weights: Dict[str, float] = {}
+            for field, weight in FIELD_WEIGHTS:
+                for token in tokenize(fields[field]):
+                    weights[token] = weights.get(token, 0.0) + weight
+            for token, weight in weights.items():
+                self.postings.setdefault(token, []).append((doc_id, weight))
+
+    def finish(self) -> None:
+        """Считает IDF и сортирует словарь для поиска по префиксу"""
+        total = len(self.documents)
+        self.idf = {term: math.log(1 + total / len(docs)) for term, docs in self.postings.items()}
+        self.terms = sorted(self.postings)
+
+    def _prefix_terms(self, prefix: str) -> List[str]:
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff', start)
+        return self.terms[start:min(end, start + MAX_PREFIX_TERMS)]
+
+    def search(self, query: str, limit: int = 10) -> List[SearchHit]:
+        """Вопросы по убыванию релевантности"""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        scores: Dict[int, float] = {}
+        for n, token in enumerate(tokens):
+            terms = [(token, 1.0)] if token in self.postings else []
+            if n == len(tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH:
+                terms += [(term, PREFIX_WEIGHT) for term in self._prefix_terms(token) if term != token]
+            for term, factor in terms:
+                idf = self.idf[term] * factor
+                for doc_id, weight in self.postings[term]:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * idf
+
+        best = sorted(scores.items(), key=lambda item: -item[1])[:limit]
+        hits = []
+        for doc_id, score in best:
+            quiz_id, j, text, title, section, tab_number = self.documents[doc_id]
+            titles = TAB_TITLES.get(section, ()) if section is not None else ()
+            tab_title = titles[tab_number - 1] if tab_number is not None and 0 < tab_number <= len(titles) else ""
+            hits.append(SearchHit(quiz_id, j, score, text, title, section, tab_number, tab_title))
+        return hits
+
+
+def build_search_index(catalog: QuizCatalog) -> SearchIndex:
+    """Строит индекс по всем тестам каталога (тесты берутся из его кэша)"""
+    sections_by_prefix = {prefix: name for name, prefix in SECTION_PREFIXES.items()}
+    index = SearchIndex(catalog.content_version())
+    _, files = catalog.index_snapshot()
+    for (prefix, tab_number), entry in sorted(files.items()):
+        for sub in sorted(entry, key=lambda k: -1 if k is None else k):
+            quiz = catalog.load_file(entry[sub])
+            if quiz is None:
+                continue
+            section = sections_by_prefix.get(prefix)
+            index.add_quiz(quiz, section, tab_number if section is not None else None)
+    index.finish()
+    return index
+
+
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index(catalog: Optional[QuizCatalog] = None) -> SearchIndex:
+    """Возвращает индекс процесса, перестраивая его после изменения тестов"""
+    global _search_index
+    catalog = catalog or get_catalog()
+    version = catalog.content_version()
+    index = _search_index
+    if index is not None and index.version == version:
+        return index
+    with _search_index_lock:
+        if _search_index is None or _search_index.version != catalog.content_version():
+            _search_index = build_search_index(catalog)
+        return _search_index
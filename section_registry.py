@@ -0,0 +1,173 @@
+"""Реестр разделов и вкладок, построенный по файлам тестов.
+
+Названия разделов и вкладок - константы модуля, а какие вкладки заполнены,
+определяется по индексу файлов каталога (quiz_catalog). Реестр строится один
+раз на процесс и пересобирается только при изменении индекса, поэтому rerun
+берет раздел и вкладку поиском в словаре, не перебирая файлы на диске.
+"""
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from quiz_catalog import QuizCatalog, get_catalog
+
+# Разделы в порядке показа: название -> описание
+SECTIONS: Dict[str, str] = {
+    "Theory DS - 0": "Fundamentals and prerequisites",
+    "Theory DS - 1.1": "Classic supervised algorithms",
+    "Theory DS - 1.2": "Classic unsupervised algorithms",
+    "Theory DS - 2.1": "Behind the scene",
+}
+DEFAULT_SECTION = "Theory DS - 1.1"
+
+# Префиксы имен файлов тестов
+SECTION_PREFIXES: Dict[str, str] = {
+    "Theory DS - 0": "theory_ds_0",
+    "Theory DS - 1.1": "theory_ds_1.1",
+    "Theory DS - 1.2": "theory_ds_1.2",
+    "Theory DS - 2.1": "theory_ds_2.1",
+}
+
+# Названия вкладок разделов
+TAB_TITLES: Dict[str, Tuple[str, ...]] = {
+    "Theory DS - 0": (
+        "1. Fundamentals",
+        "2. Prerequisites",
+        "3. Basic concepts",
+        "4. Mathematical foundations",
+        "5. Statistics basics",
+        "6. Probability theory",
+        "7. Linear algebra",
+        "8. Calculus",
+        "9. Optimization",
+        "10. Data preprocessing",
+        "11. Feature engineering",
+        "12. Model evaluation",
+        "13. Overfitting basics",
+    ),
+    "Theory DS - 1.1": (
+        "1. Basic understanding",
+        "2. Linear models",
+        "3. Decision Trees",
+        "4. KNN",
+        "5. LDA/QDA",
+        "6. Dimensionality reduction",
+        "7. Regularisation",
+        "8. ML metrics",
+        "9. Validation",
+    ),
+    "Theory DS - 1.2": (
+        "1. Unsupervised problems",
+        "2. Clusterisation",
+        "3. K-Means",
+        "4. Hierarchical Clusterisation",
+        "5. DBSCAN",
+        "6. HDBSCAN",
+        "7. GMM",
+        "8. Dimensionality reduction",
+        "9. PCA",
+        "10. t-SNE",
+        "11. UMAP",
+        "12. Concept of auto-encoders",
+        "13. Anomaly detection",
+    ),
+    "Theory DS - 2.1": (
+        "1. Behind the scenes",
+        "2. Model internals",
+        "3. Algorithm details",
+        "4. Implementation specifics",
+        "5. Performance optimization",
+        "6. Memory management",
+        "7. Computational complexity",
+        "8. Scalability issues",
+        "9. Advanced techniques",
+        "10. Research frontiers",
+        "11. Industry practices",
+        "12. Best practices",
+        "13. Common pitfalls",
+    ),
+}
+
+
+class TabEntry:
+    """Вкладка раздела и файлы ее тестов"""
+
+    __slots__ = ('number', 'title', 'files')
+
+    def __init__(self, number: int, title: str, files: Dict[Optional[int], str]):
+        self.number = number
+        self.title = title
+        # номер подраздела или None (основной файл) -> путь
+        self.files = files
+
+    @property
+    def empty(self) -> bool:
+        """У вкладки нет ни одного файла теста"""
+        return not self.files
+
+
+class SectionEntry:
+    """Раздел со всеми вкладками"""
+
+    __slots__ = ('name', 'prefix', 'description', 'tabs')
+
+    def __init__(self, name: str, prefix: str, description: str, tabs: Tuple[TabEntry, ...]):
+        self.name = name
+        self.prefix = prefix
+        self.description = description
+        self.tabs = tabs
+
+    @property
+    def tab_titles(self) -> List[str]:
+        return [tab.title for tab in self.tabs]
+
+
+class SectionRegistry:
+    """Неизменяемый снимок разделов; version - версия индекса каталога, по которой он построен"""
+
+    def __init__(self, sections: Dict[str, SectionEntry], version: int):
+        self.sections = sections
+        self.version = version
+
+    def section(self, name: str) -> SectionEntry:
+        return self.sections.get(name) or self.sections[DEFAULT_SECTION]
+
+    def tab(self, section_name: str, tab_number: int) -> Optional[TabEntry]:
+        tabs = self.section(section_name).tabs
+        return tabs[tab_number - 1] if 0 < tab_number <= len(tabs) else None
+
+
+def build_registry(index: Dict[Tuple[str, int], Dict[Optional[int], str]], version: int = 0) -> SectionRegistry:
+    """Строит реестр по индексу файлов (префикс, вкладка) -> {подраздел: путь}"""
+    sections = {}
+    for name, description in SECTIONS.items():
+        prefix = SECTION_PREFIXES[name]
+        titles = TAB_TITLES.get(name, ())
+        numbers = [tab for section_prefix, tab in index if section_prefix == prefix]
+        # Файлы для вкладок сверх списка названий тоже показываются
+        count = max([len(titles)] + numbers)
+        tabs = tuple(
+            TabEntry(n, titles[n - 1] if n <= len(titles) else f"{n}. Section {n}",
+                     dict(index.get((prefix, n), {})))
+            for n in range(1, count + 1)
+        )
+        sections[name] = SectionEntry(name, prefix, description, tabs)
+    return SectionRegistry(sections, version)
+
+
+_registry: Optional[SectionRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry(catalog: Optional[QuizCatalog] = None) -> SectionRegistry:
+    """Возвращает реестр процесса, пересобирая его после изменения списка файлов"""
+    global _registry
+    catalog = catalog or get_catalog()
+    version = catalog.index_version()
+    registry = _registry
+    if registry is not None and registry.version == version:
+        return registry
+    with _registry_lock:
+        if _registry is None or _registry.version != version:
+            version, index = catalog.index_snapshot()
+            _registry = build_registry(index, version)
+        return _registry
@@ -0,0 +1,291 @@
+"""Общее для нескольких процессов хранилище состояния сессий.
+
+По умолчанию регистрация, ответы и попытки живут в session_state одного
+процесса Streamlit. С THEORY_DS_STATE_BACKEND=sqlite они дублируются в базу
+SQLite (results/state.db, режим WAL), и несколько процессов на одном хосте
+за балансировщиком обслуживают пользователей согласованно: сессия
+опознается по случайному секрету в cookie браузера (не в адресе страницы,
+которым делятся ссылками на разделы), и процесс, к которому попал
+пользователь, восстанавливает ее из базы.
+
+- Чтение сквозное: снимок сессии кэшируется в процессе (LRU) и берется из
+  кэша, пока последним сессию записывал этот же процесс (столбец owner);
+  иначе снимок перечитывается из базы.
+- Запись отложенная: изменения ставятся в ту же очередь WriteBehindQueue,
+  что и результаты, и пишутся пачками; неизмененные ответы в очередь не
+  попадают. Снимок в кэше обновляется сразу.
+
+Redis-совместимое хранилище не используется: SQLite в режиме WAL уже дает
+общий доступ процессам одного хоста без отдельного сервиса.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Tuple
+
+from answer_store import QuizAnswers
+from results_backend import RESULTS_DIR, ResultsBackend, WriteBehindQueue, join_ints, split_ints
+from results_store import AttemptRecord
+
+logger = logging.getLogger(__name__)
+
+# Сколько снимков сессий держит кэш процесса
+CACHE_SIZE = 1000
+# Сессии, которые не менялись дольше срока, удаляются при запуске
+SESSION_TTL_DAYS = float(os.environ.get("THEORY_DS_STATE_TTL_DAYS", "30"))
+
+# Строка ответов теста: коды, свободный текст в JSON, флаги, номер попытки
+AnswersRow = Tuple[bytes, Optional[str], int, Optional[int]]
+
+
+class SessionSnapshot:
+    """Состояние одной сессии в том виде, в каком оно лежит в базе"""
+
+    __slots__ = ('user_name', 'store_id', 'solved', 'answers', 'attempts')
+
+    def __init__(self, user_name: Optional[str] = None, store_id: Optional[str] = None,
+                 solved: FrozenSet[str] = frozenset()):
+        self.user_name = user_name
+        self.store_id = store_id
+        self.solved = solved
+        self.answers: Dict[str, AnswersRow] = {}
+        self.attempts: "OrderedDict[int, AttemptRecord]" = OrderedDict()
+
+
+class SQLiteStateBackend(ResultsBackend):
+    """Сессии, ответы и попытки в SQLite (WAL)"""
+
+    def __init__(self, path: Optional[str] = None, owner: Optional[str] = None):
+        self.path = path or os.path.join(RESULTS_DIR, "state.db")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Метка процесса: кто последним записывал сессию
+        self.owner = owner or uuid.uuid4().hex
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_name TEXT,
+                    store_id TEXT,
+                    solved TEXT NOT NULL DEFAULT '',
+                    owner TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    session_id TEXT NOT NULL,
+                    suffix TEXT NOT NULL,
+                    codes BLOB NOT NULL,
+                    texts TEXT,
+                    flags INTEGER NOT NULL,
+                    attempt_id INTEGER,
+                    PRIMARY KEY (session_id, suffix)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempts (
+                    session_id TEXT NOT NULL,
+                    attempt_id INTEGER NOT NULL,
+                    quiz_id TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    subsection TEXT NOT NULL,
+                    correct INTEGER NOT NULL,
+                    total INTEGER NOT NULL,
+                    wrong TEXT NOT NULL,
+                    wrong_answers TEXT NOT NULL,
+                    timestamp REAL NOT NULL,
+                    PRIMARY KEY (session_id, attempt_id)
+                )
+            """)
+
+    def _connect(self) -> sqlite3.Connection:
+        """Соединение на поток (sqlite3 не разрешает делить его между потоками)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def batch_key(self, item) -> Hashable:
+        # ('session', sid, данные), ('answers', sid, суффикс, данные), ('attempt', sid, номер, запись)
+        return item[:-1]
+
+    def write_batch(self, items: List[tuple]) -> None:
+        now = time.time()
+        sessions, answers, attempts = [], [], []
+        for item in items:
+            if item[0] == 'session':
+                _, session_id, (user_name, store_id, solved) = item
+                sessions.append((session_id, user_name, store_id, ','.join(sorted(solved)), self.owner, now))
+            elif item[0] == 'answers':
+                _, session_id, suffix, row = item
+                answers.append((session_id, suffix) + row)
+            else:
+                _, session_id, _, r = item
+                attempts.append((session_id, r.attempt_id, r.quiz_id, r.section, r.subsection, r.correct,
+                                 r.total, join_ints(r.wrong), join_ints(r.wrong_answers), r.timestamp))
+        touched = {(item[1], self.owner, now) for item in items}
+
+        conn = self._connect()
+        with conn:
+            conn.executemany("""
+                INSERT INTO sessions (session_id, user_name, store_id, solved, owner, updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    user_name = excluded.user_name, store_id = excluded.store_id, solved = excluded.solved,
+                    owner = excluded.owner, updated = excluded.updated
+            """, sessions)
+            conn.executemany("INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?)", answers)
+            conn.executemany("INSERT OR REPLACE INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", attempts)
+            # Сессия закрепляется за процессом, который записал ее последним
+            conn.executemany("""
+                INSERT INTO sessions (session_id, owner, updated) VALUES (?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET owner = excluded.owner, updated = excluded.updated
+            """, touched)
+
+    def owner_of(self, session_id: str) -> Optional[str]:
+        row = self._connect().execute("SELECT owner FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def read(self, session_id: str) -> Optional[SessionSnapshot]:
+        """Читает снимок сессии из базы (None, если сессии нет)"""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT user_name, store_id, solved FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        snapshot = SessionSnapshot(row[0], row[1], frozenset(row[2].split(',')) if row[2] else frozenset())
+        for suffix, codes, texts, flags, attempt_id in conn.execute(
+                "SELECT suffix, codes, texts, flags, attempt_id FROM answers WHERE session_id = ?", (session_id,)):
+            snapshot.answers[suffix] = (bytes(codes), texts, flags, attempt_id)
+        for row in conn.execute(
+                "SELECT attempt_id, quiz_id, section, subsection, correct, total, wrong, wrong_answers, timestamp "
+                "FROM attempts WHERE session_id = ? ORDER BY timestamp", (session_id,)):
+            snapshot.attempts[row[0]] = AttemptRecord(row[0], row[1], row[2], row[3], row[4], row[5],
+                                                      split_ints(row[6]), split_ints(row[7]), row[8])
+        return snapshot
+
+    def prune(self, max_age: float) -> int:
+        """Удаляет сессии, которые не менялись дольше max_age секунд"""
+        cutoff = time.time() - max_age
+        conn = self._connect()
+        with conn:
+            stale = [row[0] for row in conn.execute("SELECT session_id FROM sessions WHERE updated < ?", (cutoff,))]
+            for table in ('answers', 'attempts', 'sessions'):
+                conn.executemany(f"DELETE FROM {table} WHERE session_id = ?", [(sid,) for sid in stale])
+        return len(stale)
+
+    def close(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SessionStateStore:
+    """Сквозной кэш снимков сессий поверх базы и очередь отложенной записи"""
+
+    def __init__(self, backend: SQLiteStateBackend, cache_size: int = CACHE_SIZE):
+        self.backend = backend
+        self.writer = WriteBehindQueue(backend)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SessionSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, session_id: str) -> SessionSnapshot:
+        """Снимок из кэша (пустой, если его нет); вызывается под self._lock"""
+        snapshot = self._cache.get(session_id)
+        if snapshot is None:
+            snapshot = self._cache[session_id] = SessionSnapshot()
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return snapshot
+
+    def load(self, session_id: str) -> Optional[SessionSnapshot]:
+        """Снимок сессии: из кэша, если последним ее писал этот процесс, иначе из базы"""
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached is not None:
+            owner = self.backend.owner_of(session_id)
+            # Нет строки в базе - записи этого процесса еще в очереди
+            if owner is None or owner == self.backend.owner:
+                self.hits += 1
+                return cached
+        self.misses += 1
+        snapshot = self.backend.read(session_id)
+        if snapshot is not None:
+            with self._lock:
+                self._cache[session_id] = snapshot
+                self._cache.move_to_end(session_id)
+        return snapshot
+
+    def save_session(self, session_id: str, user_name: str, store_id: str, solved: Iterable[str]) -> None:
+        solved = frozenset(solved)
+        with self._lock:
+            snapshot = self._cached(session_id)
+            if (snapshot.user_name, snapshot.store_id, snapshot.solved) == (user_name, store_id, solved):
+                return
+            snapshot.user_name, snapshot.store_id, snapshot.solved = user_name, store_id, solved
+        self.writer.submit('session', session_id, (user_name, store_id, solved))
+
+    def save_answers(self, session_id: str, suffix: str, answers: QuizAnswers) -> None:
+        row = answers.to_row()
+        with self._lock:
+            snapshot = self._cached(session_id)
+            if snapshot.answers.get(suffix) == row:
+                return
+            snapshot.answers[suffix] = row
+        self.writer.submit('answers', session_id, suffix, row)
+
+    def save_attempt(self, session_id: str, record: AttemptRecord) -> None:
+        with self._lock:
+            snapshot = self._cached(session_id)
+            snapshot.attempts[record.attempt_id] = record
+        self.writer.submit('attempt', session_id, record.attempt_id, record)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cached': len(self._cache),
+            'written': self.writer.written,
+            'errors': self.writer.errors,
+        }
+
+
+_state_store: Optional[SessionStateStore] = None
+_state_store_ready = False
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> Optional[SessionStateStore]:
+    """Возвращает общее хранилище сессий процесса (None, если THEORY_DS_STATE_BACKEND не задан)"""
+    global _state_store, _state_store_ready
+    if not _state_store_ready:
+        with _state_store_lock:
+            if not _state_store_ready:
+                kind = os.environ.get("THEORY_DS_STATE_BACKEND", "none").lower()
+                if kind == "sqlite":
+                    try:
+                        backend = SQLiteStateBackend(os.environ.get("THEORY_DS_STATE_DB") or None)
+                        backend.prune(SESSION_TTL_DAYS * 86400)
+                        _state_store = SessionStateStore(backend)
+                        atexit.register(_state_store.writer.close)
+                    except (OSError, sqlite3.Error):
+                        logger.exception("Общее хранилище сессий недоступно, сессии хранятся только в процессе")
+                        _state_store = None
+                _state_store_ready = True
+    return _state_store
@@ -0,0 +1,35 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Модули читают пути к данным при импорте: тесты не должны писать в results/ репозитория
+os.environ.setdefault("THEORY_DS_RESULTS_DIR", tempfile.mkdtemp(prefix="theory_ds_results_"))
+
+from quiz_schema import Quiz, normalize_quiz  # noqa: E402
+
+
+def make_quiz(quiz_id: str = "theory_ds_1.1_1", tags=("trees",)) -> Quiz:
+    """Небольшой тест со всеми типами вопросов"""
+    return normalize_quiz({
+        'quiz_title': "Тест",
+        'questions': [
+            {'question_text': "Один ответ", 'question_type': "single_choice",
+             'options': ["a", "b", "c"], 'correct_answer': 1},
+            {'question_text': "Несколько ответов", 'question_type': "multiple_choice",
+             'options': ["a", "b", "c", "d"], 'correct_answers': [0, 2]},
+            {'question_text': "Пары", 'question_type': "matching",
+             'pairs': {"x": "1", "y": "2", "z": "3"}},
+            {'question_text': "Свободный ответ", 'question_type': "free_text"},
+        ],
+        'pdf_links': [],
+        'metadata': {'tags': list(tags)},
+    }, quiz_id)
+
+
+@pytest.fixture
+def quiz() -> Quiz:
+    return make_quiz()
@@ -0,0 +1,115 @@
+import logging
+import sqlite3
+import threading
+
+from analytics import AnalyticsEngine, AnalyticsFlusher, AnalyticsStore
+from grading import get_answer_key, grade_masks
+
+
+def store_counts(store: AnalyticsStore, quiz_id: str):
+    rows = store.question_rows(f"{quiz_id[:-1]}", min_attempts=1, limit=100)
+    return {j: (attempts, correct) for qid, j, attempts, correct in rows if qid == quiz_id}
+
+
+def record(engine, key, quiz, masks):
+    result = grade_masks(get_answer_key(quiz.questions), masks)
+    engine.record(key, quiz, masks, result.correct_flags)
+
+
+def test_record_replaces_attempt_in_memory(quiz):
+    engine = AnalyticsEngine()
+    record(engine, "a1", quiz, [1 << 1, 0b0101, 0, -1])
+    record(engine, "a1", quiz, [1 << 0, 0b0101, 0, -1])
+    rows = {row['question']: row for row in engine.hardest_questions("theory_ds_1.1", limit=10)}
+    assert rows[1]['attempts'] == 1
+    assert rows[1]['correct_percent'] == 0
+    assert rows[2]['correct_percent'] == 100
+
+
+def test_rerecord_after_flush_corrects_store(tmp_path, quiz):
+    store = AnalyticsStore(str(tmp_path / "analytics.db"))
+    engine = AnalyticsEngine(store)
+    record(engine, "a1", quiz, [1 << 1, 0b0101, 0, -1])
+    engine.flush()
+    record(engine, "a1", quiz, [1 << 0, 0b0101, 0, -1])
+    engine.flush()
+    counts = store_counts(store, quiz.quiz_id)
+    assert counts[0] == (1, 0)
+    assert counts[1] == (1, 1)
+    # Вклад прежнего ответа в гистограмму вариантов тоже вычтен
+    assert store.top_option(quiz.quiz_id, 0, []) == (0, 1)
+
+
+def test_retraction_skipped_when_quiz_changed(tmp_path, quiz):
+    from conftest import make_quiz
+
+    store = AnalyticsStore(str(tmp_path / "analytics.db"))
+    engine = AnalyticsEngine(store)
+    record(engine, "a1", quiz, [1 << 1, 0b0101, 0, -1])
+    engine.flush()
+    changed = make_quiz()
+    changed.questions = changed.questions[:2]
+    record(engine, "a2", changed, [1 << 1, 0b0101])
+    # Попытка по прежней форме теста: вычитание пропускается, новая учитывается
+    record(engine, "a1", changed, [1 << 0, 0b0101])
+    engine.flush()
+    assert store_counts(store, quiz.quiz_id)[0] == (3, 2)
+
+
+def test_tag_summary_replaces_attempt(quiz):
+    engine = AnalyticsEngine()
+    record(engine, "a1", quiz, [1 << 1, 0b0101, 0, -1])
+    record(engine, "a1", quiz, [1 << 0, 0b0101, 0, -1])
+    assert engine.tag_summary() == [{'tag': 'trees', 'attempts': 3, 'correct_percent': 1 / 3 * 100}]
+
+
+class FlakyStore(AnalyticsStore):
+    """Хранилище, которое падает на первых fail_times сбросах"""
+
+    def __init__(self, path, fail_times):
+        super().__init__(path)
+        self.fail_times = fail_times
+
+    def add(self, quizzes, tags):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise sqlite3.OperationalError("database is locked")
+        super().add(quizzes, tags)
+
+
+def test_failed_flush_keeps_pending_counters(tmp_path, quiz, caplog):
+    store = FlakyStore(str(tmp_path / "analytics.db"), fail_times=1)
+    engine = AnalyticsEngine(store)
+    record(engine, "a1", quiz, [1 << 1, 0b0101, 0, -1])
+    with caplog.at_level(logging.ERROR, logger="analytics"):
+        engine.flush()
+    assert engine.flush_errors == 1
+    assert "Не удалось сбросить статистику" in caplog.text
+    assert store_counts(store, quiz.quiz_id) == {}
+    # Следующая попытка приходит в те же приращения и сбрасывается вместе с первой
+    record(engine, "a2", quiz, [1 << 0, 0b0101, 0, -1])
+    engine.flush()
+    counts = store_counts(store, quiz.quiz_id)
+    assert counts[0] == (2, 1)
+    assert counts[1] == (2, 2)
+
+
+def test_flusher_survives_errors(caplog):
+    class BrokenEngine:
+        def __init__(self):
+            self.calls = 0
+            self.done = threading.Event()
+
+        def flush(self):
+            self.calls += 1
+            if self.calls == 1:
+                raise RuntimeError("сбой")
+            self.done.set()
+
+    engine = BrokenEngine()
+    flusher = AnalyticsFlusher(engine, interval=0.01)
+    with caplog.at_level(logging.ERROR, logger="analytics"):
+        flusher.start()
+        assert engine.done.wait(5)
+    flusher.stop()
+    assert "Ошибка потока сброса статистики" in caplog.text
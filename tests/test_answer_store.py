@@ -0,0 +1,77 @@
+import threading
+
+from answer_store import AnswerBook, QuizAnswers, SolvedQuizzes, answer_given
+from quiz_schema import UNANSWERED
+
+
+def test_row_roundtrip():
+    answers = QuizAnswers(4)
+    answers.codes[0] = 0b10
+    answers.set_text(3, "ответ")
+    answers.show_results = True
+    answers.attempt_id = 7
+    restored = QuizAnswers.from_row(answers.to_row())
+    assert list(restored.codes) == [0b10, UNANSWERED, UNANSWERED, UNANSWERED]
+    assert restored.text(3) == "ответ"
+    assert restored.show_results and not restored.locked
+    assert restored.attempt_id == 7
+
+
+def test_flags_and_texts():
+    answers = QuizAnswers(2)
+    answers.locked = True
+    answers.show_results = True
+    answers.show_results = False
+    assert answers.locked and not answers.show_results
+    answers.set_text(1, "x")
+    answers.set_text(1, "")
+    assert answers.texts is None
+
+
+def test_any_given(quiz):
+    single, multi, matching, free_text = quiz.questions
+    assert not answer_given(multi, 0)
+    assert not answer_given(matching, matching.encode([None, None, None]))
+    assert answer_given(matching, matching.encode([None, 1, None]))
+    answers = QuizAnswers(len(quiz.questions))
+    assert not answers.any_given(quiz.questions)
+    answers.codes[1] = 0
+    assert not answers.any_given(quiz.questions)
+    answers.codes[0] = single.encode(0)
+    assert answers.any_given(quiz.questions)
+
+
+def test_book_resets_answers_when_quiz_size_changes():
+    book = AnswerBook()
+    answers = book.quiz("1", 2)
+    answers.codes[0] = 1
+    assert book.quiz("1", 2) is answers and answers.codes[0] == 1
+    book.quiz("1", 3)
+    assert list(answers.codes) == [UNANSWERED] * 3
+    book.discard("1")
+    assert book.get("1") is None and list(book) == []
+
+
+def test_solved_quizzes_shared_between_threads():
+    solved = SolvedQuizzes(["a"])
+    errors = []
+
+    def toggle():
+        try:
+            for n in range(2000):
+                solved.mark(f"q{n % 50}", n % 2 == 0)
+        except Exception as e:  # pragma: no cover - сообщение об ошибке в основной поток
+            errors.append(e)
+
+    threads = [threading.Thread(target=toggle) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        snapshot = solved.snapshot()
+        assert "a" in snapshot
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert "a" in solved and "q1" not in solved
+    solved.mark("a", False)
+    assert solved.snapshot() == frozenset(f"q{n}" for n in range(0, 50, 2))
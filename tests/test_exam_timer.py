@@ -0,0 +1,44 @@
+import threading
+import time
+
+from exam_timer import DeadlineScheduler
+
+
+def test_deadlines_fire_in_order():
+    scheduler = DeadlineScheduler()
+    fired = []
+    done = threading.Event()
+    now = time.time()
+    scheduler.schedule("b", now + 0.1, lambda: fired.append("b"))
+    scheduler.schedule("a", now + 0.05, lambda: fired.append("a"))
+    scheduler.schedule("c", now + 0.15, lambda: (fired.append("c"), done.set()))
+    assert done.wait(5)
+    assert fired == ["a", "b", "c"]
+    assert scheduler.stats()['pending'] == 0
+
+
+def test_cancel_and_reschedule():
+    scheduler = DeadlineScheduler()
+    fired = []
+    done = threading.Event()
+    now = time.time()
+    scheduler.schedule("cancelled", now + 0.05, lambda: fired.append("cancelled"))
+    scheduler.schedule("moved", now + 0.05, lambda: fired.append("old"))
+    scheduler.schedule("moved", now + 0.1, lambda: fired.append("moved"))
+    assert scheduler.cancel("cancelled")
+    assert not scheduler.cancel("unknown")
+    assert scheduler.deadline("moved") == now + 0.1
+    scheduler.schedule("last", now + 0.2, done.set)
+    assert done.wait(5)
+    assert fired == ["moved"]
+    assert not scheduler.cancel("moved")
+
+
+def test_callback_error_is_logged_and_timer_survives(caplog):
+    scheduler = DeadlineScheduler()
+    done = threading.Event()
+    scheduler.schedule("broken", time.time(), lambda: 1 / 0)
+    scheduler.schedule("next", time.time() + 0.05, done.set)
+    assert done.wait(5)
+    assert scheduler.stats()['errors'] == 1
+    assert "'broken'" in caplog.text and "ZeroDivisionError" in caplog.text
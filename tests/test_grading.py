@@ -0,0 +1,112 @@
+import random
+
+import numpy as np
+import pytest
+
+import grade_submissions
+from grading import compile_answer_key, get_answer_key, grade_batch, grade_masks, mask_indices
+from quiz_schema import UNANSWERED, QuestionType
+
+
+def random_code(question, rng):
+    if not question.gradable or rng.random() < 0.2:
+        return UNANSWERED
+    if question.qtype == QuestionType.MATCHING:
+        return question.encode_matching([rng.choice([None, *range(len(question.options))])
+                                         for _ in question.pairs_left])
+    if question.qtype == QuestionType.SINGLE:
+        return 1 << rng.randrange(len(question.options))
+    return rng.randrange(1 << len(question.options))
+
+
+def test_mask_indices():
+    assert mask_indices(0b10110) == [1, 2, 4]
+    assert mask_indices(0) == []
+
+
+def test_grade_masks(quiz):
+    key = compile_answer_key(quiz.questions)
+    result = grade_masks(key, [1 << 1, 0b0101, quiz.questions[2].correct_mask, UNANSWERED])
+    assert result.correct == 3 and result.total == 4
+    result = grade_masks(key, [1 << 0, 0b0001])
+    assert result.correct_flags == (False, False, False, False)
+    # Вопрос без ответа тоже неправильный; свободный текст не проверяется
+    assert result.wrong_indices() == [0, 1, 2]
+
+
+def test_grade_batch_matches_grade_masks(quiz):
+    rng = random.Random(0)
+    key = get_answer_key(quiz.questions)
+    rows = [[random_code(question, rng) for question in quiz.questions] for _ in range(500)]
+    batch = grade_batch(key, np.asarray(rows, dtype=np.int64))
+    for row, flags in zip(rows, batch):
+        assert tuple(bool(flag) for flag in flags) == grade_masks(key, row).correct_flags
+
+
+def test_answer_key_cached_by_questions(quiz):
+    from conftest import make_quiz
+
+    key = get_answer_key(quiz.questions)
+    assert get_answer_key(list(quiz.questions)) is key
+    other = make_quiz()
+    assert get_answer_key(other.questions) is not key
+
+
+@pytest.fixture
+def bulk_catalog(quiz, monkeypatch):
+    class Catalog:
+        def load_quiz(self, quiz_id):
+            return quiz if quiz_id == quiz.quiz_id else None
+
+    monkeypatch.setattr(grade_submissions, "_catalog", Catalog())
+    return quiz
+
+
+def test_bulk_grading_matches_single_attempts(bulk_catalog):
+    quiz = bulk_catalog
+    submissions = [
+        {'user_name': "a", 'quiz_id': quiz.quiz_id, 'answers': ["b", ["a", "c"], {"x": "1", "y": "2", "z": "3"}, "текст"]},
+        {'user_name': "b", 'quiz_id': quiz.quiz_id, 'answers': [0, [0], None]},
+        {'user_name': "c", 'quiz_id': "missing", 'answers': []},
+        {'user_name': "d", 'quiz_id': quiz.quiz_id, 'answers': "не список"},
+    ]
+    results = grade_submissions.grade_submissions(submissions)
+    assert results[0]['correct'] == 3 and results[0]['wrong_questions'] == [] and results[0]['unanswered'] == []
+    assert results[1]['correct'] == 0 and results[1]['wrong_questions'] == [1, 2] and results[1]['unanswered'] == [3]
+    assert results[1]['percent'] == 0.0 and results[0]['percent'] == 75.0
+    assert "error" in results[2] and "error" in results[3]
+    assert [grade_submissions.grade_submission(submission) for submission in submissions] == results
+
+
+def test_unanswered_questions_are_stored_as_wrong(quiz, monkeypatch):
+    import main
+    from practice import mistake_set
+    from results_store import ResultsStore, format_attempt
+
+    monkeypatch.setattr(main, "get_results_writer", lambda: None)
+    monkeypatch.setattr(main, "get_state_store", lambda: None)
+    store = ResultsStore()
+    # Ответ дан только на вопрос с несколькими вариантами, и он правильный
+    masks = [UNANSWERED, 0b0101, UNANSWERED, UNANSWERED]
+    result = grade_masks(get_answer_key(quiz.questions), masks)
+    record = main.store_attempt(store, "user", "1.1", "Тест", masks, result, quiz)
+
+    assert (record.correct, record.total) == (1, 4)
+    assert record.wrong == (0, 2)
+    assert record.wrong_answers == (UNANSWERED, UNANSWERED)
+    report = format_attempt(record, "user", quiz)
+    assert "Все ответы правильные" not in report
+    assert "Вопрос 1: Один ответ\nВаш неправильный ответ: Не выбрано" in report
+    assert "Вопрос 3: Пары\nВаш неправильный ответ: Не выбрано" in report
+    assert mistake_set(store) == [(quiz.quiz_id, 0), (quiz.quiz_id, 2)]
+
+
+def test_parse_answer_returns_encode_arguments(quiz):
+    single, multi, matching, free_text = quiz.questions
+    assert grade_submissions.parse_answer(single, "b") == 1
+    assert grade_submissions.parse_answer(single, "7") is None
+    assert grade_submissions.parse_answer(multi, ["c", 0, "c"]) == [0, 2]
+    assert grade_submissions.parse_answer(matching, {"y": "2"}) == [None, 1, None]
+    assert grade_submissions.parse_answer(matching, [0]) == [0, None, None]
+    assert grade_submissions.parse_answer(free_text, "текст") == "текст"
+    assert multi.encode(grade_submissions.parse_answer(multi, [])) == UNANSWERED
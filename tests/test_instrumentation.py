@@ -0,0 +1,27 @@
+import instrumentation
+from instrumentation import TimingRecorder, check_admin_token
+
+
+def test_admin_token_must_match():
+    assert check_admin_token("s3cret", admin_token="s3cret")
+    assert not check_admin_token("S3cret", admin_token="s3cret")
+    assert not check_admin_token("", admin_token="s3cret")
+    assert check_admin_token("ключ", admin_token="ключ")
+
+
+def test_admin_token_unset_denies_everyone(monkeypatch):
+    monkeypatch.setattr(instrumentation, "ADMIN_TOKEN", "")
+    assert not check_admin_token("")
+    assert not check_admin_token("anything")
+
+
+def test_recorder_summary():
+    recorder = TimingRecorder(size=10)
+    for seconds in (0.001, 0.002, 0.003):
+        recorder.record("grade", seconds)
+    row, = recorder.summary()
+    assert row['function'] == "grade"
+    assert row['calls'] == 3
+    assert abs(row['total_ms'] - 6.0) < 1e-9
+    assert row['p50_ms'] == 2.0
+    assert 'theory_ds_calls_total{function="grade"} 3' in recorder.prometheus_text()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from link_registry import LinkInfo, check_links, collect_links, load_cache, save_cache
+from quiz_catalog import QuizCatalog
+
+PDF_BODY = b"%PDF-1.4 " + b"x" * 2048
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Материалы для проверки: PDF, HTML страница, 404 и перенаправление"""
+    requests = []
+
+    def do_GET(self):
+        StubHandler.requests.append(self.path)
+        if self.path == "/notes.pdf":
+            self._reply(200, "application/pdf", PDF_BODY)
+        elif self.path == "/page":
+            self._reply(200, "text/html; charset=utf-8", "<html><title> Лекция 1 - Google Drive </title></html>".encode('utf-8'))
+        elif self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/notes.pdf")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._reply(404, "text/html", b"<html><title>Not Found</title></html>")
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StubHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_check_links(server):
+    urls = [f"{server}/notes.pdf", f"{server}/page", f"{server}/missing", f"{server}/moved", f"{server}/notes.pdf"]
+    infos = asyncio.run(check_links(urls, max_connections=2, timeout=5))
+
+    # Повторяющиеся адреса проверяются один раз
+    assert list(infos) == urls[:4]
+    assert StubHandler.requests.count("/notes.pdf") == 2  # сам адрес и цель перенаправления
+
+    pdf = infos[f"{server}/notes.pdf"]
+    assert (pdf.ok, pdf.status, pdf.content_type, pdf.size, pdf.title) == (True, 200, "application/pdf", len(PDF_BODY), "notes.pdf")
+    assert pdf.details() == "PDF, 2 КБ"
+
+    page = infos[f"{server}/page"]
+    assert (page.ok, page.title, page.size) == (True, "Лекция 1", None)
+
+    missing = infos[f"{server}/missing"]
+    assert (missing.ok, missing.status) == (False, 404)
+    assert missing.details() == "⚠️ Материал недоступен (404)"
+
+    moved = infos[f"{server}/moved"]
+    assert (moved.ok, moved.status, moved.title, moved.size) == (True, 200, "notes.pdf", len(PDF_BODY))
+
+
+def test_network_error_keeps_availability_unknown():
+    url = f"http://127.0.0.1:{free_port()}/notes.pdf"
+    info = asyncio.run(check_links([url], timeout=5))[url]
+    assert info.ok is None
+    assert info.error
+    assert info.checked_at is not None
+
+
+def test_cache_roundtrip(tmp_path):
+    path = str(tmp_path / "links.json")
+    infos = {
+        "https://b.example/x.pdf": LinkInfo("https://b.example/x.pdf", title="x.pdf", size=10, status=200, ok=True),
+        "https://a.example/": LinkInfo("https://a.example/", status=404, ok=False),
+    }
+    save_cache(infos, path)
+    assert load_cache(path) == infos
+    assert not (tmp_path / "links.json.tmp").exists()
+
+    (tmp_path / "broken.json").write_text("{", encoding='utf-8')
+    assert load_cache(str(tmp_path / "broken.json")) == {}
+    assert load_cache(str(tmp_path / "absent.json")) == {}
+
+
+def test_collect_links_deduplicates(tmp_path):
+    def write(name, links):
+        question = {'question_text': "?", 'question_type': "single_choice", 'options': ["a", "b"], 'correct_answer': 0}
+        quiz = {'quiz_title': name, 'questions': [question], 'pdf_links': links}
+        (tmp_path / f"{name}.json").write_text(json.dumps(quiz), encoding='utf-8')
+
+    write("theory_ds_1.1_1", ["https://a.example/1.pdf", "https://a.example/2.pdf", "https://a.example/1.pdf"])
+    write("theory_ds_1.1_2", ["https://a.example/2.pdf"])
+
+    links = collect_links(QuizCatalog(str(tmp_path)))
+    assert links == {
+        "https://a.example/1.pdf": ["theory_ds_1.1_1"],
+        "https://a.example/2.pdf": ["theory_ds_1.1_1", "theory_ds_1.1_2"],
+    }
@@ -0,0 +1,112 @@
+import json
+import logging
+
+import pytest
+
+from answer_store import QuizAnswers
+from quiz_catalog import QuizCatalog
+from quiz_schema import UNANSWERED, QuestionType, QuizValidationError, normalize_quiz
+
+
+def test_normalized_questions(quiz):
+    single, multi, matching, free_text = quiz.questions
+    assert [q.qtype for q in quiz.questions] == [QuestionType.SINGLE, QuestionType.MULTI,
+                                                 QuestionType.MATCHING, QuestionType.FREE_TEXT]
+    assert single.option_index == {"a": 0, "b": 1, "c": 2}
+    assert single.correct == frozenset({1}) and single.correct_mask == 0b10
+    assert multi.correct == frozenset({0, 2}) and multi.correct_mask == 0b101
+    assert matching.pairs_left == ("x", "y", "z")
+    assert matching.correct_order == (0, 1, 2)
+    assert not free_text.gradable
+    assert quiz.tags == ("trees",)
+
+
+def test_multi_choice_alias():
+    raw = {'quiz_title': "T", 'questions': [
+        {'question_text': "q", 'question_type': "multi_choice", 'options': ["a", "b"], 'correct_answers': [1]},
+    ]}
+    question, = normalize_quiz(raw, "t").questions
+    assert question.qtype == QuestionType.MULTI
+    assert question.correct == frozenset({1})
+
+
+def test_encode_and_answer_text(quiz):
+    single, multi, matching, free_text = quiz.questions
+    assert single.encode(None) == UNANSWERED
+    assert single.encode(2) == 0b100 and single.answer_text(0b100) == "c"
+    assert multi.encode([0, 3]) == 0b1001 and multi.answer_text(0b1001) == "a, d"
+    assert multi.answer_text(0) == "Не выбрано"
+    code = matching.encode([2, None, 0])
+    assert matching.decode_matching(code) == [2, None, 0]
+    assert matching.answer_text(code) == "x → 3; y → —; z → 1"
+    assert matching.encode([0, 1, 2]) == matching.correct_mask
+    assert free_text.encode("текст") == UNANSWERED
+
+
+@pytest.mark.parametrize("question, message", [
+    ({'question_text': "q", 'question_type': "essay"}, "неизвестный тип 'essay'"),
+    ({'question_text': "q", 'question_type': "single_choice", 'options': ["a"], 'correct_answer': 1},
+     "correct_answer вне списка options"),
+    ({'question_text': "q", 'question_type': "single_choice", 'options': ["a", "a"], 'correct_answer': 0},
+     "варианты ответа повторяются"),
+    ({'question_text': "q", 'question_type': "multiple_choice", 'options': ["a"], 'correct_answers': [True]},
+     "correct_answers вне списка options"),
+    ({'question_text': "q", 'question_type': "matching", 'pairs': {}}, "pairs должен быть непустым"),
+])
+def test_invalid_question(question, message):
+    with pytest.raises(QuizValidationError) as info:
+        normalize_quiz({'quiz_title': "T", 'questions': [question]}, "broken")
+    assert info.value.source == "broken"
+    assert any(message in error for error in info.value.errors)
+
+
+def test_all_errors_reported_together():
+    with pytest.raises(QuizValidationError) as info:
+        normalize_quiz({'questions': [], 'pdf_links': "url", 'metadata': {'tags': [1]}}, "broken")
+    assert info.value.errors == ["нет quiz_title", "нет списка questions", "pdf_links должен быть списком строк",
+                                 "metadata.tags должен быть списком строк"]
+
+
+def test_catalog_reports_broken_file_once(tmp_path, caplog):
+    (tmp_path / "theory_ds_1.1_1.json").write_text(json.dumps({'quiz_title': "T", 'questions': []}), encoding='utf-8')
+    catalog = QuizCatalog(str(tmp_path))
+    with caplog.at_level(logging.WARNING, logger="quiz_catalog"):
+        assert catalog.load_quiz("theory_ds_1.1_1") is None
+        assert catalog.load_quiz("theory_ds_1.1_1") is None
+    assert len(caplog.records) == 1
+    assert list(catalog.errors.values()) == [["нет списка questions"]]
+
+
+def test_catalog_returns_shared_quiz(tmp_path):
+    path = tmp_path / "theory_ds_1.1_1.json"
+    path.write_text(json.dumps({'quiz_title': "T", 'questions': [
+        {'question_text': "q", 'question_type': "single_choice", 'options': ["a", "b"], 'correct_answer': 0},
+    ]}), encoding='utf-8')
+    catalog = QuizCatalog(str(tmp_path))
+    first = catalog.load_quiz("theory_ds_1.1_1")
+    assert first is catalog.load_quiz("theory_ds_1.1_1")
+    assert (catalog.hits, catalog.misses) == (1, 1)
+
+
+def matching_quiz(size: int):
+    # Последняя пара повторяет первый ответ: в старшем разряде правильного кода 0,
+    # а код "ничего не выбрано" - наибольший
+    pairs = {f"left {k}": f"right {k}" for k in range(size - 1)}
+    pairs[f"left {size - 1}"] = "right 0"
+    return normalize_quiz({'quiz_title': "T", 'questions': [
+        {'question_text': "q", 'question_type': "matching", 'pairs': pairs},
+    ]}, "pairs")
+
+
+def test_matching_codes_fit_int64():
+    question, = matching_quiz(15).questions
+    answers = QuizAnswers(1)
+    answers.codes[0] = question.encode([None] * 15)
+    assert question.decode_matching(answers.codes[0]) == [None] * 15
+
+    # Правильный код 16 пар (15 вариантов, основание 16) помещается в int64, код без выбора - нет
+    assert sum(k * 16 ** k for k in range(15)) < 2 ** 63 <= 16 ** 16 - 1
+
+    with pytest.raises(QuizValidationError) as info:
+        matching_quiz(16)
+    assert info.value.errors == ["вопрос 1: слишком много пар"]
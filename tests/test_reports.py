@@ -0,0 +1,52 @@
+import json
+
+from quiz_schema import normalize_quiz
+from reports import ReportCache, build_report, iter_report
+from results_store import AttemptRecord, ResultsStore
+
+
+def quiz_version(text: str, options):
+    return normalize_quiz({
+        'quiz_title': "Тест",
+        'questions': [{'question_text': text, 'question_type': "single_choice", 'options': options, 'correct_answer': 0}],
+    }, "theory_ds_1.1_1")
+
+
+OLD = quiz_version("Старый вопрос", ["старый верный", "старый неверный"])
+NEW = quiz_version("Новый вопрос", ["новый верный", "новый неверный"])
+
+
+def resolve(quiz_id):
+    return NEW if quiz_id == NEW.quiz_id else None
+
+
+def attempt(attempt_id: int, quiz=None) -> AttemptRecord:
+    return AttemptRecord(attempt_id, "theory_ds_1.1_1", "1.1", "Тест", 0, 1, (0,), (1 << 1,), quiz=quiz)
+
+
+def test_report_uses_attempt_version():
+    store = ResultsStore()
+    # Сессия закреплена за прежней версией теста, каталог уже перечитал новую
+    store.put(attempt(1, quiz=OLD))
+    report = ''.join(iter_report(store, "user", resolve))
+    assert "Вопрос 1: Старый вопрос\nВаш неправильный ответ: старый неверный" in report
+    assert "Новый" not in report
+
+
+def test_stored_attempt_falls_back_to_catalog():
+    # Запись, восстановленная из хранилища, версию теста не знает
+    store = ResultsStore()
+    store.put(attempt(1))
+    rows = json.loads(build_report(store, "user", resolve, 'json'))
+    assert rows[0]['wrong_answers'] == [{'question_number': 1, 'question_text': "Новый вопрос",
+                                         'user_answer': "новый неверный"}]
+
+
+def test_cache_reformats_rewritten_attempt():
+    store = ResultsStore()
+    cache = ReportCache()
+    store.put(attempt(1, quiz=OLD))
+    assert "Старый вопрос" in ''.join(iter_report(store, "user", resolve, 'csv', cache))
+    # Та же попытка с теми же ответами, но по другой версии теста - новая запись
+    assert store.put(attempt(1, quiz=NEW))
+    assert "Новый вопрос" in ''.join(iter_report(store, "user", resolve, 'csv', cache))
@@ -0,0 +1,114 @@
+import os
+import threading
+
+import pytest
+
+from results_backend import FileResultsBackend, ResultsBackend, SQLiteResultsBackend, WriteBehindQueue
+from results_store import AttemptRecord
+
+
+def attempt(attempt_id: int, correct: int) -> AttemptRecord:
+    return AttemptRecord(attempt_id, "theory_ds_1.1_1", "Theory DS - 1.1", "Тест", correct, 3, (), ())
+
+
+class RecordingBackend(ResultsBackend):
+    """Бэкенд, который запоминает пачки и падает на первых fail_times вызовах"""
+
+    def __init__(self, fail_times: int = 0, error: Exception = RuntimeError("сбой")):
+        self.fail_times = fail_times
+        self.error = error
+        self.batches = []
+        self.written = threading.Event()
+
+    def write_batch(self, items):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise self.error
+        self.batches.append(list(items))
+        self.written.set()
+
+
+def test_backend_requires_write_batch():
+    with pytest.raises(TypeError):
+        ResultsBackend()
+
+
+def test_queue_survives_unexpected_errors(caplog):
+    backend = RecordingBackend(fail_times=1, error=KeyError("не OSError"))
+    writer = WriteBehindQueue(backend, flush_interval=0.01)
+    writer.submit("u", "s", attempt(1, 1))
+    writer.close()
+    assert writer.errors == 1
+    assert "Не удалось записать" in caplog.text
+
+
+def test_queue_keeps_running_after_error():
+    backend = RecordingBackend(fail_times=1)
+    writer = WriteBehindQueue(backend, batch_size=1, flush_interval=0.01)
+    writer.submit("u", "s", attempt(1, 1))
+    writer.submit("u", "s", attempt(2, 2))
+    assert backend.written.wait(5)
+    writer.close()
+    assert writer.errors == 1
+    assert [item[2].attempt_id for batch in backend.batches for item in batch] == [2]
+
+
+def test_queue_writes_latest_version_of_attempt():
+    backend = RecordingBackend()
+    writer = WriteBehindQueue(backend, flush_interval=0.2)
+    for correct in range(3):
+        writer.submit("u", "s", attempt(1, correct))
+    writer.close()
+    items = [item for batch in backend.batches for item in batch]
+    assert [(item[2].attempt_id, item[2].correct) for item in items][-1] == (1, 2)
+    assert len(items) == 1
+
+
+def test_file_backend_rewrites_attempt_block(tmp_path):
+    backend = FileResultsBackend(str(tmp_path))
+    backend.write_batch([("Вася", "s", attempt(1, 1))])
+    backend.write_batch([("Вася", "s", attempt(2, 3))])
+    backend.write_batch([("Вася", "s", attempt(1, 2))])
+    with open(backend.path_for("Вася"), encoding='utf-8') as f:
+        content = f.read()
+    assert content.count("Результаты тестирования") == 2
+    assert "2/3" in content and "1/3" not in content
+    # Блок попытки остался на своем месте
+    assert content.index("2/3") < content.index("3/3")
+
+
+def test_file_backend_keeps_unmarked_reports(tmp_path):
+    backend = FileResultsBackend(str(tmp_path))
+    with open(backend.path_for("Вася"), 'w', encoding='utf-8') as f:
+        f.write("старый отчет\n")
+    backend.write_batch([("Вася", "s", attempt(1, 1))])
+    backend.write_batch([("Вася", "s", attempt(1, 2))])
+    with open(backend.path_for("Вася"), encoding='utf-8') as f:
+        content = f.read()
+    assert content.startswith("старый отчет\n")
+    assert content.count("Результаты тестирования") == 1
+
+
+def test_file_backend_failed_write_keeps_report(tmp_path, monkeypatch):
+    backend = FileResultsBackend(str(tmp_path))
+    backend.write_batch([("Вася", "s", attempt(1, 1))])
+    with open(backend.path_for("Вася"), encoding='utf-8') as f:
+        before = f.read()
+
+    def full_disk(fd):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "fsync", full_disk)
+    with pytest.raises(OSError):
+        backend.write_batch([("Вася", "s", attempt(2, 3))])
+    with open(backend.path_for("Вася"), encoding='utf-8') as f:
+        assert f.read() == before
+    assert sorted(os.listdir(tmp_path)) == ["Вася_results.txt", "Вася_results.txt.lock"]
+
+
+def test_sqlite_backend_replaces_attempt(tmp_path):
+    backend = SQLiteResultsBackend(str(tmp_path / "results.db"))
+    backend.write_batch([("Вася", "s", attempt(1, 1))])
+    backend.write_batch([("Вася", "s", attempt(1, 2))])
+    assert [(r.attempt_id, r.correct) for r in backend.load_user("Вася")] == [(1, 2)]
+    backend.close()
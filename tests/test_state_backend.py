@@ -0,0 +1,124 @@
+import logging
+import time
+
+import pytest
+
+import state_backend
+from answer_store import QuizAnswers
+from results_store import AttemptRecord
+from state_backend import SessionStateStore, SQLiteStateBackend
+
+
+def attempt(attempt_id: int, correct: int) -> AttemptRecord:
+    return AttemptRecord(attempt_id, "theory_ds_1.1_1", "Theory DS - 1.1", "Тест", correct, 3, (0, 2), (1, -1))
+
+
+def answers(*codes: int) -> QuizAnswers:
+    result = QuizAnswers(len(codes))
+    for j, code in enumerate(codes):
+        result.codes[j] = code
+    result.set_text(len(codes) - 1, "ответ")
+    result.attempt_id = 1
+    return result
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+def test_backend_roundtrip_and_batch_keys(db_path):
+    backend = SQLiteStateBackend(db_path, owner="a")
+    row = answers(1, 2).to_row()
+    items = [
+        ('session', "s1", ("Вася", "store", frozenset({"q1", "q2"}))),
+        ('answers', "s1", "1_1", answers(1, 1).to_row()),
+        ('answers', "s1", "1_1", row),
+        ('attempt', "s1", 1, attempt(1, 1)),
+        ('attempt', "s1", 1, attempt(1, 2)),
+    ]
+    # Записи с одним ключом пачки заменяют друг друга
+    assert len({backend.batch_key(item) for item in items}) == 3
+    backend.write_batch(items)
+
+    snapshot = backend.read("s1")
+    assert (snapshot.user_name, snapshot.store_id, snapshot.solved) == ("Вася", "store", frozenset({"q1", "q2"}))
+    assert snapshot.answers == {"1_1": row}
+    record = snapshot.attempts[1]
+    assert (record.correct, record.wrong, record.wrong_answers) == (2, (0, 2), (1, -1))
+    assert backend.owner_of("s1") == "a"
+    assert backend.read("missing") is None
+
+
+def test_touched_session_without_registration(db_path):
+    # Ответы без строки сессии создают ее и закрепляют за процессом
+    backend = SQLiteStateBackend(db_path, owner="a")
+    backend.write_batch([('answers', "s1", "1_1", answers(1).to_row())])
+    snapshot = backend.read("s1")
+    assert snapshot.user_name is None and snapshot.solved == frozenset()
+    assert list(snapshot.answers) == ["1_1"]
+
+    # Запись другого процесса перезакрепляет сессию, не стирая регистрацию
+    backend.write_batch([('session', "s1", ("Вася", "store", frozenset()))])
+    other = SQLiteStateBackend(db_path, owner="b")
+    other.write_batch([('attempt', "s1", 1, attempt(1, 3))])
+    assert backend.owner_of("s1") == "b"
+    assert backend.read("s1").user_name == "Вася"
+
+
+def test_prune(db_path):
+    backend = SQLiteStateBackend(db_path, owner="a")
+    backend.write_batch([('session', "old", ("Вася", "s", frozenset())), ('answers', "old", "1_1", answers(1).to_row()),
+                         ('attempt', "old", 1, attempt(1, 1))])
+    time.sleep(0.2)
+    backend.write_batch([('session', "new", ("Петя", "s", frozenset()))])
+    assert backend.prune(0.1) == 1
+    assert backend.read("old") is None and backend.read("new") is not None
+    conn = backend._connect()
+    assert conn.execute("SELECT COUNT(*) FROM answers").fetchone() == (0,)
+    assert conn.execute("SELECT COUNT(*) FROM attempts").fetchone() == (0,)
+
+
+def test_two_processes_share_sessions(db_path):
+    first = SessionStateStore(SQLiteStateBackend(db_path, owner="first"))
+    second = SessionStateStore(SQLiteStateBackend(db_path, owner="second"))
+
+    first.save_session("s1", "Вася", "store", {"q1"})
+    first.save_answers("s1", "1_1", answers(1, 2))
+    first.save_attempt("s1", attempt(1, 2))
+    # Неизмененные ответы в очередь не попадают
+    first.save_answers("s1", "1_1", answers(1, 2))
+    first.writer.close()
+    assert first.writer.written == 3
+
+    # Сессию, которую последним писал этот процесс, отдает кэш
+    assert first.load("s1").user_name == "Вася"
+    assert (first.hits, first.misses) == (1, 0)
+
+    # Другой процесс читает ее из базы
+    snapshot = second.load("s1")
+    assert (snapshot.user_name, snapshot.solved) == ("Вася", frozenset({"q1"}))
+    assert snapshot.answers["1_1"] == answers(1, 2).to_row()
+    assert snapshot.attempts[1].correct == 2
+    assert second.misses == 1
+
+    second.save_answers("s1", "1_1", answers(0, 2))
+    second.writer.close()
+
+    # Кэш первого процесса устарел: сессию перезаписал второй
+    reloaded = first.load("s1")
+    assert reloaded.answers["1_1"] == answers(0, 2).to_row()
+    assert reloaded.user_name == "Вася"
+    assert first.misses == 1
+
+
+def test_unavailable_backend_is_logged(tmp_path, monkeypatch, caplog):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    monkeypatch.setenv("THEORY_DS_STATE_BACKEND", "sqlite")
+    monkeypatch.setenv("THEORY_DS_STATE_DB", str(blocker / "state.db"))
+    monkeypatch.setattr(state_backend, "_state_store", None)
+    monkeypatch.setattr(state_backend, "_state_store_ready", False)
+    with caplog.at_level(logging.ERROR, logger="state_backend"):
+        assert state_backend.get_state_store() is None
+    assert "Общее хранилище сессий недоступно" in caplog.text
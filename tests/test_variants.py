@@ -0,0 +1,45 @@
+import variants
+from quiz_schema import UNANSWERED
+from variants import build_variant, get_variant, same_version, variant_seed
+
+
+def test_seed_is_deterministic():
+    assert variant_seed("Вася", "quiz", salt="s") == variant_seed("Вася", "quiz", salt="s")
+    assert variant_seed("Вася", "quiz", salt="s") != variant_seed("Вася", "quiz", salt="t")
+
+
+def test_variant_is_deterministic(quiz):
+    first = build_variant(quiz, 42)
+    second = build_variant(quiz, 42)
+    assert first.question_order == second.question_order
+    assert first.option_orders == second.option_orders
+    assert [q.options for q in first.questions] == [q.options for q in second.questions]
+
+
+def test_variant_keeps_correct_answers(quiz):
+    variant = build_variant(quiz, 7)
+    for k, question in enumerate(variant.questions):
+        source = quiz.questions[variant.question_order[k]]
+        if source.gradable:
+            # Правильный ответ варианта переводится в правильный ответ исходного вопроса
+            assert variant.source_code(k, question.correct_mask) == source.correct_mask
+
+
+def test_source_masks_restores_order(quiz):
+    variant = build_variant(quiz, 3)
+    masks = [question.correct_mask if question.gradable else UNANSWERED for question in variant.questions]
+    assert variant.source_masks(masks) == [q.correct_mask if q.gradable else UNANSWERED for q in quiz.questions]
+
+
+def test_rebuilt_variant_is_same_version(quiz, monkeypatch):
+    from conftest import make_quiz
+
+    monkeypatch.setattr(variants, "_VARIANT_CACHE_SIZE", 1)
+    first = get_variant(quiz, 5)
+    assert get_variant(quiz, 5) is first
+    get_variant(quiz, 6)
+    rebuilt = get_variant(quiz, 5)
+    assert rebuilt is not first
+    assert same_version(first, rebuilt)
+    assert not same_version(first, get_variant(quiz, 6))
+    assert not same_version(first, get_variant(make_quiz(), 5))
@@ -0,0 +1,69 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import warmup
+
+
+@pytest.fixture
+def steps(monkeypatch):
+    calls = []
+
+    def broken():
+        raise RuntimeError("нет данных")
+
+    monkeypatch.setattr(warmup, "STEPS", [("ok", lambda: calls.append("ok")), ("broken", broken)])
+    monkeypatch.setattr(warmup, "_timings", {})
+    monkeypatch.setattr(warmup, "_errors", {})
+    monkeypatch.setattr(warmup, "_ready", threading.Event())
+    return calls
+
+
+def test_warm_up_runs_steps_and_records_errors(steps, tmp_path):
+    timings = warmup.warm_up(ready_file="")
+    assert steps == ["ok"]
+    assert set(timings) == {"ok", "broken", "total"}
+    assert warmup.is_ready()
+    assert warmup.warm_up_status()['errors'] == {"broken": "RuntimeError: нет данных"}
+    assert not list(tmp_path.iterdir())
+
+
+def test_ready_file(steps, tmp_path):
+    path = tmp_path / "ready.json"
+    warmup.warm_up(ready_file=str(path))
+    ready = json.loads(path.read_text(encoding='utf-8'))
+    assert set(ready['timings_ms']) == {"ok", "broken", "total"}
+    assert ready['errors'] == {"broken": "RuntimeError: нет данных"}
+    assert not (tmp_path / "ready.json.tmp").exists()
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status = 200 if self.path == "/_stcore/health" else 404
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_wait_serving():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), HealthHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        assert warmup.wait_serving(f"{base}/_stcore/health", timeout=5)
+        assert not warmup.wait_serving(f"{base}/missing", timeout=0.3)
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_no_server_in_process():
+    # Без Runtime Streamlit адрес сервера неизвестен: ожидание заканчивается по таймауту
+    assert warmup._health_url() is None
+    assert not warmup.wait_serving(timeout=0.2)
@@ -0,0 +1,144 @@
+"""Варианты тестов: перестановка вопросов и вариантов ответа.
+
+С THEORY_DS_VARIANTS=1 каждый пользователь получает свой порядок вопросов
+и вариантов ответа. Вариант определяется зерном crc32 от имени пользователя,
+теста и соли THEORY_DS_VARIANT_SALT (новая соль - новый набор вариантов для
+экзамена), поэтому одно и то же зерно всегда дает тот же вариант.
+
+Таблицы перестановок считаются один раз на (тест, зерно) и кэшируются
+вместе с переставленным тестом VariantQuiz. Отрисовка и проверка работают
+с ним как с обычным тестом (ключ ответов компилируется уже в порядке
+варианта), а в исходный порядок - для сохраненных попыток и статистики -
+ответы переводятся поиском по таблицам.
+"""
+import os
+import random
+import threading
+import zlib
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+from quiz_schema import UNANSWERED, Question, QuestionType, Quiz
+
+VARIANTS_ENABLED = os.environ.get("THEORY_DS_VARIANTS", "0") == "1"
+VARIANT_SALT = os.environ.get("THEORY_DS_VARIANT_SALT", "")
+
+
+def variant_seed(user_name: str, quiz_id: str, salt: str = VARIANT_SALT) -> int:
+    """Зерно варианта пользователя для теста"""
+    return zlib.crc32(f"{salt}\0{user_name}\0{quiz_id}".encode('utf-8'))
+
+
+class VariantQuiz(Quiz):
+    """Тест в порядке варианта вместе с таблицами перевода в исходный порядок.
+
+    question_order[k] - исходный индекс k-го показанного вопроса,
+    option_orders[k][i] - исходный индекс i-го показанного варианта в нем.
+    """
+
+    __slots__ = ('source', 'seed', 'question_order', 'option_orders')
+
+    def source_code(self, k: int, code: int) -> int:
+        """Код ответа на k-й показанный вопрос в нумерации вариантов исходного вопроса"""
+        if code == UNANSWERED:
+            return code
+        order = self.option_orders[k]
+        question = self.questions[k]
+        if question.qtype == QuestionType.MATCHING:
+            choices = question.decode_matching(code)
+            return self.source.questions[self.question_order[k]].encode_matching(
+                [order[choice] if choice is not None else None for choice in choices]
+            )
+        if question.qtype in (QuestionType.SINGLE, QuestionType.MULTI):
+            mask = 0
+            i = 0
+            while code:
+                if code & 1:
+                    mask |= 1 << order[i]
+                code >>= 1
+                i += 1
+            return mask
+        return code
+
+    def source_masks(self, masks: Sequence[int]) -> List[int]:
+        """Коды ответов попытки в порядке и нумерации исходного теста"""
+        result = [UNANSWERED] * len(self.source.questions)
+        for k, code in enumerate(masks):
+            result[self.question_order[k]] = self.source_code(k, code)
+        return result
+
+
+def _permute_question(question: Question, number: int, order: Tuple[int, ...]) -> Question:
+    """Вопрос с вариантами в порядке order (номер вопроса - его место в варианте)"""
+    inverse = [0] * len(order)
+    for position, source_index in enumerate(order):
+        inverse[source_index] = position
+    return Question(
+        number,
+        question.text,
+        question.qtype,
+        tuple(question.options[k] for k in order),
+        correct=frozenset(inverse[k] for k in question.correct),
+        correct_order=tuple(inverse[k] for k in question.correct_order),
+        pairs_left=question.pairs_left,
+        gradable=question.gradable,
+        explanation=question.explanation,
+    )
+
+
+def build_variant(quiz: Quiz, seed: int) -> VariantQuiz:
+    """Строит вариант теста по зерну"""
+    rng = random.Random(seed)
+    question_order = list(range(len(quiz.questions)))
+    rng.shuffle(question_order)
+    option_orders = []
+    questions = []
+    for number, source_index in enumerate(question_order, 1):
+        question = quiz.questions[source_index]
+        order = list(range(len(question.options)))
+        if question.qtype != QuestionType.FREE_TEXT:
+            rng.shuffle(order)
+        option_orders.append(tuple(order))
+        questions.append(_permute_question(question, number, tuple(order)))
+
+    variant = VariantQuiz(quiz.quiz_id, quiz.title, tuple(questions), quiz.pdf_links, quiz.tags, quiz.difficulty)
+    variant.source = quiz
+    variant.seed = seed
+    variant.question_order = tuple(question_order)
+    variant.option_orders = tuple(option_orders)
+    return variant
+
+
+_VARIANT_CACHE_SIZE = 1024
+# Ключ - сам тест (хэш по идентичности) и зерно: кэш держит ссылку на тест,
+# поэтому ключ не может достаться другому объекту
+_variant_cache: "OrderedDict[Tuple[Quiz, int], VariantQuiz]" = OrderedDict()
+_variant_cache_lock = threading.Lock()
+
+
+def get_variant(quiz: Quiz, seed: int) -> VariantQuiz:
+    """Вариант теста из кэша процесса; пока он в кэше, на каждый rerun возвращается тот же объект"""
+    cache_key = (quiz, seed)
+    with _variant_cache_lock:
+        variant = _variant_cache.get(cache_key)
+        if variant is not None:
+            _variant_cache.move_to_end(cache_key)
+            return variant
+    variant = build_variant(quiz, seed)
+    with _variant_cache_lock:
+        variant = _variant_cache.setdefault(cache_key, variant)
+        if len(_variant_cache) > _VARIANT_CACHE_SIZE:
+            _variant_cache.popitem(last=False)
+    return variant
+
+
+def same_version(first: Quiz, second: Quiz) -> bool:
+    """Одна ли это версия теста в одном порядке.
+
+    Вытесненный из кэша вариант строится заново другим объектом, но по тому
+    же исходному тесту и зерну он совпадает с прежним.
+    """
+    if first is second:
+        return True
+    return isinstance(first, VariantQuiz) and isinstance(second, VariantQuiz) and \
+        first.source is second.source and first.seed == second.seed
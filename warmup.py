@@ -0,0 +1,235 @@
+"""Прогрев процесса Streamlit до прихода пользователей.
+
+Первый пользователь после развертывания раньше платил за импорт модулей,
+чтение и разбор всех файлов тестов, компиляцию ключей ответов, построение
+реестра разделов, поисковых индексов и уменьшение логотипов. warm_up()
+выполняет все это один раз на процесс; после него общие кэши процесса
+(каталог, ключи, индексы, изображения) уже заполнены.
+
+Запуск с прогревом до открытия порта (аргументы передаются streamlit run):
+    python warmup.py --server.port 8501
+
+Файл готовности THEORY_DS_READY_FILE (JSON с временем шагов) пишется, когда
+прогрев закончен и сервер этого процесса отвечает на /_stcore/health, -
+по нему можно подавать трафик.
+
+При обычном streamlit run main.py процесс до первого запуска скрипта ничего
+не прогревает: прогрев стартует в фоне, когда первый пользователь открывает
+страницу (THEORY_DS_WARM_UP=0 отключает), и этот пользователь ждет часть
+шагов сам. Файл готовности в этом режиме появляется только после первого
+посетителя, поэтому для проверки готовности перед трафиком нужен
+python warmup.py.
+"""
+import json
+import os
+import ssl
+import sys
+import threading
+import time
+import urllib.request
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(ROOT, "main.py")
+READY_FILE = os.environ.get("THEORY_DS_READY_FILE", "")
+# THEORY_DS_WARM_UP=0 отключает фоновый прогрев из main()
+WARM_UP_ENABLED = os.environ.get("THEORY_DS_WARM_UP", "1") != "0"
+# Сколько секунд после прогрева ждать, пока сервер начнет отвечать
+SERVE_TIMEOUT = 120.0
+
+# Логотипы в тех размерах, в которых их показывает main.py
+LOGO_SIZES = (
+    ("image_innowise.png", 100),
+    ("image_innowise.png", 200),
+    ("image_innowise1.png", 300),
+    ("image_innowise2.png", 200),
+)
+
+
+def _warm_catalog() -> None:
+    from quiz_catalog import get_catalog
+
+    catalog = get_catalog()
+    _, index = catalog.index_snapshot()
+    for entry in index.values():
+        for path in entry.values():
+            catalog.load_file(path)
+
+
+def _warm_grading() -> None:
+    from grading import get_answer_key
+    from quiz_catalog import get_catalog
+
+    catalog = get_catalog()
+    _, index = catalog.index_snapshot()
+    for entry in index.values():
+        for path in entry.values():
+            quiz = catalog.load_file(path)
+            if quiz is not None:
+                get_answer_key(quiz.questions)
+
+
+def _warm_assets() -> None:
+    from assets import image_bytes
+
+    for name, width in LOGO_SIZES:
+        image_bytes(name, width)
+
+
+def _warm_storage() -> None:
+    from analytics import get_analytics
+    from results_backend import get_results_writer
+    from state_backend import get_state_store
+
+    get_results_writer()
+    get_analytics()
+    get_state_store()
+
+
+def _warm_imports() -> None:
+    # Модули приложения без streamlit: numpy, sqlite3, PIL и собственные модули
+    import analytics, assets, grading, link_registry, practice, reports, search, section_registry, variants  # noqa: F401
+
+
+def _call(module: str, name: str) -> Callable[[], object]:
+    def call():
+        return getattr(__import__(module), name)()
+    return call
+
+
+# Шаги прогрева по порядку: (название, функция)
+STEPS: List[Tuple[str, Callable[[], object]]] = [
+    ("imports", _warm_imports),
+    ("catalog", _warm_catalog),
+    ("grading", _warm_grading),
+    ("registry", _call("section_registry", "get_registry")),
+    ("search", _call("search", "get_search_index")),
+    ("tags", _call("practice", "get_tag_index")),
+    ("links", _call("link_registry", "get_link_registry")),
+    ("assets", _warm_assets),
+    ("storage", _warm_storage),
+]
+
+
+_ready = threading.Event()
+_timings: Dict[str, float] = {}
+_errors: Dict[str, str] = {}
+_started = False
+_start_lock = threading.Lock()
+
+
+def warm_up(ready_file: str = READY_FILE) -> Dict[str, float]:
+    """Выполняет все шаги прогрева; возвращает время шагов в миллисекундах"""
+    start = time.perf_counter()
+    for name, step in STEPS:
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # Ошибка шага не мешает приложению: кэш заполнится при первом обращении
+            _errors[name] = f"{type(e).__name__}: {e}"
+        _timings[name] = (time.perf_counter() - step_start) * 1000
+    _timings["total"] = (time.perf_counter() - start) * 1000
+    _ready.set()
+    if ready_file:
+        write_ready_file(ready_file)
+    return dict(_timings)
+
+
+def write_ready_file(path: str) -> None:
+    """Записывает сигнал готовности (атомарно, через временный файл)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'pid': os.getpid(), 'ready_at': time.time(), 'timings_ms': _timings, 'errors': _errors}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _health_url() -> Optional[str]:
+    """Адрес /_stcore/health сервера этого процесса (None, пока сервер не создан)"""
+    from streamlit import config
+    from streamlit.runtime import Runtime
+
+    # Runtime создается после чтения флагов командной строки: до этого порт еще не известен
+    if not Runtime.exists():
+        return None
+    address = config.get_option("server.address") or "127.0.0.1"
+    if address in ("0.0.0.0", "::"):
+        address = "127.0.0.1"
+    elif ":" in address:
+        address = f"[{address}]"
+    scheme = "https" if config.get_option("server.sslCertFile") else "http"
+    base = (config.get_option("server.baseUrlPath") or "").strip("/")
+    path = f"/{base}/_stcore/health" if base else "/_stcore/health"
+    return f"{scheme}://{address}:{config.get_option('server.port')}{path}"
+
+
+def wait_serving(url: Optional[str] = None, timeout: float = SERVE_TIMEOUT) -> bool:
+    """Ждет, пока сервер ответит 200 на проверку здоровья; False - не дождались"""
+    # Собственный сертификат сервера может быть самоподписанным: проверяется только доступность
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        target = url or _health_url()
+        if target:
+            try:
+                with urllib.request.urlopen(target, timeout=1, context=context) as response:
+                    if response.status == 200:
+                        return True
+            except (OSError, ValueError):
+                pass
+        time.sleep(0.1)
+    return False
+
+
+def _mark_ready_when_serving(path: str) -> None:
+    if wait_serving():
+        write_ready_file(path)
+    else:
+        print(f"⚠️ сервер не ответил за {SERVE_TIMEOUT:.0f} с, файл готовности не записан", file=sys.stderr)
+
+
+def start_warm_up() -> None:
+    """Запускает прогрев в фоне (один раз на процесс)"""
+    global _started
+    if _started or not WARM_UP_ENABLED:
+        return
+    with _start_lock:
+        if not _started:
+            _started = True
+            threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def wait_ready(timeout: Optional[float] = None) -> bool:
+    return _ready.wait(timeout)
+
+
+def warm_up_status() -> Dict[str, object]:
+    """Готовность и время шагов (для панели администратора)"""
+    return {'ready': is_ready(), 'timings_ms': {name: round(ms, 1) for name, ms in _timings.items()}, 'errors': _errors}
+
+
+def main() -> int:
+    """Прогревает процесс и запускает в нем streamlit run main.py"""
+    global _started
+    _started = True
+    # main.py импортирует warmup: он должен получить этот модуль с уже выставленной готовностью
+    sys.modules.setdefault("warmup", sys.modules[__name__])
+    # Файл готовности пишется, только когда сервер уже принимает соединения
+    timings = warm_up(ready_file="")
+    print("🔥 прогрев: " + ", ".join(f"{name} {ms:.0f} мс" for name, ms in timings.items()), file=sys.stderr)
+    if READY_FILE:
+        threading.Thread(target=_mark_ready_when_serving, args=(READY_FILE,), name="ready-file", daemon=True).start()
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_PATH] + sys.argv[1:]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())